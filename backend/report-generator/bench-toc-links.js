@@ -0,0 +1,63 @@
+/**
+ * Mide el costo de los enlaces del índice en el PDF combinado.
+ *
+ *   node bench-toc-links.js [--pages 300] [--repeat 3]
+ *
+ * Arma un documento A4 de prueba con pdf-lib y compara el guardado con y sin los
+ * enlaces; el presupuesto para la pasada de enlaces es de 200 ms.
+ */
+import { PDFDocument } from "pdf-lib";
+import { addTocLinks } from "./report-core.js";
+
+const LINK_BUDGET_MS = 200;
+const A4 = [595.28, 841.89];
+
+function intArg(name, fallback) {
+  const index = process.argv.indexOf(name);
+  const value = index >= 0 ? Number.parseInt(process.argv[index + 1], 10) : NaN;
+  return Number.isFinite(value) && value > 0 ? value : fallback;
+}
+
+const pageCount = Math.max(10, intArg("--pages", 300));
+const repeat = intArg("--repeat", 3);
+
+const targets = ["intro", "report", "ancestry", ...[0, 1, 2, 3, 4].map((n) => `section-${n}`), "closing"];
+const step = Math.max(1, Math.floor((pageCount - 3) / targets.length));
+const tocEntries = targets.map((target, index) => ({ target, page: 1 + index * step }));
+const targetPages = new Map(tocEntries.map((entry) => [entry.target, entry.page + 1]));
+
+async function buildDoc() {
+  const doc = await PDFDocument.create();
+  for (let i = 0; i < pageCount; i += 1) doc.addPage(A4);
+  return doc;
+}
+
+async function measure(withLinks) {
+  let best = { links: Infinity, save: Infinity };
+  let added = 0;
+  for (let i = 0; i < repeat; i += 1) {
+    const doc = await buildDoc();
+    let started = performance.now();
+    if (withLinks) added = addTocLinks(doc, 1, targetPages, tocEntries);
+    const links = performance.now() - started;
+    started = performance.now();
+    await doc.save();
+    const save = performance.now() - started;
+    best = { links: Math.min(best.links, links), save: Math.min(best.save, save) };
+  }
+  return { ...best, added };
+}
+
+const plain = await measure(false);
+const linked = await measure(true);
+console.log(
+  `${pageCount} páginas, ${tocEntries.length} entradas de índice: ` +
+  `guardar sin enlaces ${plain.save.toFixed(1)} ms | con enlaces ${linked.save.toFixed(1)} ms | ` +
+  `${linked.added} enlaces en ${linked.links.toFixed(2)} ms`
+);
+if (linked.links < LINK_BUDGET_MS) {
+  console.log(`Enlaces del índice bajo ${LINK_BUDGET_MS} ms.`);
+} else {
+  console.error(`Los enlaces del índice superan ${LINK_BUDGET_MS} ms.`);
+  process.exit(1);
+}
@@ -0,0 +1,129 @@
+/**
+ * Caché en disco de fragmentos PDF del reporte.
+ *
+ * Cada fragmento (una página: introducción, portada de sección, resumen, página de un
+ * rsID, cierre...) se guarda por el sha256 de su HTML ya rellenado. Los números de
+ * página no forman parte del HTML: se dibujan después sobre el PDF combinado, así que
+ * la introducción o las portadas de sección son las mismas para todos los usuarios y la
+ * página de un rsID solo depende de sus datos (rsid, genotipo, fenotipo, descripción).
+ *
+ * Junto a cada <hash>.pdf se guarda <hash>.json con la posición del pie de página.
+ *
+ * Variables de entorno:
+ *   REPORT_FRAGMENT_CACHE         "0" para desactivarla
+ *   REPORT_FRAGMENT_CACHE_DIR     por defecto <report-generator>/cache/fragments
+ *   REPORT_FRAGMENT_CACHE_MAX_MB  tamaño máximo en disco, por defecto 300
+ */
+import crypto from "node:crypto";
+import fs from "node:fs";
+import path from "node:path";
+import { fileURLToPath } from "node:url";
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+// Cambiarlo invalida todos los fragmentos (p.ej. si cambia la forma de renderizar)
+const FRAGMENT_VERSION = "1";
+
+const enabled = process.env.REPORT_FRAGMENT_CACHE !== "0";
+const cacheDir = process.env.REPORT_FRAGMENT_CACHE_DIR || path.join(__dirname, "cache", "fragments");
+const maxMbRaw = Number.parseInt(process.env.REPORT_FRAGMENT_CACHE_MAX_MB || "300", 10);
+const maxBytes = (Number.isFinite(maxMbRaw) && maxMbRaw > 0 ? maxMbRaw : 300) * 1024 * 1024;
+
+let bytesSinceEviction = 0;
+const stats = { hits: 0, misses: 0, stored: 0 };
+
+if (enabled) fs.mkdirSync(cacheDir, { recursive: true });
+
+export function fragmentCacheEnabled() {
+  return enabled;
+}
+
+export function fragmentKey(kind, html, options = {}) {
+  return crypto
+    .createHash("sha256")
+    .update(`${FRAGMENT_VERSION}\0${kind}\0${JSON.stringify(options)}\0`)
+    .update(html)
+    .digest("hex");
+}
+
+function entryPaths(key) {
+  return {
+    pdfPath: path.join(cacheDir, `${key}.pdf`),
+    metaPath: path.join(cacheDir, `${key}.json`),
+  };
+}
+
+export function getFragment(key) {
+  if (!enabled) return null;
+  const { pdfPath, metaPath } = entryPaths(key);
+  try {
+    const pdf = fs.readFileSync(pdfPath);
+    const meta = JSON.parse(fs.readFileSync(metaPath, "utf-8"));
+    const now = new Date();
+    fs.utimesSync(pdfPath, now, now);
+    stats.hits += 1;
+    return { pdf, footers: meta.footers || [] };
+  } catch {
+    stats.misses += 1;
+    return null;
+  }
+}
+
+function writeAtomic(filePath, data) {
+  const tmpPath = `${filePath}.${process.pid}.${crypto.randomBytes(4).toString("hex")}.tmp`;
+  fs.writeFileSync(tmpPath, data);
+  fs.renameSync(tmpPath, filePath);
+}
+
+export function putFragment(key, pdf, footers) {
+  if (!enabled) return;
+  const { pdfPath, metaPath } = entryPaths(key);
+  try {
+    // Primero el JSON: un .pdf sin su .json nunca se considera acierto
+    writeAtomic(metaPath, JSON.stringify({ footers }));
+    writeAtomic(pdfPath, pdf);
+    stats.stored += 1;
+    bytesSinceEviction += pdf.length;
+  } catch (err) {
+    console.warn(`No se pudo guardar el fragmento ${key}: ${err.message}`);
+  }
+  // Revisar el tamaño total solo de vez en cuando
+  if (bytesSinceEviction > maxBytes / 10) {
+    bytesSinceEviction = 0;
+    evictFragments();
+  }
+}
+
+export function evictFragments() {
+  if (!enabled) return 0;
+  const entries = [];
+  let total = 0;
+  for (const name of fs.readdirSync(cacheDir)) {
+    if (!name.endsWith(".pdf")) continue;
+    try {
+      const stat = fs.statSync(path.join(cacheDir, name));
+      entries.push({ key: name.slice(0, -4), mtime: stat.mtimeMs, size: stat.size });
+      total += stat.size;
+    } catch {
+      // Eliminado por otro proceso
+    }
+  }
+  if (total <= maxBytes) return 0;
+
+  entries.sort((a, b) => a.mtime - b.mtime);
+  let removed = 0;
+  for (const entry of entries) {
+    if (total <= maxBytes) break;
+    const { pdfPath, metaPath } = entryPaths(entry.key);
+    fs.rmSync(pdfPath, { force: true });
+    fs.rmSync(metaPath, { force: true });
+    total -= entry.size;
+    removed += 1;
+  }
+  return removed;
+}
+
+export function fragmentCacheStats() {
+  return { enabled, dir: cacheDir, ...stats };
+}
@@ -0,0 +1,281 @@
+/**
+ * Servicio local de render de reportes.
+ *
+ * Mantiene un Chromium abierto y un pool de pestañas reutilizables, de modo que cada
+ * reporte ya no paga el arranque de Node, la carga de módulos ni el lanzamiento del
+ * navegador. Django (autenticacion/report_renderer.py) le envía el payload de
+ * build_report_payload y recibe el PDF; si el servicio no responde, vuelve a ejecutar
+ * generate.js como subproceso.
+ *
+ *   POST /render   cuerpo: payload JSON ({ people: [...] }), respuesta: application/pdf
+ *                  combinado y con enlaces en el índice, con los encabezados X-Report-Id,
+ *                  X-Report-Pages y X-Report-Toc (JSON en base64)
+ *   GET  /health   estado del navegador, del pool y de la caché de fragmentos
+ *
+ * Variables de entorno:
+ *   REPORT_RENDER_SOCKET     socket Unix donde escuchar (tiene prioridad sobre host/puerto)
+ *   REPORT_RENDER_HOST       por defecto 127.0.0.1
+ *   REPORT_RENDER_PORT       por defecto 3917
+ *   REPORT_RENDER_POOL_SIZE  pestañas simultáneas, por defecto 2
+ *   REPORT_RENDER_MAX_BODY   tamaño máximo del payload en bytes, por defecto 20 MB
+ */
+import fs from "node:fs";
+import http from "node:http";
+import { fragmentCacheStats } from "./fragment-cache.js";
+import {
+  launchBrowser,
+  renderHtmlToPdf,
+  renderPerson,
+  safeCloseBrowser,
+  shouldRetryBrowser,
+} from "./report-core.js";
+
+function intFromEnv(name, fallback) {
+  const value = Number.parseInt(process.env[name] || "", 10);
+  return Number.isFinite(value) && value > 0 ? value : fallback;
+}
+
+const socketPath = process.env.REPORT_RENDER_SOCKET || "";
+const host = process.env.REPORT_RENDER_HOST || "127.0.0.1";
+const port = intFromEnv("REPORT_RENDER_PORT", 3917);
+const poolSize = intFromEnv("REPORT_RENDER_POOL_SIZE", 2);
+const maxBodyBytes = intFromEnv("REPORT_RENDER_MAX_BODY", 20 * 1024 * 1024);
+
+// === BROWSER + PAGE POOL ===
+class PagePool {
+  constructor(size) {
+    this.size = size;
+    this.browser = null;
+    this.launching = null;
+    this.idle = [];
+    this.inUse = new Set();
+    this.opening = 0;
+    this.waiters = [];
+    this.rendered = 0;
+  }
+
+  async getBrowser() {
+    if (this.browser) return this.browser;
+    if (!this.launching) {
+      this.launching = launchBrowser()
+        .then((browser) => {
+          this.browser = browser;
+          browser.on("disconnected", () => this.forgetBrowser(browser));
+          console.log(`Navegador iniciado (${this.size} pestañas en el pool)`);
+          return browser;
+        })
+        .finally(() => {
+          this.launching = null;
+        });
+    }
+    return this.launching;
+  }
+
+  forgetBrowser(browser) {
+    if (this.browser !== browser) return;
+    console.warn("El navegador se desconectó; se relanzará en el próximo render");
+    this.browser = null;
+    // Las pestañas en uso se descartan al liberarse
+    this.idle = [];
+    this.wakeWaiter();
+  }
+
+  async restartBrowser() {
+    const browser = this.browser;
+    this.forgetBrowser(browser);
+    await safeCloseBrowser(browser);
+  }
+
+  async acquire() {
+    while (this.idle.length) {
+      const page = this.idle.pop();
+      if (!page.isClosed()) {
+        this.inUse.add(page);
+        return page;
+      }
+    }
+    if (this.idle.length + this.inUse.size + this.opening < this.size) {
+      this.opening += 1;
+      try {
+        const browser = await this.getBrowser();
+        const page = await browser.newPage();
+        this.inUse.add(page);
+        return page;
+      } finally {
+        this.opening -= 1;
+      }
+    }
+    return new Promise((resolve, reject) => this.waiters.push({ resolve, reject }));
+  }
+
+  release(page, broken = false) {
+    this.inUse.delete(page);
+    this.rendered += 1;
+    const reusable = !broken && !page.isClosed() && this.browser && page.browser() === this.browser;
+    if (!reusable) {
+      page.close().catch(() => {});
+      this.wakeWaiter();
+      return;
+    }
+    const waiter = this.waiters.shift();
+    if (waiter) {
+      this.inUse.add(page);
+      waiter.resolve(page);
+    } else {
+      this.idle.push(page);
+    }
+  }
+
+  wakeWaiter() {
+    const waiter = this.waiters.shift();
+    if (waiter) this.acquire().then(waiter.resolve, waiter.reject);
+  }
+
+  stats() {
+    return {
+      browserConnected: Boolean(this.browser && this.browser.connected),
+      size: this.size,
+      idle: this.idle.length,
+      inUse: this.inUse.size,
+      waiting: this.waiters.length,
+      pagesRendered: this.rendered,
+    };
+  }
+
+  async close() {
+    const browser = this.browser;
+    this.browser = null;
+    await safeCloseBrowser(browser);
+  }
+}
+
+const pool = new PagePool(poolSize);
+
+async function renderPdfPooled(html, options = {}) {
+  for (let attempt = 0; ; attempt += 1) {
+    const page = await pool.acquire();
+    let broken = false;
+    try {
+      return await renderHtmlToPdf(page, html, options);
+    } catch (err) {
+      broken = true;
+      if (attempt === 0 && shouldRetryBrowser(err)) {
+        await pool.restartBrowser();
+        continue;
+      }
+      throw err;
+    } finally {
+      pool.release(page, broken);
+    }
+  }
+}
+
+// === HTTP ===
+function readBody(req) {
+  return new Promise((resolve, reject) => {
+    const chunks = [];
+    let size = 0;
+    req.on("data", (chunk) => {
+      size += chunk.length;
+      if (size > maxBodyBytes) {
+        reject(Object.assign(new Error("Payload demasiado grande"), { statusCode: 413 }));
+        req.destroy();
+        return;
+      }
+      chunks.push(chunk);
+    });
+    req.on("end", () => resolve(Buffer.concat(chunks)));
+    req.on("error", reject);
+  });
+}
+
+function sendJson(res, statusCode, body) {
+  const data = JSON.stringify(body);
+  res.writeHead(statusCode, {
+    "Content-Type": "application/json; charset=utf-8",
+    "Content-Length": Buffer.byteLength(data),
+  });
+  res.end(data);
+}
+
+async function handleRender(req, res) {
+  let payload;
+  try {
+    payload = JSON.parse((await readBody(req)).toString("utf-8"));
+  } catch (err) {
+    sendJson(res, err.statusCode || 400, { error: err.statusCode ? err.message : "JSON inválido" });
+    return;
+  }
+
+  const person = Array.isArray(payload?.people) ? payload.people[0] : null;
+  if (!person) {
+    sendJson(res, 400, { error: "El payload no contiene personas" });
+    return;
+  }
+
+  const started = Date.now();
+  const { reportId, bytes, tocEntries, pages, fragments } = await renderPerson(person, renderPdfPooled);
+  const pdf = Buffer.from(bytes);
+  console.log(
+    `Reporte ${reportId} renderizado en ${Date.now() - started} ms (${pdf.length} bytes, ` +
+    `${fragments.rendered}/${fragments.total} fragmentos renderizados)`
+  );
+
+  res.writeHead(200, {
+    "Content-Type": "application/pdf",
+    "Content-Length": pdf.length,
+    "X-Report-Id": reportId,
+    "X-Report-Pages": String(pages),
+    "X-Report-Toc": Buffer.from(JSON.stringify(tocEntries)).toString("base64"),
+  });
+  res.end(pdf);
+}
+
+const server = http.createServer((req, res) => {
+  const url = new URL(req.url, "http://localhost");
+  let handler = null;
+  if (req.method === "POST" && url.pathname === "/render") {
+    handler = handleRender(req, res);
+  } else if (req.method === "GET" && url.pathname === "/health") {
+    sendJson(res, 200, { status: "ok", ...pool.stats(), fragmentCache: fragmentCacheStats() });
+    return;
+  } else {
+    sendJson(res, 404, { error: "Ruta no encontrada" });
+    return;
+  }
+
+  handler.catch((err) => {
+    console.error("Error al renderizar:", err);
+    if (res.headersSent) {
+      res.destroy(err);
+    } else {
+      sendJson(res, 500, { error: String(err?.message || err) });
+    }
+  });
+});
+
+// Los reportes grandes tardan; el límite lo pone el cliente
+server.requestTimeout = 0;
+
+function listen() {
+  if (socketPath) {
+    if (fs.existsSync(socketPath)) fs.unlinkSync(socketPath);
+    server.listen(socketPath, () => console.log(`Servicio de reportes escuchando en ${socketPath}`));
+  } else {
+    server.listen(port, host, () => console.log(`Servicio de reportes escuchando en http://${host}:${port}`));
+  }
+}
+
+async function shutdown(signal) {
+  console.log(`${signal} recibido, cerrando servicio de reportes`);
+  server.close();
+  await pool.close();
+  process.exit(0);
+}
+
+process.on("SIGTERM", () => shutdown("SIGTERM"));
+process.on("SIGINT", () => shutdown("SIGINT"));
+
+// Navegador caliente desde el inicio; si falla, se reintenta en el primer render
+pool.getBrowser().catch((err) => console.error("No se pudo iniciar el navegador:", err.message));
+listen();
@@ -0,0 +1,1010 @@
+/**
+ * Núcleo de render del reporte genético, compartido por generate.js (CLI, un proceso
+ * por reporte) y render-server.js (servicio persistente con navegador caliente).
+ * Las plantillas y los assets se leen una sola vez al importar el módulo.
+ */
+import fs from "node:fs";
+import path from "node:path";
+import puppeteer from "puppeteer";
+import QRCode from "qrcode";
+import { fileURLToPath } from "node:url";
+import { PDFDocument, PDFName, StandardFonts, rgb } from "pdf-lib";
+import { fragmentKey, getFragment, putFragment } from "./fragment-cache.js";
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+const templatePath = path.join(__dirname, "report.html");
+const summaryTemplatePath = path.join(__dirname, "summary.html");
+const introTemplatePath = path.join(__dirname, "intro.html");
+const ancestryTemplatePath = path.join(__dirname, "ancestry.html");
+const rsidTemplatePath = path.join(__dirname, "rsid.html");
+const coverTemplatePath = path.join(__dirname, "cover.html");
+const closingTemplatePath = path.join(__dirname, "closing.html");
+const indexTemplatePath = path.join(__dirname, "index.html");
+const coverSectionTemplatePath = path.join(__dirname, "cover_section.html");
+
+const bgPath = path.join(__dirname, "assets", "dna-bg-two.png");
+const coverBgPath = path.join(__dirname, "assets", "dna-bg.png");
+const logoColorPath = path.join(__dirname, "assets", "genomiacolor.png");
+const logoPath = path.join(__dirname, "assets", "genomia.png");
+
+const maxItemsPerCategoryRaw = Number.parseInt(
+  process.env.REPORT_MAX_ITEMS_PER_CATEGORY || "0",
+  10
+);
+const maxItemsPerCategory = 
+  Number.isFinite(maxItemsPerCategoryRaw) && maxItemsPerCategoryRaw > 0
+    ? maxItemsPerCategoryRaw
+    : 0;
+const skipRsidPages = process.env.REPORT_SKIP_RSID_PAGES === "1";
+
+const pdfScaleRaw = Number.parseFloat(process.env.REPORT_PDF_SCALE || "1");
+const pdfScale = 
+  Number.isFinite(pdfScaleRaw) && pdfScaleRaw > 0 ? pdfScaleRaw : 1;
+
+const enableSingleProcess = process.env.REPORT_SINGLE_PROCESS === "1";
+
+export const chromiumArgs = [
+  "--no-sandbox",
+  "--disable-setuid-sandbox",
+  "--disable-dev-shm-usage",
+  "--disable-gpu",
+  "--disable-extensions",
+  "--disable-background-networking",
+  "--disable-default-apps",
+  "--disable-sync",
+  "--metrics-recording-only",
+  "--mute-audio",
+  "--no-first-run",
+  "--no-default-browser-check",
+  "--disable-features=IsolateOrigins,site-per-process",
+  "--renderer-process-limit=2",
+];
+
+if (enableSingleProcess) {
+  chromiumArgs.push("--no-zygote", "--single-process");
+}
+
+const browserExecutableCandidates = [
+  process.env.PUPPETEER_EXECUTABLE_PATH,
+  "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+  "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
+  "C:\\Program Files\\Microsoft\\Edge\\Application\\msedge.exe",
+  "C:\\Program Files (x86)\\Microsoft\\Edge\\Application\\msedge.exe",
+];
+
+function resolveBrowserExecutablePath() {
+  for (const candidate of browserExecutableCandidates) {
+    if (candidate && fs.existsSync(candidate)) {
+      return candidate;
+    }
+  }
+  return "";
+}
+
+export function shouldRetryBrowser(err) {
+  if (!err) return false;
+  const message = [
+    err.message,
+    err.cause?.message,
+    typeof err === "string" ? err : "",
+  ]
+    .filter(Boolean)
+    .join(" ");
+  return /Target closed|TargetCloseError|Connection closed|ConnectionClosedError|Protocol error/i.test(
+    message
+  );
+}
+
+
+export function browserLaunchOptions() {
+  const executablePath = resolveBrowserExecutablePath();
+  const launchOptions = { args: chromiumArgs };
+  if (executablePath) launchOptions.executablePath = executablePath;
+  return launchOptions;
+}
+
+export function launchBrowser() {
+  return puppeteer.launch(browserLaunchOptions());
+}
+
+export async function safeCloseBrowser(browserInstance) {
+  if (!browserInstance) return;
+  try {
+    await browserInstance.close();
+  } catch {
+    // Ignore close errors
+  }
+}
+
+// Pies "Pag X de Y": el HTML lleva un marcador y el número real se dibuja al combinar,
+// para que el mismo fragmento sirva en cualquier posición del reporte (ver fragment-cache.js).
+// Solo el texto (<span class="page-number"> dentro del pie) se vuelve transparente: la caja
+// del pie (fondo, borde, sombra) se imprime igual. El texto se estampa en Helvetica.
+const PAGE_NUMBER_SELECTOR = ".footer .page-number, .footer-fixed .page-number";
+export const PAGE_NUMBER_PLACEHOLDER = "000";
+const A4_WIDTH_PX = (210 / 25.4) * 96;
+const A4_HEIGHT_PX = (297 / 25.4) * 96;
+const PX_TO_PT = 0.75;
+
+function parseCssColor(value) {
+  const match = /rgba?\(([^)]+)\)/.exec(value || "");
+  if (!match) return { r: 0.8, g: 0.84, b: 0.88, a: 1 };
+  const [r, g, b, a = "1"] = match[1].split(",").map((part) => part.trim());
+  return { r: Number(r) / 255, g: Number(g) / 255, b: Number(b) / 255, a: Number(a) };
+}
+
+// Mide la posición del texto de cada pie de página (en puntos PDF) y lo deja
+// transparente antes de imprimir
+async function measureAndHideFooters(page) {
+  const measured = await page.evaluate((selector, pageHeightPx) => {
+    const result = [];
+    for (const el of document.querySelectorAll(selector)) {
+      const rect = el.getBoundingClientRect();
+      if (!rect.width) continue;
+      const style = getComputedStyle(el);
+      const top = rect.top + window.scrollY;
+      const pageIndex = Math.floor(top / pageHeightPx);
+      result.push({
+        pageIndex,
+        right: rect.right,
+        top: top - pageIndex * pageHeightPx,
+        height: rect.height,
+        fontSize: parseFloat(style.fontSize),
+        color: style.color,
+        uppercase: style.textTransform === "uppercase",
+        letterSpacing: parseFloat(style.letterSpacing) || 0,
+      });
+      el.style.color = "transparent";
+      el.style.textShadow = "none";
+    }
+    return result;
+  }, PAGE_NUMBER_SELECTOR, A4_HEIGHT_PX / pdfScale);
+
+  const factor = PX_TO_PT * pdfScale;
+  return measured.map((footer) => ({
+    pageIndex: footer.pageIndex,
+    right: footer.right * factor,
+    // Línea base aproximada: centro de la caja de texto más ~1/3 del tamaño de letra
+    baseline: (footer.top + footer.height / 2 + footer.fontSize * 0.35) * factor,
+    fontSize: footer.fontSize * factor,
+    color: parseCssColor(footer.color),
+    uppercase: footer.uppercase,
+    letterSpacing: footer.letterSpacing * factor,
+  }));
+}
+
+/**
+ * Renderiza un HTML completo en una pestaña ya abierta. Devuelve { pdf, footers }; con
+ * options.pageFooters los pies "Pag X de Y" se ocultan y footers trae su posición.
+ */
+export async function renderHtmlToPdf(page, html, options = {}) {
+  // Viewport del ancho de la hoja para que las medidas coincidan con la impresión
+  await page.setViewport({
+    width: Math.round(A4_WIDTH_PX / pdfScale),
+    height: Math.round(A4_HEIGHT_PX / pdfScale),
+  });
+  await page.emulateMediaType("print");
+  await page.setContent(html, { waitUntil: "domcontentloaded", timeout: 60000 });
+  if (options.waitForSelector) {
+    await page.waitForSelector(options.waitForSelector, { timeout: 30000 }).catch(() => {});
+  }
+  const footers = options.pageFooters ? await measureAndHideFooters(page) : [];
+  const pdf = await page.pdf({
+    format: "A4",
+    printBackground: true,
+    scale: pdfScale,
+    margin: { top: 0, right: 0, bottom: 0, left: 0 },
+  });
+  return { pdf, footers };
+}
+
+function stampPageNumber(page, font, footers, pageNumber, pageTotal) {
+  for (const footer of footers) {
+    let text = `Pag ${pageNumber} de ${pageTotal}`;
+    if (footer.uppercase) text = text.toUpperCase();
+    const options = {
+      y: page.getHeight() - footer.baseline,
+      size: footer.fontSize,
+      font,
+      color: rgb(footer.color.r, footer.color.g, footer.color.b),
+      opacity: footer.color.a,
+    };
+    const spacing = footer.letterSpacing || 0;
+    if (!spacing) {
+      page.drawText(text, { ...options, x: footer.right - font.widthOfTextAtSize(text, footer.fontSize) });
+      continue;
+    }
+    // letter-spacing: como en Chromium, el espacio va después de cada carácter
+    const widths = [...text].map((char) => font.widthOfTextAtSize(char, footer.fontSize));
+    let x = footer.right - widths.reduce((sum, width) => sum + width + spacing, 0);
+    [...text].forEach((char, i) => {
+      page.drawText(char, { ...options, x });
+      x += widths[i] + spacing;
+    });
+  }
+}
+
+// Filas del índice (index.html: --toc-top, --toc-row-height, --toc-row-gap y márgenes)
+const TOC_TOP_MM = 60;
+const TOC_ROW_HEIGHT_MM = 10;
+const TOC_ROW_GAP_MM = 2;
+const TOC_LEFT_MM = 18;
+const TOC_RIGHT_MM = 18;
+const MM_TO_PT = 72 / 25.4;
+
+function tocLinkRect(page, rowIndex) {
+  const topMm = TOC_TOP_MM + rowIndex * (TOC_ROW_HEIGHT_MM + TOC_ROW_GAP_MM);
+  const factor = MM_TO_PT * pdfScale;
+  const pageHeight = page.getHeight();
+  return [
+    TOC_LEFT_MM * factor,
+    pageHeight - (topMm + TOC_ROW_HEIGHT_MM) * factor,
+    page.getWidth() - TOC_RIGHT_MM * factor,
+    pageHeight - topMm * factor,
+  ];
+}
+
+/**
+ * Agrega al índice un enlace por fila hacia la página de su sección. targetPages
+ * mapea el target de cada entrada (intro, report, section-<categoria>...) al índice
+ * de página en el documento combinado. Devuelve la cantidad de enlaces.
+ */
+export function addTocLinks(pdfDoc, indexPageIndex, targetPages, tocEntries) {
+  const pages = pdfDoc.getPages();
+  const indexPage = pages[indexPageIndex];
+  if (!indexPage) return 0;
+  let added = 0;
+  tocEntries.forEach((entry, rowIndex) => {
+    const targetPage = pages[targetPages.get(entry.target)];
+    if (!targetPage) return;
+    const link = pdfDoc.context.obj({
+      Type: "Annot",
+      Subtype: "Link",
+      Rect: tocLinkRect(indexPage, rowIndex),
+      Border: [0, 0, 0],
+      Dest: [targetPage.ref, PDFName.of("Fit")],
+    });
+    indexPage.node.addAnnot(pdfDoc.context.register(link));
+    added += 1;
+  });
+  return added;
+}
+
+function fileToDataUrl(filePath, mime = "image/png") {
+  if (!fs.existsSync(filePath)) return "";
+  const buf = fs.readFileSync(filePath);
+  return `data:${mime};base64,${buf.toString("base64")}`;
+}
+
+function pct(n, total) {
+  if (!total) return 0;
+  return Math.round((n / total) * 100);
+}
+
+function getQuickChartUrl({ high, mid, low }) {
+  const chartConfig = {
+    type: "doughnut",
+    data: {
+      labels: ["Alto", "Medio", "Bajo"],
+      datasets: [
+        {
+          data: [high, mid, low],
+          backgroundColor: ["#ef4444", "#f97316", "#10b981"],
+          borderWidth: 0,
+        },
+      ],
+    },
+    options: {
+      cutoutPercentage: 70,
+      legend: { display: false },
+      plugins: { datalabels: { display: false } },
+    },
+  };
+  const jsonStr = JSON.stringify(chartConfig);
+  return `https://quickchart.io/chart?c=${encodeURIComponent(jsonStr)}&w=300&h=300`;
+}
+
+function normalizeText(value) {
+  if (!value) return "";
+  return String(value)
+    .normalize("NFD")
+    .replace(/[̀-ͯ]/g, "")
+    .toLowerCase();
+}
+
+function normalizeCategory(value) {
+  const norm = normalizeText(value);
+  if (!norm) return "";
+  if (norm.includes("enfermedad")) return "enfermedades";
+  if (norm.includes("farmaco")) return "farmacogenetica";
+  if (norm.includes("biomarc")) return "biomarcadores";
+  if (norm.includes("biometr")) return "biometricas";
+  if (norm.includes("rasgo")) return "rasgos";
+  return "";
+}
+
+function escapeHtml(value) {
+  return String(value ?? "")
+    .replaceAll("&", "&amp;")
+    .replaceAll("<", "&lt;")
+    .replaceAll(">", "&gt;")
+    .replaceAll("\"", "&quot;")
+    .replaceAll("'", "&#39;");
+}
+
+function fillTemplate(tpl, vars) {
+  let html = tpl.replace(/<link[^>]*fonts.googleapis[^>]*>/gi, "")
+                .replace(/<link[^>]*fonts.gstatic[^>]*>/gi, "");
+  
+  for (const [key, value] of Object.entries(vars)) {
+    const safeValue = value === undefined || value === null ? "" : String(value);
+    html = html.replaceAll(`{{${key}}}`, safeValue);
+  }
+  return html;
+}
+
+function safeText(value, fallback = "N/A") {
+  if (value === undefined || value === null) return fallback;
+  const text = String(value).trim();
+  return text.length ? text : fallback;
+}
+
+function formatPercent(value) {
+  if (value === undefined || value === null || value === "") {
+    return { display: "N/A", width: "0%", pos: "0%" };
+  }
+  const cleaned = String(value).replace("%", "").trim();
+  const num = Number(cleaned);
+  if (!Number.isFinite(num)) {
+    return { display: String(value), width: "0%", pos: "0%" };
+  }
+  const clamped = Math.max(0, Math.min(100, num));
+  const widthValue = clamped <= 0 ? 0 : Math.max(2, clamped);
+  const posValue = Math.max(2, Math.min(98, clamped));
+  const display = Number.isInteger(clamped) ? `${clamped}%` : `${clamped.toFixed(1)}%`;
+  return { display, width: `${widthValue}%`, pos: `${posValue}%` };
+}
+
+function formatRisk(value) {
+  const raw = safeText(value, "No definido");
+  const normalized = raw.toLowerCase();
+  if (normalized.startsWith("alto") || normalized === "high") {
+    return { label: "Alto", className: "risk-high" };
+  }
+  if (
+    normalized.startsWith("medio") ||
+    normalized.startsWith("inter") ||
+    normalized === "medium" ||
+    normalized === "mid"
+  ) {
+    return { label: "Medio", className: "risk-mid" };
+  }
+  if (normalized.startsWith("bajo") || normalized === "low") {
+    return { label: "Bajo", className: "risk-low" };
+  }
+  return { label: raw, className: "risk-unknown" };
+}
+
+function riskPriority(value) {
+  const normalized = String(value || "").toLowerCase();
+  if (normalized.startsWith("alto") || normalized === "high") return 3;
+  if (
+    normalized.startsWith("medio") ||
+    normalized.startsWith("inter") ||
+    normalized === "medium" ||
+    normalized === "mid"
+  ) {
+    return 2;
+  }
+  if (normalized.startsWith("bajo") || normalized === "low") return 1;
+  return 0;
+}
+
+function safeFileSegment(value, fallback) {
+  const cleaned = String(value || "")
+    .replace(/[^a-zA-Z0-9_-]/g, "")
+    .trim();
+  return cleaned.length ? cleaned : fallback;
+}
+
+function formatSectionNumber(value) {
+  const num = Number(value);
+  if (!Number.isFinite(num)) return String(value ?? "");
+  return String(num).padStart(2, "0");
+}
+
+function buildIndexRows(entries) {
+  return entries
+    .map((entry) => {
+      const number = escapeHtml(entry.number ?? "");
+      const label = escapeHtml(entry.label ?? "");
+      const page = escapeHtml(entry.page ?? "");
+      return (
+        `
+        <div class="toc-row">
+          <div class="toc-number">${number}</div>
+          <div class="toc-title">${label}</div>
+          <div class="toc-page">${page}</div>
+        </div>
+      `
+      );
+    })
+    .join("");
+}
+
+function interpolateColor(score) {
+  const c1 = [124, 58, 237];
+  const c2 = [59, 130, 246];
+  const c3 = [6, 182, 212];
+
+  const { start, end, t } = score <= 50
+    ? { start: c1, end: c2, t: score / 50 }
+    : { start: c2, end: c3, t: (score - 50) / 50 };
+
+  const r = Math.round(start[0] + (end[0] - start[0]) * t);
+  const g = Math.round(start[1] + (end[1] - start[1]) * t);
+  const b = Math.round(start[2] + (end[2] - start[2]) * t);
+
+  return `rgb(${r}, ${g}, ${b})`;
+}
+
+const icons = {
+  heart: '<svg viewBox="0 0 24 24" width="24" height="24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M20.84 4.61a5.5 5.5 0 0 0-7.78 0L12 5.67l-1.06-1.06a5.5 5.5 0 0 0-7.78 7.78l1.06 1.06L12 21.23l7.78-7.78 1.06-1.06a5.5 5.5 0 0 0 0-7.78z"></path></svg>',
+  dna: '<svg viewBox="0 0 24 24" width="24" height="24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M2 12h5"></path><path d="M17 12h5"></path><path d="M9 12h6"></path><path d="M12 2v20"></path><path d="M4.93 19.07l4.24-4.24"></path><path d="M14.83 9.17l4.24-4.24"></path><path d="M14.83 14.83l4.24 4.24"></path><path d="M4.93 4.93l4.24 4.24"></path></svg>',
+  pill: '<svg viewBox="0 0 24 24" width="24" height="24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.5 20.5l10-10a4.95 4.95 0 1 0-7-7l-10 10a4.95 4.95 0 1 0 7 7z"></path><path d="M8.5 8.5l7 7"></path></svg>',
+  eye: '<svg viewBox="0 0 24 24" width="24" height="24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M1 12s4-8 11-8 11 8 11 8-4 8-11 8-11-8-11-8z"></path><circle cx="12" cy="12" r="3"></circle></svg>',
+  body: '<svg viewBox="0 0 24 24" width="24" height="24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M20 21v-2a4 4 0 0 0-4-4H8a4 4 0 0 0-4 4v2"></path><circle cx="12" cy="7" r="4"></circle></svg>',
+};
+
+const categoryOrder = [
+  "enfermedades",
+  "farmacogenetica",
+  "biometricas",
+  "biomarcadores",
+  "rasgos",
+];
+
+const summaryPageSize = 16;
+
+const categoryMeta = {
+  enfermedades: {
+    label: "Enfermedades",
+    icon: icons.heart,
+    color: "#ef4444",
+    gradient: "linear-gradient(135deg, #ef4444, #dc2626)",
+  },
+  farmacogenetica: {
+    label: "Farmacogenetica",
+    icon: icons.pill,
+    color: "#8b5cf6",
+    gradient: "linear-gradient(135deg, #8b5cf6, #7c3aed)",
+  },
+  biomarcadores: {
+    label: "Biomarcadores",
+    icon: icons.dna,
+    color: "#10b981",
+    gradient: "linear-gradient(135deg, #10b981, #059669)",
+  },
+  biometricas: {
+    label: "Biometricas",
+    icon: icons.body,
+    color: "#0ea5e9",
+    gradient: "linear-gradient(135deg, #0ea5e9, #0284c7)",
+  },
+  rasgos: {
+    label: "Rasgos",
+    icon: icons.eye,
+    color: "#f59e0b",
+    gradient: "linear-gradient(135deg, #f59e0b, #d97706)",
+  },
+};
+
+const riskBadgeStyles = {
+  Alto: { bg: "#fef2f2", color: "#ef4444", border: "#fee2e2" },
+  Medio: { bg: "#fff7ed", color: "#f97316", border: "#fed7aa" },
+  Bajo: { bg: "#ecfdf5", color: "#10b981", border: "#d1fae5" },
+};
+
+function buildAncestrySummary(top5) {
+  const list = Array.isArray(top5) ? top5 : [];
+  const main = list[0] || { country: "N/A", pct: 0 };
+  const others = list.slice(1, 5);
+  const rowsHtml = others
+    .map((item) => {
+      const name = escapeHtml(item.country ?? "N/A");
+      const pctValue = Number(item.pct);
+      const safePct = Number.isFinite(pctValue) ? pctValue : 0;
+      return (
+        `
+        <div class="ancestry-row">
+          <div class="ancestry-name">${name}</div>
+          <div class="ancestry-val">${safePct}%</div>
+        </div>
+      `
+      );
+    })
+    .join("");
+
+  return {
+    mainCountry: escapeHtml(main.country ?? "N/A"),
+    mainPct: Number.isFinite(Number(main.pct)) ? Number(main.pct) : 0,
+    rowsHtml,
+  };
+}
+
+function buildHighlights(items, limit = 4) {
+  const sorted = items
+    .slice()
+    .sort((a, b) => {
+      const riskDiff = riskPriority(b.riesgo) - riskPriority(a.riesgo);
+      if (riskDiff !== 0) return riskDiff;
+      const magA = Number(a.magnitudEfecto) || 0;
+      const magB = Number(b.magnitudEfecto) || 0;
+      return magB - magA;
+    });
+
+  const selected = sorted.slice(0, limit);
+  if (!selected.length) {
+    return (
+      `
+      <div class="highlight-item" style="border-left-color: #cbd5e1;">
+        <div class="highlight-icon" style="background: linear-gradient(135deg, #cbd5e1, #94a3b8);">
+          ${icons.dna}
+        </div>
+        <div class="highlight-content">
+          <div class="highlight-name">Sin hallazgos relevantes</div>
+          <div class="highlight-category">No hay datos disponibles</div>
+        </div>
+      </div>
+    `
+    );
+  }
+
+  return selected
+    .map((item) => {
+      const categoryKey = normalizeCategory(item.categoria) || item.categoria;
+      const meta = categoryMeta[categoryKey] || {
+        label: "Sin clasificar",
+        icon: icons.dna,
+        color: "#64748b",
+        gradient: "linear-gradient(135deg, #94a3b8, #64748b)",
+      };
+      const risk = formatRisk(item.riesgo);
+      const badgeStyle = riskBadgeStyles[risk.label] || riskBadgeStyles.Bajo;
+      const name = escapeHtml(safeText(item.fenotipo));
+      const categoryLabel = escapeHtml(meta.label);
+
+      return (
+        `
+        <div class="highlight-item" style="border-left-color: ${meta.color};">
+          <div class="highlight-icon" style="background: ${meta.gradient};">
+            ${meta.icon}
+          </div>
+          <div class="highlight-content">
+            <div class="highlight-name">${name}</div>
+            <div class="highlight-category">${categoryLabel}</div>
+          </div>
+          <div class="highlight-badge" style="background: ${badgeStyle.bg}; color: ${badgeStyle.color}; border: 1px solid ${badgeStyle.border};">
+            ${risk.label.toUpperCase()}
+          </div>
+        </div>
+      `
+      );
+    })
+    .join("");
+}
+
+function buildAreasOverview(areas) {
+  const safeAreas = areas || {};
+  return categoryOrder
+    .map((key) => {
+      const meta = categoryMeta[key] || { label: key };
+      const counts = safeAreas[key]?.counts || { high: 0, mid: 0, low: 0 };
+      const high = Number(counts.high) || 0;
+      const mid = Number(counts.mid) || 0;
+      const low = Number(counts.low) || 0;
+
+      return (
+        `
+        <div class="area-card">
+          <div class="area-title">${escapeHtml(meta.label)}</div>
+          <div class="area-counts">
+            <div class="area-count high">${high}</div>
+            <div class="area-count mid">${mid}</div>
+            <div class="area-count low">${low}</div>
+          </div>
+        </div>
+      `
+      );
+    })
+    .join("");
+}
+
+function buildSummaryContent(items) {
+  if (!items.length) {
+    return (
+      `
+      <div class="disease-empty">
+        Sin hallazgos relevantes para esta seccion.
+      </div>
+    `
+    );
+  }
+
+  return items
+    .map((item) => {
+      const risk = formatRisk(item.riesgo);
+      const badgeClass =
+        risk.className === "risk-high"
+          ? "badge-high"
+          : risk.className === "risk-mid"
+          ? "badge-mid"
+          : "badge-low";
+      const name = escapeHtml(safeText(item.fenotipo));
+      const metaValue = escapeHtml(safeText(item.rsid));
+
+      return (
+        `
+        <div class="disease-card ${risk.className}">
+          <div class="disease-badge ${badgeClass}">${risk.label.toUpperCase()}</div>
+          <div class="disease-info">
+            <div class="disease-name">${name}</div>
+            <div class="disease-meta">Marcador ${metaValue}</div>
+          </div>
+        </div>
+      `
+      );
+    })
+    .join("");
+}
+
+function chunkItems(items, size) {
+  const chunks = [];
+  for (let i = 0; i < items.length; i += size) {
+    chunks.push(items.slice(i, i + size));
+  }
+  return chunks.length ? chunks : [[]];
+}
+
+function rebalanceChunks(chunks) {
+  if (chunks.length < 2) return chunks;
+  const last = chunks[chunks.length - 1];
+  if (last.length !== 1) return chunks;
+  const prev = chunks[chunks.length - 2];
+  const combined = prev.concat(last);
+  const splitIndex = Math.ceil(combined.length / 2);
+  const balancedPrev = combined.slice(0, splitIndex);
+  const balancedLast = combined.slice(splitIndex);
+  return [...chunks.slice(0, -2), balancedPrev, balancedLast];
+}
+
+// === TEMPLATE PARSING HELPERS ===
+function parseHtmlTemplate(htmlContent) {
+  const headMatch = htmlContent.match(/<head>([\s\S]*?)<\/head>/i);
+  const bodyMatch = htmlContent.match(/<body>([\s\S]*?)<\/body>/i);
+  const headContent = headMatch ? headMatch[1] : "";
+  const bodyContent = bodyMatch ? bodyMatch[1] : "";
+
+  // Extract style
+  const styleMatch = headContent.match(/<style>([\s\S]*?)<\/style>/i);
+  const styleContent = styleMatch ? styleMatch[1] : "";
+  const otherHead = headContent.replace(/<style>[\s\S]*?<\/style>/i, "");
+
+  return { otherHead, styleContent, bodyContent };
+}
+
+// Concurrency helper
+async function runWithLimit(items, limit, fn) {
+  const results = [];
+  const executing = [];
+  for (const item of items) {
+    const p = Promise.resolve().then(async () => {
+        const res = await fn(item);
+        // Small pause to allow GC to catch up
+        if (global.gc) global.gc(); 
+        await new Promise(r => setTimeout(r, 100));
+        return res;
+    });
+    results.push(p);
+    const e = p.then(() => executing.splice(executing.indexOf(e), 1));
+    executing.push(e);
+    if (executing.length >= limit) {
+      await Promise.race(executing);
+    }
+  }
+  return Promise.all(results);
+}
+
+
+// === TEMPLATES ===
+const template = fs.readFileSync(templatePath, "utf-8");
+const summaryTemplate = fs.readFileSync(summaryTemplatePath, "utf-8");
+const introTemplate = fs.readFileSync(introTemplatePath, "utf-8");
+const ancestryTemplate = fs.readFileSync(ancestryTemplatePath, "utf-8");
+const rsidTemplate = fs.readFileSync(rsidTemplatePath, "utf-8");
+const coverTemplate = fs.readFileSync(coverTemplatePath, "utf-8");
+const closingTemplate = fs.readFileSync(closingTemplatePath, "utf-8");
+const indexTemplate = fs.readFileSync(indexTemplatePath, "utf-8");
+const coverSectionTemplate = fs.readFileSync(coverSectionTemplatePath, "utf-8");
+
+
+const bgDataUrl = fileToDataUrl(bgPath, "image/png");
+const coverBgDataUrl = fileToDataUrl(coverBgPath, "image/png") || bgDataUrl;
+const logoDataUrl = fileToDataUrl(logoPath, "image/png") || fileToDataUrl(logoColorPath, "image/png");
+const logoColorDataUrl = fileToDataUrl(logoColorPath, "image/png") || logoDataUrl;
+
+// Parse RSID Template for batching
+const { otherHead: rsidHead, styleContent: rsidStyle, bodyContent: rsidBody } = parseHtmlTemplate(rsidTemplate);
+const rsidMultiPageStyle = `
+  ${rsidStyle}
+  html, body { height: auto !important; display: block !important; background: #f8fafc; }
+  .rsid-page { width: 210mm; height: 297mm; position: relative; overflow: hidden; background: #f8fafc; margin: 0; padding: 0; display: flex; flex-direction: column; page-break-after: always; }
+  .rsid-page:last-child { page-break-after: auto; }
+`;
+const rsidMasterTemplateStart = `<!doctype html><html lang="es"><head>${rsidHead}<style>${rsidMultiPageStyle}</style></head><body>`;
+const rsidMasterTemplateEnd = `</body></html>`;
+
+/**
+ * Renderiza el reporte completo de una persona del payload.
+ * renderPdf(html, options) convierte cada página HTML en un PDF; generate.js y
+ * render-server.js la implementan sobre su propio navegador.
+ * Solo se renderizan los fragmentos que no están en la caché (ver fragment-cache.js).
+ * El PDF sale combinado y con los enlaces del índice: Django solo lo sirve.
+ * Devuelve { reportId, bytes, tocEntries, pages, fragments } con el PDF ya combinado.
+ */
+export async function renderPerson(person, renderPdf) {
+  const masterPdfDoc = await PDFDocument.create();
+
+  // Preparation logic
+  const reportId = safeFileSegment(person.reportId, "reporte");
+  const reportLabel = person.reportId || reportId;
+  // ... (Stats calculation)
+  const snpsAnalyzed = person.summary?.snpsAnalyzed ?? 0;
+  const highCount = person.summary?.riskCounts?.high ?? 0;
+  const midCount = person.summary?.riskCounts?.mid ?? 0;
+  const lowCount = person.summary?.riskCounts?.low ?? 0;
+  const totalRelevant = highCount + midCount + lowCount || 1;
+  const highPct = pct(highCount, totalRelevant);
+  const midPct = pct(midCount, totalRelevant);
+  const lowPct = pct(lowCount, totalRelevant);
+  const coveragePct = snpsAnalyzed ? Math.min(100, Math.round((totalRelevant / snpsAnalyzed) * 100)) : 0;
+  const geneticScore = Math.max(0, Math.min(100, Math.round(100 - (highPct * 1.5 + midPct * 0.3))));
+  const markerBorderColor = interpolateColor(geneticScore);
+
+  const chartUrl = getQuickChartUrl({ high: highCount, mid: midCount, low: lowCount });
+  let donutUrl = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=";
+  try {
+      const chartRes = await fetch(chartUrl);
+      if (chartRes.ok) donutUrl = `data:image/png;base64,${Buffer.from(await chartRes.arrayBuffer()).toString("base64")}`;
+  } catch {}
+
+  const ancestryInfo = buildAncestrySummary(person.ancestryTop5 || []);
+  const highlightsHtml = buildHighlights(person.rsids || []);
+  const areasOverviewHtml = buildAreasOverview(person.areas);
+  const qrDataUrl = person.link ? await QRCode.toDataURL(person.link, { margin: 1, width: 256 }) : "";
+
+  const rsidItems = Array.isArray(person.rsids) ? person.rsids : [];
+  const rsidsByCategory = Object.fromEntries(categoryOrder.map((key) => [key, []]));
+  for (const rawItem of rsidItems) {
+    const item = rawItem || {};
+    const key = normalizeCategory(item.categoria) || item.categoria;
+    if (key && rsidsByCategory[key]) rsidsByCategory[key].push(item);
+  }
+
+  const categoryData = categoryOrder.map((categoryKey, index) => {
+      const items = rsidsByCategory[categoryKey] || [];
+      let counts = person.areas?.[categoryKey]?.counts || null;
+      if (!counts) {
+          counts = { high: 0, mid: 0, low: 0 };
+          for (const item of items) {
+              const risk = formatRisk(item.riesgo ?? item.risk);
+              if (risk.className === "risk-high") counts.high++;
+              else if (risk.className === "risk-mid") counts.mid++;
+              else counts.low++;
+          }
+      }
+      const sortedItems = items.slice().sort((a, b) => {
+          const riskDiff = riskPriority(b.riesgo) - riskPriority(a.riesgo);
+          if (riskDiff !== 0) return riskDiff;
+          return (Number(b.magnitudEfecto)||0) - (Number(a.magnitudEfecto)||0);
+      });
+      const limitedItems = maxItemsPerCategory > 0 ? sortedItems.slice(0, maxItemsPerCategory) : sortedItems;
+      const rsidItems = skipRsidPages ? [] : limitedItems;
+      const summaryChunks = rebalanceChunks(chunkItems(limitedItems, summaryPageSize));
+      return { categoryKey, counts, sortedItems, rsidItems, summaryChunks, sectionMeta: categoryMeta[categoryKey] || { label: categoryKey }, sectionNumber: formatSectionNumber(3 + index) };
+  });
+
+  const totalNumberedPages = 1 + 1 + 1 + categoryData.reduce((sum, entry) => sum + 1 + entry.summaryChunks.length + entry.rsidItems.length, 0) + 1;
+  let numberedPage = 0;
+  const nextNumberedPage = () => { numberedPage++; return numberedPage; };
+
+  // --- Build Fragment List ---
+  // Cada fragmento es una página con su HTML ya rellenado; los que llevan pie "Pag X de Y"
+  // usan un marcador y guardan el número que se estampa al combinar.
+  const placeholder = { pageNumber: PAGE_NUMBER_PLACEHOLDER, pageTotal: PAGE_NUMBER_PLACEHOLDER };
+  const fragments = [];
+  // target: destino de los enlaces del índice (el de la primera página que lo declara)
+  const addFragment = (kind, html, pageNumber = null, { renderOptions = {}, target = null } = {}) => {
+      fragments.push({ kind, html, pageNumber, renderOptions, target, key: fragmentKey(kind, html, renderOptions) });
+  };
+
+  // 1. Cover
+  addFragment("cover", fillTemplate(coverTemplate, {
+      bgDataUrl: coverBgDataUrl, logoDataUrl, name: escapeHtml(person.displayName ?? person.name ?? ""),
+      reportId: escapeHtml(reportLabel), date: escapeHtml(person.date ?? ""), qrDataUrl,
+  }));
+
+  // 2. Index
+  let displayPage = 1;
+  const tocEntries = [
+      { target: "intro", label: "Introduccion", number: formatSectionNumber(1), page: displayPage++ },
+      { target: "report", label: "Resumen genetico", number: formatSectionNumber(2), page: displayPage++ },
+      { target: "ancestry", label: "Ancestria", number: formatSectionNumber(2), page: displayPage++ }
+  ];
+  for (const d of categoryData) {
+      tocEntries.push({ target: `section-${d.categoryKey}`, label: d.sectionMeta.label, number: d.sectionNumber, page: displayPage });
+      displayPage += 1 + d.summaryChunks.length + d.rsidItems.length;
+  }
+  tocEntries.push({ target: "closing", label: "Cierre", number: "FIN", page: displayPage });
+
+  addFragment("index", fillTemplate(indexTemplate, { indexRowsHtml: buildIndexRows(tocEntries) }));
+
+  // 3. Intro
+  addFragment("intro", fillTemplate(introTemplate, {
+      bgDataUrl, logoColorDataUrl, heroNumber: formatSectionNumber(1), reportId: escapeHtml(reportLabel),
+      date: escapeHtml(person.date ?? ""), ...placeholder,
+  }), nextNumberedPage(), { target: "intro" });
+
+  // 4. Report
+  addFragment("report", fillTemplate(template, {
+      bgDataUrl, logoColorDataUrl, heroNumber: formatSectionNumber(2), name: escapeHtml(person.name ?? ""),
+      displayName: escapeHtml(person.displayName ?? person.name ?? ""), reportId: escapeHtml(reportLabel),
+      date: escapeHtml(person.date ?? ""), snpsAnalyzed, highCount, midCount, lowCount, highPct, midPct, lowPct,
+      coveragePct, donutUrl, geneticScore, markerBorderColor, ancestryMainCountry: ancestryInfo.mainCountry,
+      ancestryMainPct: ancestryInfo.mainPct, ancestrySecondaryRows: ancestryInfo.rowsHtml, highlightsHtml,
+      areasOverviewHtml, ...placeholder,
+  }), nextNumberedPage(), { target: "report" });
+
+  // 5. Ancestry
+  const ancestryDataJson = JSON.stringify(person.ancestryMap || {});
+  const indigenousDataJson = JSON.stringify(person.indigenousData || []);
+  addFragment("ancestry", fillTemplate(ancestryTemplate, {
+      bgDataUrl, logoColorDataUrl, heroNumber: formatSectionNumber(2), reportId: escapeHtml(reportLabel),
+      date: escapeHtml(person.date ?? ""), ancestryDataJson, indigenousDataJson, ...placeholder,
+  }), nextNumberedPage(), { renderOptions: { waitForSelector: ".country" }, target: "ancestry" });
+
+  // 6. Categories
+  for (const data of categoryData) {
+      addFragment("section", fillTemplate(coverSectionTemplate, {
+          sectionNumber: data.sectionNumber, sectionTitle: escapeHtml(data.sectionMeta.label), ...placeholder,
+      }), nextNumberedPage(), { target: `section-${data.categoryKey}` });
+
+      for (const chunk of data.summaryChunks) {
+          addFragment("summary", fillTemplate(summaryTemplate, {
+              bgDataUrl, logoColorDataUrl, sectionNumber: data.sectionNumber, sectionTitle: data.sectionMeta.label,
+              sectionSubtitle: `Resumen de variantes en ${data.sectionMeta.label} con su nivel de riesgo estimado.`, 
+              sectionHigh: data.counts.high ?? 0, sectionMid: data.counts.mid ?? 0, sectionLow: data.counts.low ?? 0,
+              summaryContent: buildSummaryContent(chunk), reportId: escapeHtml(reportLabel),
+              date: escapeHtml(person.date ?? ""), ...placeholder,
+          }), nextNumberedPage());
+      }
+
+      // Una página por rsID: su contenido solo depende de los datos de la variante
+      for (const item of data.rsidItems) {
+          const pctInfo = formatPercent(item.porcentajeChilenos);
+          const risk = formatRisk(item.riesgo ?? item.risk);
+          const catLabel = data.sectionMeta.label || safeText(item.categoria, "Sin clasificar");
+          addFragment("rsid", fillTemplate(rsidBody, {
+              heroNumber: "RS", rsid: escapeHtml(safeText(item.rsid)), phenotype: escapeHtml(safeText(item.fenotipo)),
+              phenotypeDescription: escapeHtml(safeText(item.phenotypeDescription, "N/D")), category: escapeHtml(catLabel),
+              riskLabel: escapeHtml(risk.label), riskClass: risk.className, source: escapeHtml(safeText(item.fuente)),
+              chilePercentDisplay: pctInfo.display, chilePercentWidth: pctInfo.width, chilePercentPos: pctInfo.pos,
+              refAllele: escapeHtml(safeText(item.aleloReferencia)), altAllele: escapeHtml(safeText(item.aleloAlternativo)),
+              chromosome: escapeHtml(safeText(item.cromosoma)), position: escapeHtml(safeText(item.posicion)),
+              ...placeholder,
+          }), nextNumberedPage());
+      }
+  }
+
+  // 7. Closing
+  addFragment("closing", fillTemplate(closingTemplate, {
+      bgDataUrl: coverBgDataUrl, logoDataUrl, displayName: escapeHtml(person.displayName ?? person.name ?? ""),
+      reportId: escapeHtml(reportLabel), date: escapeHtml(person.date ?? ""), link: escapeHtml(person.link ?? ""),
+      qrDataUrl, ...placeholder,
+  }), nextNumberedPage(), { target: "closing" });
+
+  // --- Resolve fragments: caché primero, el navegador solo para los que faltan ---
+  const resolved = new Map();
+  const missingPages = [];
+  const missingRsid = [];
+  for (const fragment of fragments) {
+      if (resolved.has(fragment.key)) continue;
+      const cached = getFragment(fragment.key);
+      if (cached) {
+          resolved.set(fragment.key, cached);
+      } else {
+          resolved.set(fragment.key, null);
+          (fragment.kind === "rsid" ? missingRsid : missingPages).push(fragment);
+      }
+  }
+
+  const storeFragment = (fragment, pdf, footers) => {
+      const entry = { pdf: Buffer.from(pdf), footers };
+      putFragment(fragment.key, entry.pdf, footers);
+      resolved.set(fragment.key, entry);
+  };
+
+  const renderSingle = async (fragment) => {
+      const html = fragment.kind === "rsid"
+          ? `${rsidMasterTemplateStart}<div class="rsid-page">${fragment.html}</div>${rsidMasterTemplateEnd}`
+          : fragment.html;
+      const { pdf, footers } = await renderPdf(html, { ...fragment.renderOptions, pageFooters: true });
+      storeFragment(fragment, pdf, footers);
+  };
+
+  const tasks = missingPages.map((fragment) => () => renderSingle(fragment));
+
+  // Las páginas de rsID faltantes se renderizan de a varias y se separan por página
+  const RSID_CHUNK_SIZE = 10;
+  for (const chunk of chunkItems(missingRsid, RSID_CHUNK_SIZE)) {
+      if (!chunk.length) continue;
+      tasks.push(async () => {
+          const inner = chunk.map((fragment) => `<div class="rsid-page">${fragment.html}</div>`).join("");
+          const fullHtml = `${rsidMasterTemplateStart}${inner}${rsidMasterTemplateEnd}`;
+          const { pdf, footers } = await renderPdf(fullHtml, { pageFooters: true });
+          const chunkDoc = await PDFDocument.load(pdf);
+          if (chunkDoc.getPageCount() !== chunk.length) {
+              // Alguna página desbordó: renderizarlas por separado
+              for (const fragment of chunk) await renderSingle(fragment);
+              return;
+          }
+          for (let i = 0; i < chunk.length; i += 1) {
+              const single = await PDFDocument.create();
+              const [copied] = await single.copyPages(chunkDoc, [i]);
+              single.addPage(copied);
+              const pageFooters = footers
+                  .filter((footer) => footer.pageIndex === i)
+                  .map((footer) => ({ ...footer, pageIndex: 0 }));
+              storeFragment(chunk[i], await single.save(), pageFooters);
+          }
+      });
+  }
+
+  // === EXECUTE ===
+  const CONCURRENCY_LIMIT = 1; // Limit 1 for 512MB RAM stability in production
+  await runWithLimit(tasks, CONCURRENCY_LIMIT, t => t());
+
+  // === ASSEMBLE ===
+  const footerFont = await masterPdfDoc.embedFont(StandardFonts.Helvetica);
+  const targetPages = new Map();
+  let indexPageIndex = null;
+  for (const fragment of fragments) {
+      const entry = resolved.get(fragment.key);
+      const chunkDoc = await PDFDocument.load(entry.pdf);
+      const firstPageIndex = masterPdfDoc.getPageCount();
+      if (fragment.kind === "index" && indexPageIndex === null) indexPageIndex = firstPageIndex;
+      if (fragment.target && !targetPages.has(fragment.target)) targetPages.set(fragment.target, firstPageIndex);
+
+      const copied = await masterPdfDoc.copyPages(chunkDoc, chunkDoc.getPageIndices());
+      copied.forEach((p, i) => {
+          masterPdfDoc.addPage(p);
+          if (fragment.pageNumber !== null) {
+              const pageFooters = entry.footers.filter((footer) => footer.pageIndex === i);
+              stampPageNumber(p, footerFont, pageFooters, fragment.pageNumber, totalNumberedPages);
+          }
+      });
+  }
+
+  if (indexPageIndex !== null) addTocLinks(masterPdfDoc, indexPageIndex, targetPages, tocEntries);
+
+  const bytes = await masterPdfDoc.save();
+  return {
+      reportId,
+      bytes,
+      tocEntries,
+      pages: masterPdfDoc.getPageCount(),
+      fragments: { total: fragments.length, rendered: missingPages.length + missingRsid.length },
+  };
+}
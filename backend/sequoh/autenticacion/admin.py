@@ -10,7 +10,11 @@ from .models import (
     SNP,
     UserSNP,
     RsidExtraInfo,
+    GenotypeImportJob,
+    ReportJob,
+    EmailOutbox,
 )
+from .catalog_index import EXTRA_INFO_CATALOG, bump_catalog_revision, refresh_preferred_snps
 
 
 class ProfileInline(admin.StackedInline):
@@ -113,7 +117,7 @@ class SNPAdmin(admin.ModelAdmin):
         'rsid', 'genotipo', 'cromosoma', 'posicion', 
         'nivel_riesgo', 'magnitud_efecto', 'categoria', 
         'continente', 'pais', 'af_continente', 'af_pais',
-        'fuente_base_datos', 'fenotipo_preview'
+        'prioridad', 'fuente_base_datos', 'fenotipo_preview'
     )
     list_filter = (
         'categoria', 'nivel_riesgo', 'cromosoma', 
@@ -151,6 +155,20 @@ class SNPAdmin(admin.ModelAdmin):
         return obj.fenotipo[:50] + '...' if len(obj.fenotipo) > 50 else obj.fenotipo
     fenotipo_preview.short_description = 'Fenotipo (preview)'
 
+    # Los cambios desde el admin recalculan los SNPs preferidos de los rsID afectados
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        refresh_preferred_snps({obj.rsid, form.initial.get('rsid')})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_preferred_snps({obj.rsid})
+
+    def delete_queryset(self, request, queryset):
+        rsids = set(queryset.values_list('rsid', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_preferred_snps(rsids)
+
 
 @admin.register(UserSNP)
 class UserSNPAdmin(admin.ModelAdmin):
@@ -177,3 +195,49 @@ class RsidExtraInfoAdmin(admin.ModelAdmin):
     list_display = ('rs_id', 'genotype', 'phenotype_name', 'freq_chile_percent')
     search_fields = ('rs_id', 'genotype', 'phenotype_name')
     ordering = ('rs_id', 'genotype')
+
+    # Invalida la caché de rsid_extra_info de todos los procesos (ver extra_info_cache.py)
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_catalog_revision(EXTRA_INFO_CATALOG)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_catalog_revision(EXTRA_INFO_CATALOG)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_catalog_revision(EXTRA_INFO_CATALOG)
+
+
+@admin.register(GenotypeImportJob)
+class GenotypeImportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'user', 'filename', 'status', 'lines_processed', 'total_lines',
+        'snps_added', 'snps_skipped', 'created_at', 'finished_at'
+    )
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__username', 'user__email', 'filename')
+    raw_id_fields = ('user', 'requested_by')
+    readonly_fields = ('created_at', 'started_at', 'updated_at', 'finished_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__username', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('payload_digest', 'created_at', 'started_at', 'updated_at', 'finished_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'subject')
+    exclude = ('raw_message',)
+    readonly_fields = ('gmail_message_id', 'error_message', 'created_at', 'updated_at', 'sent_at')
+    ordering = ('-created_at',)
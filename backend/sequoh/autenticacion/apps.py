@@ -7,6 +7,6 @@ class AutenticacionConfig(AppConfig):
 
     def ready(self):
         from . import signals  # noqa: F401
-
-    def ready(self):
-        from . import signals  # noqa: F401
+        # Registra las colas del worker en segundo plano
+        from . import upload_jobs  # noqa: F401
+        from . import email_outbox  # noqa: F401
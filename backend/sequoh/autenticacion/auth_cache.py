@@ -0,0 +1,145 @@
+"""
+Caché de usuarios autenticados por JWT.
+
+El token lleva firmados los roles del usuario ("roles") y la versión de sus credenciales
+("av", UserAuthState.auth_version). JWTAuthentication sirve el usuario desde una caché en
+memoria del proceso y solo vuelve a la BD cuando la entrada tiene más de
+AUTH_CACHE_TTL_SECONDS o cuando el token trae una versión más nueva que la cacheada.
+
+Cambiar la contraseña, los grupos o los flags is_staff/is_superuser/is_active incrementa
+la versión (ver signals.py): desde ese momento los tokens anteriores se rechazan. En el
+proceso que hizo el cambio el efecto es inmediato; en los demás, a más tardar al vencer
+su entrada de la caché.
+"""
+
+import copy
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import exceptions
+
+from .models import UserAuthState
+from .roles import group_names, set_group_names
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 10
+DEFAULT_MAX_ENTRIES = 5000
+
+# user_id -> (usuario, versión, grupos, momento de carga)
+_users = {}
+_users_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, 'AUTH_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+
+
+def current_auth_version(user_id):
+    return (
+        UserAuthState.objects.filter(user_id=user_id)
+        .values_list('auth_version', flat=True)
+        .first()
+    ) or 0
+
+
+def bump_auth_version(user_id):
+    """Invalida los tokens emitidos hasta ahora para el usuario."""
+    updated = UserAuthState.objects.filter(user_id=user_id).update(
+        auth_version=F('auth_version') + 1,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                UserAuthState.objects.create(user_id=user_id, auth_version=1)
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo
+            UserAuthState.objects.filter(user_id=user_id).update(
+                auth_version=F('auth_version') + 1,
+                updated_at=timezone.now()
+            )
+    forget_user(user_id)
+    logger.info(f"Versión de autenticación del usuario {user_id} incrementada")
+
+
+def forget_user(user_id):
+    with _users_lock:
+        _users.pop(int(user_id), None)
+
+
+def token_claims(user):
+    """Claims del JWT de sesión: identidad, roles y versión de credenciales."""
+    return {
+        "sub": str(user.id),
+        "email": user.email,
+        "roles": sorted(group_names(user)),
+        "av": current_auth_version(user.id),
+    }
+
+
+def _load_user(user_id):
+    """Usuario, grupos y versión de credenciales en una sola consulta."""
+    rows = list(
+        User.objects.filter(pk=user_id).annotate(
+            group_name=F('groups__name'),
+            current_auth_version=Coalesce(F('auth_state__auth_version'), Value(0)),
+        )
+    )
+    if not rows:
+        raise User.DoesNotExist
+    user = rows[0]
+    names = frozenset(row.group_name for row in rows if row.group_name)
+    return user, user.current_auth_version, names
+
+
+def _remember(user_id, user, version, names):
+    max_entries = getattr(settings, 'AUTH_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    with _users_lock:
+        if len(_users) >= max_entries:
+            _users.clear()
+        _users[user_id] = (user, version, names, time.monotonic())
+
+
+def get_authenticated_user(payload):
+    """
+    Usuario del token ya validado. Lanza AuthenticationFailed si el usuario no existe o
+    si el token es anterior al último cambio de credenciales.
+    """
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        raise exceptions.AuthenticationFailed("Invalid token payload")
+    token_version = payload.get("av", 0)
+
+    with _users_lock:
+        entry = _users.get(user_id)
+    if entry is not None:
+        cached_user, version, names, loaded_at = entry
+        if time.monotonic() - loaded_at > _ttl() or token_version > version:
+            entry = None
+
+    if entry is None:
+        try:
+            cached_user, version, names = _load_user(user_id)
+        except User.DoesNotExist:
+            forget_user(user_id)
+            raise exceptions.AuthenticationFailed("User not found")
+        _remember(user_id, cached_user, version, names)
+
+    if token_version != version:
+        raise exceptions.AuthenticationFailed("Token revocado, inicia sesión nuevamente")
+
+    # Copia por petición: las vistas pueden modificar el usuario sin tocar la caché
+    user = copy.copy(cached_user)
+    roles = payload.get("roles")
+    # Con la versión vigente, los roles firmados son los mismos que los de la BD
+    set_group_names(user, roles if roles is not None else names)
+    return user
@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
 from rest_framework import exceptions
 from .jwt_utils import decode_jwt
+from .auth_cache import get_authenticated_user
 
 
 class JWTAuthentication(BaseAuthentication):
@@ -23,11 +24,7 @@ class JWTAuthentication(BaseAuthentication):
         except Exception as e:
             raise exceptions.AuthenticationFailed("Invalid token")
 
-        user_id = payload.get("sub")
-        if not user_id:
+        if not payload.get("sub"):
             raise exceptions.AuthenticationFailed("Invalid token payload")
-        try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            raise exceptions.AuthenticationFailed("User not found")
-        return (user, token)
+        # Usuario desde la caché del proceso; los roles vienen firmados en el token
+        return (get_authenticated_user(payload), token)
@@ -0,0 +1,127 @@
+"""
+Worker en segundo plano respaldado por la base de datos (sin broker externo).
+
+Cada cola se registra con register_queue(nombre, handler); el handler toma y procesa
+UN trabajo pendiente y devuelve True si encontró alguno. Los trabajos viven en tablas
+propias (p.ej. GenotypeImportJob), por lo que sobreviven a reinicios del proceso.
+
+Las colas se agrupan en workers: cada worker drena sus colas en su propio hilo. Las
+importaciones y los informes comparten el worker por defecto; las colas de trabajos
+cortos (p.ej. los correos) usan uno propio para no esperar detrás de un render o de una
+importación de varios minutos.
+
+Hay dos formas de drenar las colas:
+- kick_worker(): lanza el hilo del worker dentro del proceso web tras el commit de la
+  transacción actual (BACKGROUND_INLINE_WORKER=True, valor por defecto).
+- python manage.py run_worker: proceso dedicado que consulta las colas periódicamente,
+  con un hilo por worker.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKER = 'default'
+
+# nombre de la cola -> (worker, handler)
+_handlers = {}
+_lock = threading.Lock()
+# worker -> hilo activo; workers a los que se pidió volver a revisar sus colas
+_worker_threads = {}
+_rerun_requested = set()
+
+
+def register_queue(name, handler, worker=DEFAULT_WORKER):
+    """Registra el handler de una cola. Registrar dos veces el mismo nombre lo reemplaza."""
+    _handlers[name] = (worker, handler)
+
+
+def worker_names():
+    """Workers con al menos una cola registrada."""
+    return sorted({worker for worker, _ in _handlers.values()})
+
+
+def drain_queues(worker=None):
+    """
+    Procesa trabajos de las colas registradas (solo las de `worker`, si se indica) hasta
+    que ninguna tenga pendientes. Devuelve la cantidad de trabajos procesados.
+    """
+    processed = 0
+    while True:
+        found_work = False
+        for name, (queue_worker, handler) in list(_handlers.items()):
+            if worker is not None and queue_worker != worker:
+                continue
+            try:
+                if handler():
+                    found_work = True
+                    processed += 1
+            except Exception as e:
+                logger.error(f"Error en la cola '{name}': {str(e)}", exc_info=True)
+        if not found_work:
+            return processed
+
+
+def inline_worker_enabled():
+    return getattr(settings, 'BACKGROUND_INLINE_WORKER', True)
+
+
+def kick_worker(worker=DEFAULT_WORKER):
+    """
+    Despierta al worker en proceso una vez confirmada la transacción actual, para que
+    el trabajo recién encolado ya sea visible. Si hay un worker dedicado
+    (BACKGROUND_INLINE_WORKER=False) no hace nada.
+    """
+    if not inline_worker_enabled():
+        return
+    transaction.on_commit(lambda: _start_worker_thread(worker))
+
+
+def kick_worker_after(seconds, worker=DEFAULT_WORKER):
+    """
+    Vuelve a despertar al worker en proceso pasados `seconds` segundos, p.ej. cuando un
+    trabajo se reprograma para más tarde. El temporizador no sobrevive a un reinicio: el
+    trabajo se retoma con el siguiente kick_worker o con run_worker.
+    """
+    if not inline_worker_enabled():
+        return
+    timer = threading.Timer(seconds, _start_worker_thread, args=(worker,))
+    timer.daemon = True
+    timer.start()
+
+
+def _start_worker_thread(worker=DEFAULT_WORKER):
+    with _lock:
+        thread = _worker_threads.get(worker)
+        if thread is not None and thread.is_alive():
+            # El hilo activo volverá a revisar las colas antes de terminar
+            _rerun_requested.add(worker)
+            return
+        _rerun_requested.discard(worker)
+        thread = threading.Thread(
+            target=_worker_loop, args=(worker,), name=f'background-worker-{worker}', daemon=True
+        )
+        _worker_threads[worker] = thread
+        thread.start()
+
+
+def _worker_loop(worker):
+    try:
+        while True:
+            drain_queues(worker)
+            with _lock:
+                if worker not in _rerun_requested:
+                    _worker_threads.pop(worker, None)
+                    return
+                _rerun_requested.discard(worker)
+    except Exception as e:
+        logger.error(f"Error en el worker en segundo plano '{worker}': {str(e)}", exc_info=True)
+        with _lock:
+            _worker_threads.pop(worker, None)
+    finally:
+        # El hilo abre sus propias conexiones: cerrarlas para no dejarlas colgando
+        connections.close_all()
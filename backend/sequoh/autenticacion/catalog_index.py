@@ -0,0 +1,236 @@
+"""
+Índice compilado del catálogo de SNPs, mantenido en memoria por proceso.
+
+Resuelve (rsid, genotipo normalizado) al SNP preferido con un acceso a diccionario.
+La preferencia es la misma que aplicaba el Case/When en SQL: Chile, luego América,
+luego filas con población o país; a igual prioridad gana la mayor af_pais (nulos al
+final) y después el id menor.
+
+El ganador de cada par se persiste en la tabla preferred_snps (y la prioridad de cada
+fila en SNP.prioridad) mediante rebuild_preferred_snps(), que los cargadores del
+catálogo ejecutan al terminar. Eso incrementa CatalogRevision y cada proceso recarga
+su copia en memoria cuando detecta otra revisión.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, When
+from django.utils import timezone
+
+from .models import CatalogRevision, PreferredSNP, SNP
+from .system_stats import refresh_variants_count
+
+logger = logging.getLogger(__name__)
+
+SNP_CATALOG = 'snps'
+EXTRA_INFO_CATALOG = 'rsid_extra_info'
+DEFAULT_CHECK_SECONDS = 5
+
+# key -> (revisión, momento de la última consulta)
+_revision_cache = {}
+
+
+def get_catalog_revision(key=SNP_CATALOG):
+    """Revisión actual de un catálogo (0 si nunca se ha incrementado)."""
+    revision = CatalogRevision.objects.filter(key=key).values_list('revision', flat=True).first()
+    return revision or 0
+
+
+def cached_catalog_revision(key=SNP_CATALOG):
+    """
+    Revisión de un catálogo consultada como máximo cada CATALOG_INDEX_CHECK_SECONDS por
+    proceso; sirve para validar cachés en cada request sin una consulta adicional.
+    """
+    check_seconds = getattr(settings, 'CATALOG_INDEX_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+    now = time.monotonic()
+    cached = _revision_cache.get(key)
+    if cached is not None and now - cached[1] < check_seconds:
+        return cached[0]
+    revision = get_catalog_revision(key)
+    _revision_cache[key] = (revision, now)
+    return revision
+
+
+def bump_catalog_revision(key=SNP_CATALOG):
+    """Incrementa la revisión de un catálogo para invalidar las cachés de todos los procesos."""
+    updated = CatalogRevision.objects.filter(key=key).update(
+        revision=F('revision') + 1,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                CatalogRevision.objects.create(key=key, revision=1)
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo
+            CatalogRevision.objects.filter(key=key).update(
+                revision=F('revision') + 1,
+                updated_at=timezone.now()
+            )
+    _revision_cache.pop(key, None)
+    if key == SNP_CATALOG:
+        # variants_count de las estadísticas de administración
+        refresh_variants_count()
+    logger.info(f"Revisión del catálogo '{key}' incrementada")
+
+
+def snp_priority_order():
+    """
+    Prioridad de filas del catálogo para un mismo rsid/genotipo: Chile, luego América,
+    luego filas con población o país. Menor valor = mejor candidato.
+    """
+    return Case(
+        When(pais__iexact='Chile', then=0),
+        When(continente__icontains='america', then=1),
+        When(poblacion_pais__isnull=False, then=2),
+        When(pais__isnull=False, then=3),
+        default=4,
+        output_field=IntegerField()
+    )
+
+
+def snp_priority(pais, continente, poblacion_pais):
+    """Equivalente en Python de snp_priority_order (menor = mejor)."""
+    if pais is not None and pais.lower() == 'chile':
+        return 0
+    if continente is not None and 'america' in continente.lower():
+        return 1
+    if poblacion_pais is not None:
+        return 2
+    if pais is not None:
+        return 3
+    return 4
+
+
+def _preference_rank(snp_id, pais, continente, poblacion_pais, af_pais):
+    return (
+        snp_priority(pais, continente, poblacion_pais),
+        af_pais is None,
+        -(af_pais or 0),
+        snp_id,
+    )
+
+
+def compute_preferred_snps(queryset=None):
+    """Calcula {(rsid, genotipo): snp_id} con el SNP preferido de cada par."""
+    queryset = SNP.objects.all() if queryset is None else queryset
+    best = {}
+    rows = queryset.values_list(
+        'id', 'rsid', 'genotipo', 'pais', 'continente', 'poblacion_pais', 'af_pais'
+    ).iterator(chunk_size=5000)
+    for snp_id, rsid, genotipo, pais, continente, poblacion_pais, af_pais in rows:
+        rank = _preference_rank(snp_id, pais, continente, poblacion_pais, af_pais)
+        key = (rsid, genotipo)
+        current = best.get(key)
+        if current is None or rank < current[0]:
+            best[key] = (rank, snp_id)
+    return {key: snp_id for key, (_, snp_id) in best.items()}
+
+
+def refresh_preferred_snps(rsids=None):
+    """
+    Recalcula SNP.prioridad y la tabla preferred_snps. Con rsids solo se recalculan
+    esos rsID (ediciones puntuales); sin rsids se reconstruye todo el catálogo.
+    Incrementa la revisión del catálogo al terminar.
+    """
+    snps = SNP.objects.all()
+    preferred = PreferredSNP.objects.all()
+    if rsids is not None:
+        rsids = {rsid for rsid in rsids if rsid}
+        if not rsids:
+            return 0
+        snps = snps.filter(rsid__in=rsids)
+        preferred = preferred.filter(rsid__in=rsids)
+
+    with transaction.atomic():
+        snps.update(prioridad=snp_priority_order())
+        winners = compute_preferred_snps(snps)
+        preferred.delete()
+        PreferredSNP.objects.bulk_create(
+            [
+                PreferredSNP(rsid=rsid, genotipo=genotipo, snp_id=snp_id)
+                for (rsid, genotipo), snp_id in winners.items()
+            ],
+            batch_size=2000,
+        )
+        bump_catalog_revision()
+    return len(winners)
+
+
+def rebuild_preferred_snps():
+    """Reconstruye la tabla preferred_snps completa. Devuelve la cantidad de pares."""
+    count = refresh_preferred_snps()
+    logger.info(f"Tabla preferred_snps reconstruida: {count} pares rsid/genotipo")
+    return count
+
+
+class CatalogIndex:
+    """Mapa (rsid, genotipo) -> id del SNP preferido, para una revisión del catálogo."""
+
+    def __init__(self, revision, preferred):
+        self.revision = revision
+        self.preferred = preferred
+
+    def __len__(self):
+        return len(self.preferred)
+
+    def lookup(self, rsid, genotipo):
+        return self.preferred.get((rsid, genotipo))
+
+    @classmethod
+    def build(cls, revision):
+        preferred = {
+            (rsid, genotipo): snp_id
+            for rsid, genotipo, snp_id in PreferredSNP.objects.values_list(
+                'rsid', 'genotipo', 'snp_id'
+            ).iterator(chunk_size=5000)
+        }
+        if not preferred and SNP.objects.exists():
+            # preferred_snps aún no se ha construido: calcular desde el catálogo
+            logger.warning(
+                "La tabla preferred_snps está vacía; ejecuta 'python manage.py rebuild_preferred_snps'"
+            )
+            preferred = compute_preferred_snps()
+        return cls(revision, preferred)
+
+
+_lock = threading.Lock()
+_index = None
+_checked_at = 0.0
+
+
+def get_catalog_index(check_revision=False):
+    """
+    Devuelve el índice del proceso, recargándolo si la revisión del catálogo cambió.
+    La revisión se consulta como máximo cada CATALOG_INDEX_CHECK_SECONDS, salvo que se
+    pida check_revision=True (p.ej. al inicio de una importación).
+    """
+    global _index, _checked_at
+    check_seconds = getattr(settings, 'CATALOG_INDEX_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+    now = time.monotonic()
+    index = _index
+    if index is not None and not check_revision and now - _checked_at < check_seconds:
+        return index
+
+    revision = get_catalog_revision()
+    with _lock:
+        _checked_at = now
+        if _index is None or _index.revision != revision:
+            started = time.monotonic()
+            _index = CatalogIndex.build(revision)
+            logger.info(
+                f"Índice del catálogo cargado: {len(_index)} pares rsid/genotipo "
+                f"(revisión {revision}, {time.monotonic() - started:.2f}s)"
+            )
+        return _index
+
+
+def invalidate_catalog_index():
+    """Descarta la copia del proceso; la siguiente consulta la recarga."""
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,169 @@
+"""
+Cola de correos salientes (EmailOutbox).
+
+send_email guarda el mensaje MIME ya armado y vuelve de inmediato, así que registro,
+recuperación de contraseña, recepción y carga de archivos no esperan a Gmail. El worker
+en segundo plano toma los pendientes en lotes de EMAIL_OUTBOX_BATCH_SIZE y los envía
+con el cliente de Gmail compartido del proceso (email_utils.get_gmail_service): el token
+se lee y el cliente se construye una vez por proceso, no por correo. La cola tiene su
+propio worker (hilo), así que un correo no espera detrás de una importación o un render.
+
+Un envío fallido se reintenta con espera exponencial (EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+duplicándose en cada intento hasta EMAIL_OUTBOX_RETRY_MAX_SECONDS) hasta
+EMAIL_OUTBOX_MAX_ATTEMPTS intentos; un mensaje que Gmail rechaza por inválido (400) no se
+reintenta. Los correos que quedaron RUNNING porque el proceso murió vuelven a la cola
+tras EMAIL_OUTBOX_STALE_SECONDS. Justo antes de cada envío el worker renueva su reclamo
+sobre el correo (updated_at) y lo omite si ya no es suyo, así que un lote lento no se
+envía dos veces; cada llamada a Gmail tiene el timeout EMAIL_GMAIL_TIMEOUT_SECONDS.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from google.auth.exceptions import RefreshError
+
+from .background import kick_worker, kick_worker_after, register_queue
+from .email_utils import reset_gmail_service, send_raw_message
+from .models import EmailOutbox, ImportJobStatus
+
+logger = logging.getLogger(__name__)
+
+QUEUE_NAME = 'email_outbox'
+WORKER_NAME = 'email'
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BASE_SECONDS = 60
+DEFAULT_RETRY_MAX_SECONDS = 60 * 60
+DEFAULT_STALE_SECONDS = 10 * 60
+
+
+def enqueue_email(to_email, subject, raw_message):
+    """Deja el mensaje en la cola; se envía una vez confirmada la transacción actual."""
+    message = EmailOutbox.objects.create(
+        to_email=to_email,
+        subject=(subject or '')[:255],
+        raw_message=raw_message,
+    )
+    logger.info(f"Email encolado: id={message.pk}, destinatario={to_email}, asunto={subject}")
+    kick_worker(WORKER_NAME)
+    return message
+
+
+def _requeue_stale_messages():
+    """Devuelve a la cola los envíos RUNNING que no terminaron (p.ej. el proceso murió)."""
+    stale_seconds = getattr(settings, 'EMAIL_OUTBOX_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+    now = timezone.now()
+    requeued = EmailOutbox.objects.filter(
+        status=ImportJobStatus.RUNNING,
+        updated_at__lt=now - timedelta(seconds=stale_seconds),
+    ).update(status=ImportJobStatus.PENDING, next_attempt_at=now, updated_at=now)
+    if requeued:
+        logger.warning(f"{requeued} correos sin terminar devueltos a la cola")
+
+
+def claim_batch():
+    """Toma hasta EMAIL_OUTBOX_BATCH_SIZE correos listos para enviar, los más antiguos primero."""
+    _requeue_stale_messages()
+    batch_size = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    now = timezone.now()
+    candidate_ids = list(
+        EmailOutbox.objects.filter(status=ImportJobStatus.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    # Reclamo condicional por fila: si otro worker ya tomó un correo, se omite
+    claimed_ids = [
+        message_id for message_id in candidate_ids
+        if EmailOutbox.objects.filter(pk=message_id, status=ImportJobStatus.PENDING).update(
+            status=ImportJobStatus.RUNNING,
+            updated_at=now,
+        )
+    ]
+    if not claimed_ids:
+        return []
+    return list(EmailOutbox.objects.filter(pk__in=claimed_ids).order_by('next_attempt_at', 'id'))
+
+
+def retry_delay(attempts):
+    """Espera antes del siguiente intento: base, 2*base, 4*base... hasta el máximo."""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE_SECONDS', DEFAULT_RETRY_BASE_SECONDS)
+    maximum = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX_SECONDS', DEFAULT_RETRY_MAX_SECONDS)
+    return min(maximum, base * 2 ** max(0, attempts - 1))
+
+
+def _http_status(error):
+    return getattr(getattr(error, 'resp', None), 'status', None)
+
+
+def _renew_claim(message):
+    """
+    Renueva el reclamo justo antes de enviar. Si entretanto el correo volvió a la cola
+    por inactivo (y quizá lo tomó otro worker), updated_at ya no coincide y se omite.
+    """
+    now = timezone.now()
+    renewed = EmailOutbox.objects.filter(
+        pk=message.pk,
+        status=ImportJobStatus.RUNNING,
+        updated_at=message.updated_at,
+    ).update(updated_at=now)
+    if renewed:
+        message.updated_at = now
+    return bool(renewed)
+
+
+def deliver_message(message):
+    """
+    Envía un correo reclamado y deja su estado final o lo reprograma. Devuelve los
+    segundos hasta el reintento, o None si ya no queda pendiente.
+    """
+    if not _renew_claim(message):
+        logger.warning(f"Email {message.pk} ya no está reclamado por este worker; se omite")
+        return None
+    now = timezone.now()
+    message.attempts += 1
+    retry_in = None
+    try:
+        result = send_raw_message(message.raw_message)
+        message.status = ImportJobStatus.COMPLETED
+        message.gmail_message_id = (result or {}).get('id', '') or ''
+        message.error_message = ''
+        message.sent_at = now
+        logger.info(f"Email enviado a {message.to_email} - asunto: {message.subject} - id: {message.gmail_message_id}")
+    except Exception as e:
+        status_code = _http_status(e)
+        if status_code == 401 or isinstance(e, RefreshError):
+            # Token revocado o vencido sin posibilidad de refresco: recargar en el próximo envío
+            reset_gmail_service()
+        max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        message.error_message = str(e)
+        if status_code == 400 or message.attempts >= max_attempts:
+            message.status = ImportJobStatus.FAILED
+            logger.error(f"Error enviando email {message.pk} a {message.to_email} (intento {message.attempts}, sin más reintentos): {e}")
+        else:
+            retry_in = retry_delay(message.attempts)
+            message.status = ImportJobStatus.PENDING
+            message.next_attempt_at = now + timedelta(seconds=retry_in)
+            logger.warning(f"Error enviando email {message.pk} a {message.to_email} (intento {message.attempts}), reintento en {retry_in} s: {e}")
+
+    message.updated_at = timezone.now()
+    message.save(update_fields=[
+        'status', 'attempts', 'next_attempt_at', 'error_message', 'gmail_message_id', 'sent_at', 'updated_at',
+    ])
+    return retry_in
+
+
+def process_email_batch():
+    """Handler de la cola: envía un lote de correos pendientes con un mismo cliente de Gmail."""
+    batch = claim_batch()
+    if not batch:
+        return False
+    retries = {deliver_message(message) for message in batch} - {None}
+    # El worker en proceso solo despierta con nuevos trabajos: programar los reintentos
+    for delay in sorted(retries):
+        kick_worker_after(delay, WORKER_NAME)
+    return True
+
+
+register_queue(QUEUE_NAME, process_email_batch, worker=WORKER_NAME)
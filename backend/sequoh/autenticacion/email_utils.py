@@ -14,6 +14,8 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from email.utils import parseaddr, formataddr
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
@@ -23,6 +25,7 @@ import os
 import json
 import logging
 import tempfile
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +33,7 @@ logger = logging.getLogger(__name__)
 #   Configuración Gmail
 # =========================
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
+DEFAULT_GMAIL_TIMEOUT_SECONDS = 30
 
 # =========================
 #   Branding & UI tokens
@@ -231,13 +235,49 @@ def text_block(*lines: str) -> str:
 # =========================
 #   Gmail Service & Send
 # =========================
-def get_gmail_service():
+# Cliente de Gmail compartido por el proceso: el token se lee y el cliente se construye
+# una sola vez. Si las credenciales expiran se refrescan en el mismo objeto (el cliente ya
+# lo referencia); solo se vuelven a cargar si no se pueden refrescar o tras
+# reset_gmail_service. El lock también serializa los envíos, porque el cliente HTTP
+# (httplib2) no es seguro entre hilos.
+_gmail_lock = threading.RLock()
+_gmail_service = None
+_gmail_creds = None
+
+
+def _gmail_token_sources():
+    token_path = getattr(settings, 'GMAIL_TOKEN_FILE', os.path.join(settings.BASE_DIR, 'config', 'token.json'))
+    token_json_env = os.environ.get('GMAIL_TOKEN_JSON') or getattr(settings, 'GMAIL_TOKEN_JSON', None)
+    return token_path, token_json_env
+
+
+def _refresh_gmail_credentials(creds) -> bool:
+    """Refresca un token expirado y lo guarda si viene de archivo. Devuelve True si quedó válido."""
+    token_path, token_json_env = _gmail_token_sources()
+    try:
+        creds.refresh(Request())
+        logger.info("Gmail: token refrescado correctamente")
+    except Exception as e:
+        logger.error(f"Gmail: error refrescando token: {e}")
+        return False
+    # Guardar token refrescado solo si estamos trabajando con archivo (no sobreescribimos ENV)
+    if not token_json_env:
+        try:
+            os.makedirs(os.path.dirname(token_path), exist_ok=True)
+            with open(token_path, 'w', encoding='utf-8') as f:
+                f.write(creds.to_json())
+            logger.info("Gmail: token refrescado guardado en archivo")
+        except Exception as e:
+            logger.warning(f"Gmail: no se pudo guardar el token refrescado: {e}")
+    return creds.valid
+
+
+def _load_gmail_credentials():
     creds = None
     cred_path = getattr(settings, 'GMAIL_CREDENTIALS_FILE', os.path.join(settings.BASE_DIR, 'config', 'credentials.json'))
-    token_path = getattr(settings, 'GMAIL_TOKEN_FILE', os.path.join(settings.BASE_DIR, 'config', 'token.json'))
+    token_path, token_json_env = _gmail_token_sources()
 
     # Permitir credenciales desde variables de entorno (más cómodo en producción)
-    token_json_env = os.environ.get('GMAIL_TOKEN_JSON') or getattr(settings, 'GMAIL_TOKEN_JSON', None)
     cred_json_env = os.environ.get('GMAIL_CREDENTIALS_JSON') or getattr(settings, 'GMAIL_CREDENTIALS_JSON', None)
 
     logger.info(f"Gmail: cred_path={cred_path} token_path={token_path} token_env={'yes' if token_json_env else 'no'}")
@@ -267,20 +307,7 @@ def get_gmail_service():
     # 3) Si está expirado pero tiene refresh_token, intentar refrescar
     if creds and not creds.valid:
         if creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-                logger.info("Gmail: token refrescado correctamente")
-                # Guardar token refrescado solo si estamos trabajando con archivo (no sobreescribimos ENV)
-                if not token_json_env:
-                    try:
-                        os.makedirs(os.path.dirname(token_path), exist_ok=True)
-                        with open(token_path, 'w', encoding='utf-8') as f:
-                            f.write(creds.to_json())
-                        logger.info("Gmail: token refrescado guardado en archivo")
-                    except Exception as e:
-                        logger.warning(f"Gmail: no se pudo guardar el token refrescado: {e}")
-            except Exception as e:
-                logger.error(f"Gmail: error refrescando token: {e}")
+            _refresh_gmail_credentials(creds)
 
     # 4) Si sigue inválido, decidir según entorno
     if not creds or not creds.valid:
@@ -322,7 +349,92 @@ def get_gmail_service():
                 "Provee GMAIL_TOKEN_JSON (ENV) con refresh_token válido o GMAIL_TOKEN_FILE apuntando a token.json."
             )
 
-    return build('gmail', 'v1', credentials=creds)
+    return creds
+
+
+def get_gmail_service():
+    """Cliente de Gmail del proceso; lo construye la primera vez y refresca el token solo al expirar."""
+    global _gmail_service, _gmail_creds
+    with _gmail_lock:
+        if _gmail_service is not None:
+            if _gmail_creds.valid:
+                return _gmail_service
+            if _gmail_creds.expired and _gmail_creds.refresh_token and _refresh_gmail_credentials(_gmail_creds):
+                return _gmail_service
+        creds = _load_gmail_credentials()
+        # Timeout explícito: un envío colgado no debe retener el worker ni el reclamo del correo
+        timeout = getattr(settings, 'EMAIL_GMAIL_TIMEOUT_SECONDS', DEFAULT_GMAIL_TIMEOUT_SECONDS)
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=timeout))
+        _gmail_service = build('gmail', 'v1', http=http)
+        _gmail_creds = creds
+        return _gmail_service
+
+
+def reset_gmail_service():
+    """Descarta el cliente cacheado (p.ej. token revocado): el próximo envío vuelve a cargarlo."""
+    global _gmail_service, _gmail_creds
+    with _gmail_lock:
+        _gmail_service = None
+        _gmail_creds = None
+
+
+def send_raw_message(raw: str) -> dict:
+    """Envía un mensaje MIME ya codificado (base64url) con el cliente compartido."""
+    with _gmail_lock:
+        service = get_gmail_service()
+        return service.users().messages().send(userId='me', body={'raw': raw}).execute()
+
+
+def build_raw_message(to_email: str,
+                      subject: str,
+                      html_body: str | None = None,
+                      text_body: str = "",
+                      inline_images: dict[str, bytes] | None = None,
+                      *,
+                      from_email: str | None = None,
+                      from_name: str | None = None,
+                      reply_to: str | None = None) -> str:
+    """Arma el mensaje MIME (texto y/o HTML, imágenes inline) y lo devuelve en base64url."""
+    if inline_images:
+        msg = MIMEMultipart('related')
+        alt = MIMEMultipart('alternative')
+        if text_body:
+            alt.attach(MIMEText(text_body, 'plain', 'utf-8'))
+        if html_body:
+            alt.attach(MIMEText(html_body, 'html', 'utf-8'))
+        msg.attach(alt)
+        for cid, content in (inline_images or {}).items():
+            try:
+                img = MIMEImage(content)
+            except Exception:
+                img = MIMEImage(content, _subtype='png')
+            img.add_header('Content-ID', f'<{cid}>')
+            img.add_header('Content-Disposition', 'inline', filename=f'{cid}.png')
+            img.add_header('X-Attachment-Id', cid)
+            msg.attach(img)
+    elif html_body:
+        msg = MIMEMultipart('alternative')
+        if text_body:
+            msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
+        msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+    else:
+        msg = MIMEText(text_body or "", 'plain', 'utf-8')
+
+    # Construir encabezados usando parseaddr/formataddr para evitar duplicados
+    default_from = getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@example.com')
+    raw_from = (from_email or default_from or '').strip()
+    name_in_default, email_in_default = parseaddr(raw_from)
+    # Si se pasó from_name, tiene prioridad para el nombre visible
+    display_name = (from_name or name_in_default or '')
+    from_header = formataddr((display_name, email_in_default)) if email_in_default else raw_from
+
+    msg['Subject'] = subject
+    msg['From'] = from_header
+    msg['To'] = to_email
+    if reply_to:
+        msg['Reply-To'] = reply_to
+
+    return base64.urlsafe_b64encode(msg.as_bytes()).decode('utf-8')
 
 
 def send_email(to_email: str,
@@ -334,57 +446,46 @@ def send_email(to_email: str,
                from_email: str | None = None,
                from_name: str | None = None,
                reply_to: str | None = None) -> bool:
-    """Envía un email genérico usando la API de Gmail (texto y/o HTML).
+    """Encola un email genérico (texto y/o HTML) para enviarlo por la API de Gmail.
+
+    El mensaje queda en EmailOutbox y lo envía el worker en segundo plano, así que la
+    petición no espera a Gmail. Devuelve True si quedó encolado. Con
+    EMAIL_OUTBOX_ENABLED=False se envía en el momento (send_email_now).
 
     Parámetros extra:
     - from_email: dirección de remitente a usar (por defecto DEFAULT_FROM_EMAIL)
     - from_name: nombre visible del remitente (se formatea como "Nombre <email>")
     - reply_to: dirección para responder (Reply-To)
     """
+    if not getattr(settings, 'EMAIL_OUTBOX_ENABLED', True):
+        return send_email_now(to_email, subject, html_body, text_body, inline_images,
+                              from_email=from_email, from_name=from_name, reply_to=reply_to)
     try:
-        service = get_gmail_service()
+        from .email_outbox import enqueue_email
 
-        if inline_images:
-            msg = MIMEMultipart('related')
-            alt = MIMEMultipart('alternative')
-            if text_body:
-                alt.attach(MIMEText(text_body, 'plain', 'utf-8'))
-            if html_body:
-                alt.attach(MIMEText(html_body, 'html', 'utf-8'))
-            msg.attach(alt)
-            for cid, content in (inline_images or {}).items():
-                try:
-                    img = MIMEImage(content)
-                except Exception:
-                    img = MIMEImage(content, _subtype='png')
-                img.add_header('Content-ID', f'<{cid}>')
-                img.add_header('Content-Disposition', 'inline', filename=f'{cid}.png')
-                img.add_header('X-Attachment-Id', cid)
-                msg.attach(img)
-        elif html_body:
-            msg = MIMEMultipart('alternative')
-            if text_body:
-                msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
-            msg.attach(MIMEText(html_body, 'html', 'utf-8'))
-        else:
-            msg = MIMEText(text_body or "", 'plain', 'utf-8')
-
-        # Construir encabezados usando parseaddr/formataddr para evitar duplicados
-        default_from = getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@example.com')
-        raw_from = (from_email or default_from or '').strip()
-        name_in_default, email_in_default = parseaddr(raw_from)
-        # Si se pasó from_name, tiene prioridad para el nombre visible
-        display_name = (from_name or name_in_default or '')
-        from_header = formataddr((display_name, email_in_default)) if email_in_default else raw_from
-
-        msg['Subject'] = subject
-        msg['From'] = from_header
-        msg['To'] = to_email
-        if reply_to:
-            msg['Reply-To'] = reply_to
-
-        raw = base64.urlsafe_b64encode(msg.as_bytes()).decode('utf-8')
-        result = service.users().messages().send(userId='me', body={'raw': raw}).execute()
+        raw = build_raw_message(to_email, subject, html_body, text_body, inline_images,
+                                from_email=from_email, from_name=from_name, reply_to=reply_to)
+        enqueue_email(to_email, subject, raw)
+        return True
+    except Exception as e:
+        logger.error(f"Error encolando email a {to_email}: {e}")
+        return False
+
+
+def send_email_now(to_email: str,
+                   subject: str,
+                   html_body: str | None = None,
+                   text_body: str = "",
+                   inline_images: dict[str, bytes] | None = None,
+                   *,
+                   from_email: str | None = None,
+                   from_name: str | None = None,
+                   reply_to: str | None = None) -> bool:
+    """Envía el email en el momento, sin pasar por la cola (mismos parámetros que send_email)."""
+    try:
+        raw = build_raw_message(to_email, subject, html_body, text_body, inline_images,
+                                from_email=from_email, from_name=from_name, reply_to=reply_to)
+        result = send_raw_message(raw)
         logger.info(f"Email enviado a {to_email} - asunto: {subject} - id: {result.get('id')}")
         return True
     except Exception as e:
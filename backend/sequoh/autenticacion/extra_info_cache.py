@@ -0,0 +1,133 @@
+"""
+Caché LRU por proceso de RsidExtraInfo.
+
+rsid_extra_info es información de referencia que solo reescriben refresh_rsid_extra_info
+(y los demás comandos de enriquecimiento) o el admin. Las vistas de resultados y el
+informe PDF consultan siempre las mismas tripletas (rs_id, genotype, phenotype_name),
+así que se guardan en memoria, incluidas las tripletas sin fila (para no volver a
+consultarlas).
+
+La caché queda marcada con la revisión del catálogo EXTRA_INFO_CATALOG; quien modifica
+la tabla llama a bump_catalog_revision(EXTRA_INFO_CATALOG) y cada proceso vacía su copia
+al ver la nueva revisión, sin reiniciar.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .catalog_index import EXTRA_INFO_CATALOG, cached_catalog_revision
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 50000
+# Marca para las tripletas consultadas que no tienen fila
+MISSING = object()
+
+
+class ExtraInfoCache:
+    """LRU acotado de tripletas -> RsidExtra (o MISSING), con contadores de aciertos."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def sync_generation(self, generation):
+        """Vacía la caché si la revisión del catálogo cambió desde la última carga."""
+        with self._lock:
+            if self.generation != generation:
+                if self.generation is not None:
+                    logger.info(
+                        f"Caché de rsid_extra_info invalidada (revisión {self.generation} -> {generation})"
+                    )
+                self._entries.clear()
+                self.generation = generation
+
+    def get_many(self, keys):
+        """Devuelve ({clave: valor} encontrados, [claves faltantes])."""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                if value is not MISSING:
+                    found[key] = value
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return found, missing
+
+    def put_many(self, items, generation):
+        with self._lock:
+            # Una invalidación ocurrida durante la consulta descarta estos valores
+            if generation != self.generation:
+                return
+            for key, value in items:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'generation': self.generation,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extra_info_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtraInfoCache(
+                    getattr(settings, 'RSID_EXTRA_INFO_CACHE_SIZE', DEFAULT_MAX_ENTRIES)
+                )
+    return _cache
+
+
+def lookup_extra_info(keys, fetch):
+    """
+    Resuelve tripletas desde la caché; las faltantes se piden a fetch(claves), que debe
+    devolver {clave: RsidExtra} solo para las existentes. Devuelve {clave: RsidExtra}.
+    """
+    cache = get_extra_info_cache()
+    generation = cached_catalog_revision(EXTRA_INFO_CATALOG)
+    cache.sync_generation(generation)
+
+    found, missing = cache.get_many(keys)
+    if missing:
+        fetched = fetch(missing)
+        found.update(fetched)
+        cache.put_many(((key, fetched.get(key, MISSING)) for key in missing), generation)
+    return found
+
+
+def extra_info_cache_stats():
+    return get_extra_info_cache().stats()
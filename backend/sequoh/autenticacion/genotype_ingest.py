@@ -0,0 +1,168 @@
+"""
+Motor de ingesta masiva de genotipos.
+
+Reemplaza el procesamiento línea a línea de UploadGeneticFileAPIView: las líneas se
+consumen como un iterable (lista o generador sobre el archivo), los pares (rsid,
+genotipo normalizado) se resuelven contra el índice del catálogo en memoria (ver
+catalog_index.py, con la prioridad Chile → América → país ya calculada) y las
+asociaciones UserSNP se insertan con un bulk_create por bloque. La memoria usada
+depende del tamaño del bloque y no del tamaño del archivo.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from .catalog_index import get_catalog_index
+from .models import UserSNP
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def normalize_genotype(genotipo):
+    """Ordena los alelos de un genotipo (p.ej. T/C -> C/T)."""
+    if '/' not in genotipo:
+        return genotipo
+    alelos = [a.strip() for a in genotipo.split('/') if a.strip()]
+    alelos.sort()
+    return "/".join(alelos)
+
+
+def parse_genotype_lines(lines):
+    """
+    Recorre las líneas del archivo (formato: cromosoma,rsid,genotipo,...) y produce
+    tuplas (numero_linea, linea, rsid, genotipo_normalizado, motivo_error).
+    Las líneas vacías se omiten; si la línea es inválida rsid/genotipo vienen en None.
+    """
+    for idx, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        parts = stripped.split(',')
+        if len(parts) < 3:
+            yield idx + 1, line, None, None, "Formato incompleto"
+            continue
+
+        cromosoma = parts[0].strip()
+        rsid = parts[1].strip()
+        genotipo = parts[2].strip()
+        if not cromosoma or not rsid or not genotipo:
+            yield idx + 1, line, None, None, "Campos vacíos"
+            continue
+
+        yield idx + 1, line, rsid, normalize_genotype(genotipo), None
+
+
+def resolve_preferred_snps(pairs, index=None):
+    """
+    Resuelve un conjunto de pares (rsid, genotipo) al id del SNP preferido del catálogo
+    usando el índice en memoria. Devuelve {(rsid, genotipo): snp_id} solo para los
+    pares que existen.
+    """
+    index = index or get_catalog_index()
+    resolved = {}
+    for rsid, genotipo in pairs:
+        snp_id = index.lookup(rsid, genotipo)
+        if snp_id is not None:
+            resolved[(rsid, genotipo)] = snp_id
+    return resolved
+
+
+def _empty_result():
+    return {
+        'snps_added': 0,
+        'snps_skipped': 0,
+        'snps_matched': 0,
+        'total_lines': 0,
+        'unprocessed_lines': []
+    }
+
+
+def ingest_genotype_lines(user, lines, chunk_size=None, on_progress=None, max_errors=None):
+    """
+    Procesa las líneas de un archivo genético y crea las asociaciones user-snp.
+    Devuelve un dict con snps_added, snps_skipped, snps_matched, total_lines y
+    unprocessed_lines (limitado a max_errors entradas si se indica).
+
+    on_progress(result, lines_processed) se invoca después de cada bloque, lo que
+    permite a los trabajos en segundo plano publicar su avance.
+    """
+    chunk_size = chunk_size or getattr(settings, 'GENOTYPE_INGEST_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    result = _empty_result()
+    # Se confirma la revisión del catálogo una vez por archivo; el resto son búsquedas en memoria
+    index = get_catalog_index(check_revision=True)
+    # SNPs ya vinculados (de cargas anteriores o de líneas previas del mismo archivo)
+    linked_snp_ids = set()
+
+    def add_unprocessed(line_no, line, reason):
+        result['snps_skipped'] += 1
+        if max_errors is None or len(result['unprocessed_lines']) < max_errors:
+            result['unprocessed_lines'].append({
+                "line": line_no,
+                "content": line,
+                "reason": reason
+            })
+
+    def flush(chunk):
+        pairs = {(rsid, genotipo) for _, _, rsid, genotipo in chunk}
+        resolved = resolve_preferred_snps(pairs, index)
+
+        candidate_ids = set(resolved.values()) - linked_snp_ids
+        if candidate_ids:
+            linked_snp_ids.update(
+                UserSNP.objects.filter(user=user, snp_id__in=candidate_ids)
+                .values_list('snp_id', flat=True)
+            )
+
+        new_links = []
+        for line_no, line, rsid, genotipo in chunk:
+            snp_id = resolved.get((rsid, genotipo))
+            if snp_id is None:
+                logger.debug(
+                    f"Línea {line_no}: SNP no encontrado en BD (rsid={rsid}, genotipo={genotipo})."
+                )
+                add_unprocessed(line_no, line, "SNP no encontrado en la base de datos")
+                continue
+
+            result['snps_matched'] += 1
+            if snp_id not in linked_snp_ids:
+                linked_snp_ids.add(snp_id)
+                new_links.append(UserSNP(user=user, snp_id=snp_id))
+
+        if new_links:
+            with transaction.atomic():
+                UserSNP.objects.bulk_create(new_links, ignore_conflicts=True, batch_size=chunk_size)
+            result['snps_added'] += len(new_links)
+
+    def report_progress(lines_processed):
+        if on_progress is not None:
+            on_progress(result, lines_processed)
+
+    def counted(source):
+        for line in source:
+            result['total_lines'] += 1
+            yield line
+
+    chunk = []
+    for line_no, line, rsid, genotipo, error in parse_genotype_lines(counted(lines)):
+        if error:
+            logger.debug(f"Línea {line_no}: {error.lower()}. Contenido: {line}")
+            add_unprocessed(line_no, line, error)
+            continue
+
+        chunk.append((line_no, line, rsid, genotipo))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+            report_progress(line_no)
+
+    if chunk:
+        flush(chunk)
+    report_progress(result['total_lines'])
+
+    result['unprocessed_lines'].sort(key=lambda item: item['line'])
+    return result
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from autenticacion.models import Profile
+from autenticacion.utils import backfill_sample_codes
+
+
+class Command(BaseCommand):
+    help = (
+        'Asigna código de muestra (SampleCode) a los perfiles que no tienen, con un '
+        'bulk_update por lote. Los perfiles nuevos ya lo reciben al crearse.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Perfiles por lote (default: 500)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar los perfiles sin código')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            missing = Profile.objects.filter(Q(sample_code__isnull=True) | Q(sample_code='')).count()
+            self.stdout.write(f'{missing} perfiles sin código de muestra.')
+            return
+        updated = backfill_sample_codes(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'✓ {updated} códigos de muestra asignados.'))
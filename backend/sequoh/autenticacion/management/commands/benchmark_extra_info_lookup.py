@@ -0,0 +1,100 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from autenticacion.extra_info_cache import extra_info_cache_stats
+from autenticacion.models import RsidExtraInfo, UserSNP
+from autenticacion.utils import (
+    build_rsid_extra_info_map,
+    fetch_rsid_extra_info,
+    rsid_extra_info_key,
+    rsid_extra_info_keys,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda de RsidExtraInfo por tripletas exactas (tuplas contra VALUES) con '
+        'los filtros __in independientes anteriores y con un OR de condiciones por tripleta: '
+        'filas traídas vs. filas usadas y tiempo por usuario.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='Usuario a medir (por defecto, los que tienen más SNPs)')
+        parser.add_argument('--users', type=int, default=5, help='Cantidad de usuarios a medir sin --user-id')
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por medición (se reporta la mejor)')
+
+    def handle(self, *args, **options):
+        if options['user_id']:
+            users = list(User.objects.filter(pk=options['user_id']))
+            if not users:
+                raise CommandError(f"No existe el usuario {options['user_id']}")
+        else:
+            users = list(
+                User.objects.annotate(n_snps=Count('user_snps'))
+                .filter(n_snps__gt=0)
+                .order_by('-n_snps')[:options['users']]
+            )
+        if not users:
+            self.stdout.write(self.style.WARNING('No hay usuarios con SNPs para medir.'))
+            return
+
+        repeat = max(1, options['repeat'])
+        for user in users:
+            snps = [us.snp for us in UserSNP.objects.filter(user=user).select_related('snp') if us.snp]
+            keys = rsid_extra_info_keys(snps)
+
+            legacy_rows, legacy_time = self._measure(repeat, lambda: self._legacy_lookup(keys))
+            or_rows, or_time = self._measure(repeat, lambda: self._or_lookup(keys))
+            exact_map, exact_time = self._measure(repeat, lambda: fetch_rsid_extra_info(keys))
+            # La primera llamada llena la caché del proceso; se mide la lectura ya caliente
+            build_rsid_extra_info_map(snps)
+            _, cached_time = self._measure(repeat, lambda: build_rsid_extra_info_map(snps))
+            used = sum(1 for snp in snps if snp.rsid and snp.genotipo and rsid_extra_info_key(snp) in exact_map)
+
+            self.stdout.write(
+                f"Usuario {user.pk} ({len(snps)} SNPs, {len(keys)} tripletas): "
+                f"anterior {len(legacy_rows)} filas en {legacy_time * 1000:.1f} ms | "
+                f"OR por tripleta {len(or_rows)} filas en {or_time * 1000:.1f} ms | "
+                f"exacta {len(exact_map)} filas en {exact_time * 1000:.1f} ms "
+                f"({legacy_time / exact_time:.1f}x vs. anterior) | "
+                f"en caché {cached_time * 1000:.1f} ms | filas usadas {used}"
+            )
+        stats = extra_info_cache_stats()
+        self.stdout.write(
+            f"Caché del proceso: {stats['entries']} entradas, {stats['hits']} aciertos, "
+            f"{stats['misses']} fallos"
+        )
+
+    @staticmethod
+    def _legacy_lookup(keys):
+        """Consulta original: tres __in independientes (producto cruzado)."""
+        if not keys:
+            return []
+        rs_ids, genotypes, phenotypes = (set(values) for values in zip(*keys))
+        return list(RsidExtraInfo.objects.filter(
+            rs_id__in=rs_ids,
+            genotype__in=genotypes,
+            phenotype_name__in=phenotypes,
+        ))
+
+    @staticmethod
+    def _or_lookup(keys):
+        """Tripletas exactas como OR de condiciones (rs_id AND genotype AND phenotype_name)."""
+        condition = Q()
+        for rs_id, genotype, phenotype_name in keys:
+            condition |= Q(rs_id=rs_id, genotype=genotype, phenotype_name=phenotype_name)
+        return list(RsidExtraInfo.objects.filter(condition)) if keys else []
+
+    @staticmethod
+    def _measure(repeat, func):
+        best = None
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
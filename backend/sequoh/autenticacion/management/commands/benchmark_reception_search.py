@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from autenticacion.models import Profile
+from autenticacion.reception_search import reception_search_queryset
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la búsqueda de recepción (RUT, correo, SampleCode) sobre perfiles sintéticos. '
+        'Los datos se crean dentro de una transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100_000, help='Perfiles sintéticos (default: 100000)')
+        parser.add_argument('--lookups', type=int, default=200, help='Búsquedas por criterio (default: 200)')
+        parser.add_argument('--explain', action='store_true', help='Mostrar el plan de cada consulta')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(max(1, options['profiles']), max(1, options['lookups']), options['explain'])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write('Datos sintéticos eliminados (transacción revertida).')
+
+    def _run(self, total, lookups, explain):
+        started = time.perf_counter()
+        tag = f'{random.randrange(16 ** 6):06x}'
+        users = User.objects.bulk_create(
+            [
+                User(username=f'bench{tag}-{i}@example.cl', email=f'Bench{tag}-{i}@Example.cl', password='!')
+                for i in range(total)
+            ],
+            batch_size=5000,
+        )
+        # bulk_create no emite señales: ni códigos automáticos ni estadísticas
+        Profile.objects.bulk_create(
+            [
+                Profile(user=user, rut=f'{90_000_000 + i}-K', sample_code=f'SC-B{tag}-{i:07d}')
+                for i, user in enumerate(users)
+            ],
+            batch_size=5000,
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE auth_user')
+                cursor.execute(f'ANALYZE {Profile._meta.db_table}')
+        self.stdout.write(f'{total} perfiles sintéticos creados en {time.perf_counter() - started:.1f} s')
+
+        picks = [random.randrange(total) for _ in range(lookups)]
+        criteria = {
+            'rut': lambda i: {'rut': f'{90_000_000 + i}-k'},
+            'email': lambda i: {'email': f'BENCH{tag}-{i}@example.CL'},
+            'sample_code': lambda i: {'sample_code': f'sc-b{tag}-{i:07d}'},
+        }
+        for name, build in criteria.items():
+            if explain:
+                self.stdout.write(f'Plan ({name}):\n{reception_search_queryset(**build(picks[0])).explain()}')
+            timings = []
+            for i in picks:
+                qs = reception_search_queryset(**build(i))
+                lookup_started = time.perf_counter()
+                found = list(qs[:25])
+                timings.append(time.perf_counter() - lookup_started)
+                if len(found) != 1:
+                    self.stderr.write(self.style.ERROR(f'{name}: {len(found)} resultados para el perfil {i}'))
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'{name}: mediana {statistics.median(timings) * 1000:.3f} ms, '
+                f'p95 {p95 * 1000:.3f} ms ({lookups} búsquedas)'
+            )
@@ -3,6 +3,7 @@ import os
 from decimal import Decimal
 from django.core.management.base import BaseCommand
 from autenticacion.models import SNP
+from autenticacion.catalog_index import rebuild_preferred_snps
 
 
 class Command(BaseCommand):
@@ -85,8 +86,12 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f'Error al leer el archivo: {str(e)}')
             )
+            rebuild_preferred_snps()
             return
 
+        # Recalcula los SNPs preferidos e invalida el índice en memoria de los procesos
+        rebuild_preferred_snps()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'\n✓ Importación completada:\n'
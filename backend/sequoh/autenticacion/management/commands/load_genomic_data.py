@@ -16,6 +16,7 @@ from decimal import Decimal, InvalidOperation
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from autenticacion.models import SNP
+from autenticacion.catalog_index import rebuild_preferred_snps
 
 
 class Command(BaseCommand):
@@ -194,6 +195,10 @@ class Command(BaseCommand):
         except Exception as e:
             raise CommandError(f'Error al procesar el archivo CSV: {str(e)}')
 
+        if not dry_run:
+            # Recalcula los SNPs preferidos e invalida el índice en memoria de los procesos
+            rebuild_preferred_snps()
+
         # Resumen final
         self.stdout.write('\n')
         self.stdout.write(self.style.SUCCESS('═' * 60))
@@ -5,6 +5,7 @@ Actualiza registros incompletos, genéricos y con "Medida antropométrica"
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from autenticacion.models import SNP
+from autenticacion.catalog_index import bump_catalog_revision
 from complete_rsid_database import COMPLETE_RSID_DATABASE
 from datetime import datetime
 
@@ -114,6 +115,10 @@ class Command(BaseCommand):
                 errors.append(error_msg)
                 self.stdout.write(self.style.ERROR(error_msg))
         
+        if updated_count:
+            # Invalida los resultados precalculados de los usuarios
+            bump_catalog_revision()
+
         # SEGUNDO PASO: Buscar otros registros problemáticos que no estén en el diccionario
         self.stdout.write(self.style.WARNING("\n" + "=" * 80))
         self.stdout.write(self.style.WARNING("VERIFICANDO REGISTROS RESTANTES"))
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db.models import Count
 from autenticacion.models import SNP
+from autenticacion.catalog_index import rebuild_preferred_snps
 
 class Command(BaseCommand):
     help = 'Normaliza los nombres de continentes y países en la tabla SNP.'
@@ -101,4 +102,8 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.NOTICE('No se necesitaron actualizaciones en los nombres de países.'))
 
+        if updated_continent_count or updated_country_count:
+            # La prioridad Chile/América depende de estos nombres
+            rebuild_preferred_snps()
+
         self.stdout.write(self.style.SUCCESS('\nNormalización completada.'))
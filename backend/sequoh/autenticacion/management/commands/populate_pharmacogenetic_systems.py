@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from autenticacion.models import SNP, PharmacogeneticSystem
+from autenticacion.catalog_index import bump_catalog_revision
 
 
 SYSTEM_RULES = [
@@ -50,4 +51,6 @@ class Command(BaseCommand):
                     snp.save(update_fields=["pharmacogenetic_system"])
                     updated += 1
 
+        # Los resultados precalculados agrupan por sistema farmacogenético
+        bump_catalog_revision()
         self.stdout.write(self.style.SUCCESS(f"Actualizados {updated} SNPs con sistema farmacogenetico."))
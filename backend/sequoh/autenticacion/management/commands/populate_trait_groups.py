@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from autenticacion.models import SNP
+from autenticacion.catalog_index import bump_catalog_revision
 
 class Command(BaseCommand):
     help = 'Populates the "grupo" field for existing trait SNPs based on their fenotipo.'
@@ -41,4 +42,7 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(self.style.WARNING(f'No group found for SNP {snp.rsid} ({snp.fenotipo}). It will remain in its current group or null.'))
 
+        if updated_count:
+            # Invalidate precomputed user results that group traits
+            bump_catalog_revision()
         self.stdout.write(self.style.SUCCESS(f'\nPopulation complete. Updated {updated_count} SNPs.'))
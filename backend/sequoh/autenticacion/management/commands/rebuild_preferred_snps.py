@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from autenticacion.catalog_index import rebuild_preferred_snps
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula la prioridad de cada SNP y la tabla preferred_snps '
+        '(SNP preferido por rsid/genotipo). Los cargadores del catálogo lo ejecutan al terminar.'
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_preferred_snps()
+        self.stdout.write(self.style.SUCCESS(f'✓ {count} pares rsid/genotipo recalculados.'))
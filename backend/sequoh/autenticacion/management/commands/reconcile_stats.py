@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from autenticacion.models import SystemStats
+from autenticacion.system_stats import COUNTER_FIELDS, STATS_PK, reconcile_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde las tablas los contadores de estadísticas de administración, corrige '
+        'los desajustes y guarda el snapshot del día (base del crecimiento). Programarlo a diario.'
+    )
+
+    def handle(self, *args, **options):
+        previous = SystemStats.objects.filter(pk=STATS_PK).first()
+        stats = reconcile_stats()
+        for field in COUNTER_FIELDS:
+            value = getattr(stats, field)
+            old = getattr(previous, field) if previous is not None else None
+            if old is not None and old != value:
+                self.stdout.write(self.style.WARNING(f'{field}: {old} → {value} (corregido)'))
+            else:
+                self.stdout.write(f'{field}: {value}')
+        self.stdout.write(self.style.SUCCESS('✓ Estadísticas reconciliadas.'))
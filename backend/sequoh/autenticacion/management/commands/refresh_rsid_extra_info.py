@@ -8,6 +8,7 @@ from typing import Iterable, Optional
 from django.core.management.base import BaseCommand
 
 from autenticacion.models import RsidExtraInfo
+from autenticacion.catalog_index import EXTRA_INFO_CATALOG, bump_catalog_revision
 
 
 DISCLAIMER = "Esto es informativo y no constituye diagnostico medico."
@@ -786,4 +787,7 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING(f"Dry run: {updated} rows would be updated."))
         else:
+            if updated:
+                # Invalidates cached results that embed phenotype descriptions
+                bump_catalog_revision(EXTRA_INFO_CATALOG)
             self.stdout.write(self.style.SUCCESS(f"Updated {updated} rows."))
@@ -0,0 +1,144 @@
+import time
+from datetime import datetime, time as dt_time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from autenticacion.models import SampleStatus, ServiceStatus, UserSNP
+from autenticacion.report_cache import (
+    commit_report_file,
+    discard_report_tmp,
+    get_cached_report,
+    new_report_tmp_path,
+    payload_digest,
+)
+from autenticacion.report_payload import build_report_payloads
+from autenticacion.report_renderer import ReportRenderError, render_batch_with_subprocess
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera los informes PDF de muchos usuarios por lotes (una ejecución de generate.js '
+        'por lote) y los deja en la caché de informes. Reporta páginas por segundo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, nargs='+', help='Usuarios específicos')
+        parser.add_argument(
+            '--service-status',
+            choices=ServiceStatus.values,
+            help='Filtrar por estado del servicio (p.ej. COMPLETED)'
+        )
+        parser.add_argument('--sample-status', choices=SampleStatus.values, help='Filtrar por estado de la muestra')
+        parser.add_argument('--uploaded-after', help='Archivo subido desde esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--uploaded-before', help='Archivo subido hasta esta fecha, inclusive (AAAA-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=10, help='Personas por ejecución del generador (default: 10)')
+        parser.add_argument('--limit', type=int, help='Máximo de usuarios a procesar')
+        parser.add_argument('--force', action='store_true', help='Renderizar aunque el informe ya esté en caché')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar los informes que se generarían')
+
+    def handle(self, *args, **options):
+        users = self._select_users(options)
+        batch_size = max(1, options['batch_size'])
+
+        rendered = skipped = failed = pages = 0
+        render_seconds = 0.0
+        started = time.monotonic()
+        last_pk = 0
+        remaining = options['limit']
+
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            # Paginación por pk: no se carga la lista completa de usuarios en memoria
+            batch = list(users.filter(pk__gt=last_pk).order_by('pk')[:size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            if remaining is not None:
+                remaining -= len(batch)
+
+            payloads = build_report_payloads(batch)
+            pending = []
+            for user in batch:
+                digest = payload_digest(payloads[user.pk])
+                if not options['force'] and get_cached_report(user.pk, digest) is not None:
+                    skipped += 1
+                    continue
+                pending.append((user, digest, payloads[user.pk]['people'][0]))
+
+            if options['dry_run']:
+                rendered += len(pending)
+                continue
+            if not pending:
+                continue
+
+            batch_started = time.monotonic()
+            tmp_paths = [new_report_tmp_path(user.pk, digest) for user, digest, _ in pending]
+            try:
+                results = render_batch_with_subprocess([person for _, _, person in pending], tmp_paths)
+            except ReportRenderError as e:
+                failed += len(pending)
+                for tmp_path in tmp_paths:
+                    discard_report_tmp(tmp_path)
+                self.stderr.write(self.style.ERROR(f"Lote hasta el usuario {last_pk} falló: {str(e)}"))
+                continue
+            finally:
+                batch_seconds = time.monotonic() - batch_started
+                render_seconds += batch_seconds
+
+            batch_pages = 0
+            for (user, digest, _), tmp_path, result in zip(pending, tmp_paths, results):
+                if result.report is None:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f"Usuario {user.pk}: {result.error}"))
+                    discard_report_tmp(tmp_path)
+                    continue
+                commit_report_file(user.pk, digest, tmp_path)
+                rendered += 1
+                batch_pages += result.report.pages
+            pages += batch_pages
+
+            self.stdout.write(
+                f"Lote de {len(pending)} informes: {batch_pages} páginas en {batch_seconds:.1f} s "
+                f"({self._rate(batch_pages, batch_seconds)} páginas/s)"
+            )
+
+        total_seconds = time.monotonic() - started
+        if options['dry_run']:
+            self.stdout.write(f"{rendered} informes por generar, {skipped} ya en caché.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{rendered} informes generados, {skipped} ya en caché, {failed} con error. "
+            f"{pages} páginas en {render_seconds:.1f} s de render "
+            f"({self._rate(pages, render_seconds)} páginas/s; {total_seconds:.1f} s en total)"
+        ))
+
+    def _select_users(self, options):
+        users = User.objects.filter(Exists(UserSNP.objects.filter(user=OuterRef('pk'))))
+        if options['user_id']:
+            users = users.filter(pk__in=options['user_id'])
+        if options['service_status']:
+            users = users.filter(profile__service_status=options['service_status'])
+        if options['sample_status']:
+            users = users.filter(profile__sample_status=options['sample_status'])
+        if options['uploaded_after']:
+            users = users.filter(profile__report_uploaded_at__gte=self._parse_date(options['uploaded_after']))
+        if options['uploaded_before']:
+            users = users.filter(
+                profile__report_uploaded_at__lte=self._parse_date(options['uploaded_before'], end_of_day=True)
+            )
+        return users
+
+    @staticmethod
+    def _parse_date(value, end_of_day=False):
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Fecha inválida: {value} (formato AAAA-MM-DD)")
+        return timezone.make_aware(datetime.combine(day, dt_time.max if end_of_day else dt_time.min))
+
+    @staticmethod
+    def _rate(pages, seconds):
+        return f"{pages / seconds:.2f}" if seconds > 0 else "-"
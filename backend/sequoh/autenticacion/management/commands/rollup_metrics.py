@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from autenticacion.metrics import rollup_daily_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula las métricas diarias del dashboard (registros, cargas, análisis, muestras) '
+        'desde el último día calculado. Programarlo a diario o con más frecuencia.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Recalcular desde esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--until', help='Calcular hasta esta fecha, inclusive (AAAA-MM-DD; default: hoy)')
+
+    def handle(self, *args, **options):
+        since = self._parse_date(options['since'])
+        until = self._parse_date(options['until'])
+        start, end, rows = rollup_daily_metrics(since=since, until=until)
+        if not rows:
+            self.stdout.write('No hay días por calcular.')
+            return
+        self.stdout.write(self.style.SUCCESS(f'✓ Métricas del {start} al {end}: {rows} filas.'))
+
+    @staticmethod
+    def _parse_date(value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Fecha inválida: {value} (formato AAAA-MM-DD)")
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from autenticacion.background import drain_queues, worker_names
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa las colas en segundo plano (importaciones de archivos genéticos, informes y correos). '
+        'Usar junto con BACKGROUND_INLINE_WORKER=False para un worker dedicado. '
+        'Cada worker (p.ej. el de correos) se drena en su propio hilo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos de espera entre revisiones cuando no hay trabajos (default: 2)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        self.stdout.write(self.style.SUCCESS('Worker iniciado.'))
+
+        if options['once']:
+            processed = drain_queues()
+            if processed:
+                self.stdout.write(f'{processed} trabajos procesados.')
+            return
+
+        # Un hilo por worker: los correos no esperan detrás de una importación o un render
+        for worker in worker_names():
+            threading.Thread(
+                target=self._poll, args=(worker, interval), name=f'run-worker-{worker}', daemon=True
+            ).start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            self.stdout.write('Worker detenido.')
+
+    def _poll(self, worker, interval):
+        try:
+            while True:
+                close_old_connections()
+                processed = drain_queues(worker)
+                if processed:
+                    self.stdout.write(f'{processed} trabajos procesados ({worker}).')
+                time.sleep(interval)
+        finally:
+            connections.close_all()
@@ -0,0 +1,146 @@
+"""
+Métricas diarias del dashboard de administración (DailyMetric).
+
+rollup_daily_metrics cuenta los eventos de cada día a partir de las fechas que ya guardan
+las tablas: registros (User.date_joined), archivos cargados (Profile.report_uploaded_at),
+análisis completados (importaciones terminadas), llegadas, tomas y envíos de muestras
+(fechas del perfil). Es incremental: parte del último día calculado, que se vuelve a
+contar porque pudo quedar a medias, así que una ejecución diaria lee solo los eventos
+recientes. Las descargas del informe no quedan en ninguna tabla y se suman al momento
+con record_metric_event.
+
+El endpoint de métricas lee solo DailyMetric, nunca las tablas originales.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyMetric, GenotypeImportJob, ImportJobStatus, MetricName, Profile
+
+logger = logging.getLogger(__name__)
+
+# Métrica -> (consulta, campo de fecha del evento)
+ROLLUP_SOURCES = {
+    MetricName.REGISTRATIONS: (lambda: User.objects.all(), 'date_joined'),
+    MetricName.UPLOADS: (lambda: Profile.objects.all(), 'report_uploaded_at'),
+    MetricName.COMPLETED_ANALYSES: (
+        lambda: GenotypeImportJob.objects.filter(status=ImportJobStatus.COMPLETED),
+        'finished_at',
+    ),
+    MetricName.SAMPLES_ARRIVED: (lambda: Profile.objects.all(), 'arrival_confirmed_at'),
+    MetricName.SAMPLES_TAKEN: (lambda: Profile.objects.all(), 'sample_taken_at'),
+    MetricName.SAMPLES_SENT: (lambda: Profile.objects.all(), 'sample_sent_at'),
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def last_rollup_date():
+    """Último día calculado por rollup_daily_metrics (None si nunca se ejecutó)."""
+    return (
+        DailyMetric.objects.filter(metric__in=list(ROLLUP_SOURCES))
+        .order_by('-date')
+        .values_list('date', flat=True)
+        .first()
+    )
+
+
+def _first_event_date():
+    dates = []
+    for queryset, field in ROLLUP_SOURCES.values():
+        first = queryset().filter(**{f'{field}__isnull': False}).order_by(field).values_list(field, flat=True).first()
+        if first is not None:
+            dates.append(timezone.localdate(first))
+    return min(dates) if dates else None
+
+
+def rollup_daily_metrics(since=None, until=None):
+    """
+    Calcula las métricas por día desde `since` (por defecto el último día ya calculado)
+    hasta `until` (por defecto hoy). Devuelve (desde, hasta, filas escritas).
+    """
+    until = until or timezone.localdate()
+    if since is None:
+        since = last_rollup_date() or _first_event_date()
+    if since is None or since > until:
+        return since, until, 0
+
+    start, end = _day_start(since), _day_start(until + timedelta(days=1))
+    days = [since + timedelta(days=offset) for offset in range((until - since).days + 1)]
+    counts = {}
+    for metric, (queryset, field) in ROLLUP_SOURCES.items():
+        # Rango sobre la columna sin funciones (puede usar un índice) y agrupación por día local
+        rows = (
+            queryset()
+            .filter(**{f'{field}__gte': start, f'{field}__lt': end})
+            .annotate(day=TruncDate(field))
+            .values('day')
+            .annotate(total=Count('pk'))
+        )
+        for row in rows:
+            counts[(metric, row['day'])] = row['total']
+
+    now = timezone.now()
+    metrics = [
+        DailyMetric(date=day, metric=metric, value=counts.get((metric, day), 0), updated_at=now)
+        for metric in ROLLUP_SOURCES
+        for day in days
+    ]
+    DailyMetric.objects.bulk_create(
+        metrics,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['metric', 'date'],
+        update_fields=['value', 'updated_at'],
+    )
+    logger.info(f"Métricas diarias calculadas del {since} al {until}: {len(metrics)} filas")
+    return since, until, len(metrics)
+
+
+def record_metric_event(metric, amount=1):
+    """Suma un evento a la métrica del día (p.ej. una descarga del informe)."""
+    today = timezone.localdate()
+    updated = DailyMetric.objects.filter(metric=metric, date=today).update(
+        value=F('value') + amount,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                DailyMetric.objects.create(metric=metric, date=today, value=amount)
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo
+            DailyMetric.objects.filter(metric=metric, date=today).update(
+                value=F('value') + amount,
+                updated_at=timezone.now()
+            )
+
+
+def metric_series(since, until, metrics):
+    """Valores por día (0 si no hay fila) y totales del rango para las métricas pedidas."""
+    values = {
+        (row['metric'], row['date']): row['value']
+        for row in DailyMetric.objects.filter(
+            metric__in=metrics, date__gte=since, date__lte=until
+        ).values('metric', 'date', 'value')
+    }
+    days = []
+    totals = dict.fromkeys(metrics, 0)
+    day = since
+    while day <= until:
+        entry = {"date": day.isoformat()}
+        for metric in metrics:
+            value = values.get((metric, day), 0)
+            entry[metric] = value
+            totals[metric] += value
+        days.append(entry)
+        day += timedelta(days=1)
+    return days, totals
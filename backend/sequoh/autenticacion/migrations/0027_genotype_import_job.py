@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0026_create_rsid_extra_info'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenotypeImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255, verbose_name='Nombre del archivo')),
+                ('source_path', models.CharField(max_length=500, verbose_name='Ruta del archivo en cola')),
+                ('status', models.CharField(choices=[('PENDING', 'En cola'), ('RUNNING', 'Procesando'), ('COMPLETED', 'Completado'), ('FAILED', 'Fallido')], default='PENDING', max_length=20, verbose_name='Estado')),
+                ('total_lines', models.PositiveIntegerField(default=0, verbose_name='Líneas totales')),
+                ('lines_processed', models.PositiveIntegerField(default=0, verbose_name='Líneas procesadas')),
+                ('snps_matched', models.PositiveIntegerField(default=0, verbose_name='SNPs encontrados')),
+                ('snps_added', models.PositiveIntegerField(default=0, verbose_name='SNPs agregados')),
+                ('snps_skipped', models.PositiveIntegerField(default=0, verbose_name='Líneas omitidas')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Líneas con error')),
+                ('error_message', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('email_sent', models.BooleanField(default=False, verbose_name='Email enviado')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='requested_import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genotype_import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Paciente')),
+            ],
+            options={
+                'verbose_name': 'Importación de Genotipos',
+                'verbose_name_plural': 'Importaciones de Genotipos',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='genotype_job_queue_idx')],
+            },
+        ),
+    ]
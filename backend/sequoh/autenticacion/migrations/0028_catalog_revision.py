@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0027_genotype_import_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True, verbose_name='Catálogo')),
+                ('revision', models.PositiveBigIntegerField(default=0, verbose_name='Revisión')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Revisión de Catálogo',
+                'verbose_name_plural': 'Revisiones de Catálogo',
+            },
+        ),
+    ]
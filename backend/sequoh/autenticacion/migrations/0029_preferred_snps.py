@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, When
+
+
+def populate_preferred_snps(apps, schema_editor):
+    """Calcula SNP.prioridad y el SNP preferido de cada par (rsid, genotipo)."""
+    SNP = apps.get_model('autenticacion', 'SNP')
+    PreferredSNP = apps.get_model('autenticacion', 'PreferredSNP')
+
+    SNP.objects.update(prioridad=Case(
+        When(pais__iexact='Chile', then=0),
+        When(continente__icontains='america', then=1),
+        When(poblacion_pais__isnull=False, then=2),
+        When(pais__isnull=False, then=3),
+        default=4,
+        output_field=IntegerField()
+    ))
+
+    best = {}
+    rows = SNP.objects.values_list('id', 'rsid', 'genotipo', 'prioridad', 'af_pais').iterator(chunk_size=5000)
+    for snp_id, rsid, genotipo, prioridad, af_pais in rows:
+        rank = (prioridad, af_pais is None, -(af_pais or 0), snp_id)
+        current = best.get((rsid, genotipo))
+        if current is None or rank < current[0]:
+            best[(rsid, genotipo)] = (rank, snp_id)
+
+    PreferredSNP.objects.bulk_create(
+        [
+            PreferredSNP(rsid=rsid, genotipo=genotipo, snp_id=snp_id)
+            for (rsid, genotipo), (_, snp_id) in best.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0028_catalog_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreferredSNP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rsid', models.CharField(max_length=20, verbose_name='rsID')),
+                ('genotipo', models.CharField(max_length=10, verbose_name='Genotipo')),
+            ],
+            options={
+                'verbose_name': 'SNP preferido',
+                'verbose_name_plural': 'SNPs preferidos',
+                'db_table': 'preferred_snps',
+            },
+        ),
+        migrations.AddField(
+            model_name='snp',
+            name='prioridad',
+            field=models.PositiveSmallIntegerField(default=4, verbose_name='Prioridad'),
+        ),
+        migrations.AddIndex(
+            model_name='snp',
+            index=models.Index(fields=['rsid', 'prioridad'], name='snps_rsid_prioridad_idx'),
+        ),
+        migrations.AddField(
+            model_name='preferredsnp',
+            name='snp',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='autenticacion.snp', verbose_name='SNP preferido'),
+        ),
+        migrations.AddIndex(
+            model_name='preferredsnp',
+            index=models.Index(fields=['rsid', 'genotipo', 'snp'], name='preferred_snp_cover_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='preferredsnp',
+            constraint=models.UniqueConstraint(fields=('rsid', 'genotipo'), name='preferred_snp_pair_uniq'),
+        ),
+        migrations.RunPython(populate_preferred_snps, migrations.RunPython.noop),
+    ]
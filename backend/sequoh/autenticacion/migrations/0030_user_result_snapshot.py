@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0029_preferred_snps'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserResultSnapshot',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='result_snapshot', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('payload', models.JSONField(default=dict, verbose_name='Secciones')),
+                ('catalog_revision', models.PositiveBigIntegerField(default=0, verbose_name='Revisión del catálogo de SNPs')),
+                ('extra_info_revision', models.PositiveBigIntegerField(default=0, verbose_name='Revisión de rsid_extra_info')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Resultados',
+                'verbose_name_plural': 'Snapshots de Resultados',
+                'db_table': 'user_result_snapshots',
+            },
+        ),
+    ]
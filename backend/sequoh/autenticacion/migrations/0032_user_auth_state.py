@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0031_report_job'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAuthState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='auth_state', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('auth_version', models.PositiveIntegerField(default=0, verbose_name='Versión de autenticación')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estado de Autenticación',
+                'verbose_name_plural': 'Estados de Autenticación',
+                'db_table': 'user_auth_state',
+            },
+        ),
+    ]
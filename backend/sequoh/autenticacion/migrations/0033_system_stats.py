@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0032_user_auth_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active_users', models.PositiveIntegerField(default=0, verbose_name='Usuarios activos')),
+                ('regular_users', models.PositiveIntegerField(default=0, verbose_name='Pacientes activos')),
+                ('regular_completed', models.PositiveIntegerField(default=0, verbose_name='Pacientes con análisis completado')),
+                ('pending_reports', models.PositiveIntegerField(default=0, verbose_name='Informes pendientes')),
+                ('completed_analyses', models.PositiveIntegerField(default=0, verbose_name='Análisis completados')),
+                ('users_with_snps', models.PositiveIntegerField(default=0, verbose_name='Usuarios con variantes')),
+                ('variants_count', models.PositiveIntegerField(default=0, verbose_name='Variantes en el catálogo')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True, verbose_name='Última reconciliación')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas del Sistema',
+                'verbose_name_plural': 'Estadísticas del Sistema',
+                'db_table': 'system_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='SystemStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active_users', models.PositiveIntegerField(default=0, verbose_name='Usuarios activos')),
+                ('regular_users', models.PositiveIntegerField(default=0, verbose_name='Pacientes activos')),
+                ('regular_completed', models.PositiveIntegerField(default=0, verbose_name='Pacientes con análisis completado')),
+                ('pending_reports', models.PositiveIntegerField(default=0, verbose_name='Informes pendientes')),
+                ('completed_analyses', models.PositiveIntegerField(default=0, verbose_name='Análisis completados')),
+                ('users_with_snps', models.PositiveIntegerField(default=0, verbose_name='Usuarios con variantes')),
+                ('variants_count', models.PositiveIntegerField(default=0, verbose_name='Variantes en el catálogo')),
+                ('date', models.DateField(unique=True, verbose_name='Fecha')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Estadísticas',
+                'verbose_name_plural': 'Snapshots de Estadísticas',
+                'db_table': 'system_stats_snapshot',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0033_system_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('metric', models.CharField(choices=[('REGISTRATIONS', 'Registros'), ('UPLOADS', 'Archivos genéticos cargados'), ('COMPLETED_ANALYSES', 'Análisis completados'), ('SAMPLES_ARRIVED', 'Llegadas confirmadas en recepción'), ('SAMPLES_TAKEN', 'Muestras tomadas'), ('SAMPLES_SENT', 'Muestras enviadas al laboratorio'), ('REPORT_DOWNLOADS', 'Descargas del informe PDF')], max_length=40, verbose_name='Métrica')),
+                ('value', models.PositiveIntegerField(default=0, verbose_name='Valor')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Métrica Diaria',
+                'verbose_name_plural': 'Métricas Diarias',
+                'db_table': 'daily_metric',
+                'constraints': [models.UniqueConstraint(fields=('metric', 'date'), name='daily_metric_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:17
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0034_daily_metric'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(django.db.models.functions.text.Upper('rut'), name='profile_rut_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(django.db.models.functions.text.Upper('sample_code'), name='profile_sample_code_upper_idx'),
+        ),
+        # auth_user no es un modelo de esta app: sus índices funcionales se crean con SQL
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS auth_user_email_upper_idx ON auth_user (UPPER(email));",
+            reverse_sql="DROP INDEX IF EXISTS auth_user_email_upper_idx;",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS auth_user_username_upper_idx ON auth_user (UPPER(username));",
+            reverse_sql="DROP INDEX IF EXISTS auth_user_username_upper_idx;",
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Índices GIN de trigramas para la búsqueda aproximada de recepción (reception_search.py).
+# Son sobre UPPER(columna), la misma expresión que usan las consultas. Solo PostgreSQL:
+# en otras bases la búsqueda usa un índice en memoria.
+TRIGRAM_INDEXES = [
+    ('profile_rut_trgm_idx', 'autenticacion_profile', 'rut'),
+    ('profile_sample_code_trgm_idx', 'autenticacion_profile', 'sample_code'),
+    ('auth_user_email_trgm_idx', 'auth_user', 'email'),
+    ('auth_user_first_name_trgm_idx', 'auth_user', 'first_name'),
+    ('auth_user_last_name_trgm_idx', 'auth_user', 'last_name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0035_reception_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
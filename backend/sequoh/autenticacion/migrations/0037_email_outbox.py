@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0036_reception_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to_email', models.CharField(max_length=254, verbose_name='Destinatario')),
+                ('subject', models.CharField(blank=True, default='', max_length=255, verbose_name='Asunto')),
+                ('raw_message', models.TextField(verbose_name='Mensaje')),
+                ('status', models.CharField(choices=[('PENDING', 'En cola'), ('RUNNING', 'Procesando'), ('COMPLETED', 'Completado'), ('FAILED', 'Fallido')], default='PENDING', max_length=20, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo intento')),
+                ('error_message', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('gmail_message_id', models.CharField(blank=True, default='', max_length=64, verbose_name='Id en Gmail')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Correo en Cola',
+                'verbose_name_plural': 'Correos en Cola',
+                'db_table': 'email_outbox',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_queue_idx')],
+            },
+        ),
+    ]
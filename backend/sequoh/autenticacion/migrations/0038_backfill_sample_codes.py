@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:10
+
+import uuid
+
+from django.db import migrations
+from django.db.models import Q
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def backfill_sample_codes(apps, schema_editor):
+    """
+    Asigna SampleCode a los perfiles existentes que no tienen (misma lógica que
+    utils.backfill_sample_codes): el listado de analistas solo muestra perfiles con código.
+    """
+    Profile = apps.get_model('autenticacion', 'Profile')
+    missing = Profile.objects.filter(Q(sample_code__isnull=True) | Q(sample_code='')).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(missing.filter(pk__gt=last_pk).only('pk', 'user_id')[:BATCH_SIZE])
+        if not batch:
+            return
+        now = timezone.now()
+        for profile in batch:
+            profile.sample_code = f"SC-{profile.user_id:05d}-{uuid.uuid4().hex[:5].upper()}"
+            profile.sample_code_created_at = now
+        Profile.objects.bulk_update(batch, ['sample_code', 'sample_code_created_at'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0037_email_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sample_codes, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -96,6 +97,14 @@ class Profile(models.Model):
     # Fecha de carga del reporte
     report_uploaded_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Recepción busca sin distinguir mayúsculas (rut__iexact, sample_code__iexact):
+            # en PostgreSQL esas búsquedas usan UPPER(columna) y necesitan índices funcionales
+            models.Index(Upper('rut'), name='profile_rut_upper_idx'),
+            models.Index(Upper('sample_code'), name='profile_sample_code_upper_idx'),
+        ]
+
     def __str__(self):
         return f"Profile(user={self.user_id}, rut={self.rut}, phone={self.phone})"
 
@@ -209,6 +218,9 @@ class SNP(models.Model):
     fuente_pais = models.CharField(max_length=100, blank=True, null=True, verbose_name="Fuente - País")
     poblacion_pais = models.CharField(max_length=50, blank=True, null=True, verbose_name="Población - País")
 
+    # Prioridad precalculada (0 = Chile, 1 = América, 2 = con población, 3 = con país, 4 = resto)
+    prioridad = models.PositiveSmallIntegerField(default=4, verbose_name="Prioridad")
+
     class Meta:
         db_table = 'snps'
         verbose_name = 'SNP'
@@ -219,11 +231,50 @@ class SNP(models.Model):
             models.Index(fields=['categoria']),
             models.Index(fields=['cromosoma']),
             models.Index(fields=['nivel_riesgo']),
+            models.Index(fields=['rsid', 'prioridad'], name='snps_rsid_prioridad_idx'),
         ]
 
     def __str__(self):
         return f"SNP({self.rsid}, {self.genotipo})"
 
+    def save(self, *args, **kwargs):
+        from .catalog_index import snp_priority
+        self.prioridad = snp_priority(self.pais, self.continente, self.poblacion_pais)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'prioridad' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['prioridad']
+        super().save(*args, **kwargs)
+
+
+class PreferredSNP(models.Model):
+    """
+    SNP preferido del catálogo para cada par (rsid, genotipo), mantenido por
+    rebuild_preferred_snps. Resolver un par es una búsqueda puntual por índice.
+    """
+    rsid = models.CharField(max_length=20, verbose_name="rsID")
+    genotipo = models.CharField(max_length=10, verbose_name="Genotipo")
+    snp = models.ForeignKey(
+        SNP,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="SNP preferido"
+    )
+
+    class Meta:
+        db_table = 'preferred_snps'
+        verbose_name = 'SNP preferido'
+        verbose_name_plural = 'SNPs preferidos'
+        constraints = [
+            models.UniqueConstraint(fields=['rsid', 'genotipo'], name='preferred_snp_pair_uniq'),
+        ]
+        indexes = [
+            # Índice cubriente: la búsqueda por par se resuelve sin leer la tabla
+            models.Index(fields=['rsid', 'genotipo', 'snp'], name='preferred_snp_cover_idx'),
+        ]
+
+    def __str__(self):
+        return f"PreferredSNP({self.rsid}, {self.genotipo} -> {self.snp_id})"
+
 
 class RsidExtraInfo(models.Model):
     """
@@ -295,3 +346,318 @@ class PharmacogeneticSystem(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class ImportJobStatus(models.TextChoices):
+    PENDING = "PENDING", "En cola"
+    RUNNING = "RUNNING", "Procesando"
+    COMPLETED = "COMPLETED", "Completado"
+    FAILED = "FAILED", "Fallido"
+
+
+class GenotypeImportJob(models.Model):
+    """
+    Trabajo de importación de un archivo genético, procesado en segundo plano.
+    La tabla funciona como cola: el worker toma los trabajos PENDING por orden de llegada.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='genotype_import_jobs',
+        verbose_name="Paciente"
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='requested_import_jobs',
+        verbose_name="Solicitado por"
+    )
+    filename = models.CharField(max_length=255, verbose_name="Nombre del archivo")
+    source_path = models.CharField(max_length=500, verbose_name="Ruta del archivo en cola")
+    status = models.CharField(
+        max_length=20,
+        choices=ImportJobStatus.choices,
+        default=ImportJobStatus.PENDING,
+        verbose_name="Estado"
+    )
+
+    # Progreso
+    total_lines = models.PositiveIntegerField(default=0, verbose_name="Líneas totales")
+    lines_processed = models.PositiveIntegerField(default=0, verbose_name="Líneas procesadas")
+    snps_matched = models.PositiveIntegerField(default=0, verbose_name="SNPs encontrados")
+    snps_added = models.PositiveIntegerField(default=0, verbose_name="SNPs agregados")
+    snps_skipped = models.PositiveIntegerField(default=0, verbose_name="Líneas omitidas")
+    errors = models.JSONField(default=list, blank=True, verbose_name="Líneas con error")
+    error_message = models.TextField(blank=True, default='', verbose_name="Error")
+    email_sent = models.BooleanField(default=False, verbose_name="Email enviado")
+
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Importación de Genotipos'
+        verbose_name_plural = 'Importaciones de Genotipos'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='genotype_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"GenotypeImportJob(id={self.pk}, user={self.user_id}, status={self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (ImportJobStatus.COMPLETED, ImportJobStatus.FAILED)
+
+    @property
+    def progress_percent(self) -> float:
+        if self.status == ImportJobStatus.COMPLETED:
+            return 100.0
+        if not self.total_lines:
+            return 0.0
+        return round(min(self.lines_processed / self.total_lines, 1.0) * 100, 1)
+
+    @property
+    def eta_seconds(self):
+        """Segundos estimados para terminar según la velocidad observada (None si no hay datos)."""
+        if self.status != ImportJobStatus.RUNNING or not self.started_at or not self.lines_processed:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        rate = self.lines_processed / elapsed
+        remaining = max(self.total_lines - self.lines_processed, 0)
+        return int(round(remaining / rate))
+
+
+class ReportJob(models.Model):
+    """
+    Render en segundo plano del informe PDF de un usuario (ver report_jobs.py).
+    El PDF queda en la caché de informes bajo payload_digest; la fila solo registra el estado.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='report_jobs',
+        verbose_name="Usuario"
+    )
+    # Mismos estados que las importaciones
+    status = models.CharField(
+        max_length=20,
+        choices=ImportJobStatus.choices,
+        default=ImportJobStatus.PENDING,
+        verbose_name="Estado"
+    )
+    payload_digest = models.CharField(max_length=64, blank=True, default='', verbose_name="Hash del payload")
+    error_message = models.TextField(blank=True, default='', verbose_name="Error")
+
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Generación de Informe'
+        verbose_name_plural = 'Generaciones de Informes'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"ReportJob(id={self.pk}, user={self.user_id}, status={self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (ImportJobStatus.COMPLETED, ImportJobStatus.FAILED)
+
+
+class UserAuthState(models.Model):
+    """
+    Versión de las credenciales de un usuario. Va firmada en el JWT (claim "av") y se
+    incrementa al cambiar su contraseña, sus grupos o sus flags de staff: los tokens con
+    una versión anterior dejan de ser válidos (ver auth_cache.py).
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='auth_state',
+        verbose_name="Usuario"
+    )
+    auth_version = models.PositiveIntegerField(default=0, verbose_name="Versión de autenticación")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_auth_state'
+        verbose_name = 'Estado de Autenticación'
+        verbose_name_plural = 'Estados de Autenticación'
+
+    def __str__(self):
+        return f"UserAuthState(user={self.user_id}, v={self.auth_version})"
+
+
+class CatalogRevision(models.Model):
+    """
+    Contador de versión de un catálogo (p.ej. la tabla snps). Los cargadores lo
+    incrementan al modificar el catálogo y las cachés en memoria de cada proceso lo
+    comparan para saber cuándo recargar.
+    """
+    key = models.CharField(max_length=50, unique=True, verbose_name="Catálogo")
+    revision = models.PositiveBigIntegerField(default=0, verbose_name="Revisión")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Revisión de Catálogo'
+        verbose_name_plural = 'Revisiones de Catálogo'
+
+    def __str__(self):
+        return f"CatalogRevision({self.key}={self.revision})"
+
+
+class UserResultSnapshot(models.Model):
+    """
+    Resultados precalculados de un usuario (todas las secciones como JSON). Se construye
+    al terminar una carga de archivo genético y se elimina al borrar el reporte; las
+    revisiones de catálogo permiten detectar si quedó desactualizado.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='result_snapshot',
+        verbose_name="Usuario"
+    )
+    payload = models.JSONField(default=dict, verbose_name="Secciones")
+    catalog_revision = models.PositiveBigIntegerField(default=0, verbose_name="Revisión del catálogo de SNPs")
+    extra_info_revision = models.PositiveBigIntegerField(default=0, verbose_name="Revisión de rsid_extra_info")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_result_snapshots'
+        verbose_name = 'Snapshot de Resultados'
+        verbose_name_plural = 'Snapshots de Resultados'
+
+    def __str__(self):
+        return f"UserResultSnapshot(user={self.user_id}, rev={self.catalog_revision})"
+
+
+class StatsCounters(models.Model):
+    """Contadores de las estadísticas de administración (ver system_stats.py)."""
+    active_users = models.PositiveIntegerField(default=0, verbose_name="Usuarios activos")
+    regular_users = models.PositiveIntegerField(default=0, verbose_name="Pacientes activos")
+    regular_completed = models.PositiveIntegerField(default=0, verbose_name="Pacientes con análisis completado")
+    pending_reports = models.PositiveIntegerField(default=0, verbose_name="Informes pendientes")
+    completed_analyses = models.PositiveIntegerField(default=0, verbose_name="Análisis completados")
+    users_with_snps = models.PositiveIntegerField(default=0, verbose_name="Usuarios con variantes")
+    variants_count = models.PositiveIntegerField(default=0, verbose_name="Variantes en el catálogo")
+
+    class Meta:
+        abstract = True
+
+
+class SystemStats(StatsCounters):
+    """
+    Fila única con los contadores actuales. Las señales la ajustan con incrementos al
+    cambiar usuarios, perfiles o grupos, y reconcile_stats la recalcula desde cero.
+    """
+    updated_at = models.DateTimeField(auto_now=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True, verbose_name="Última reconciliación")
+
+    class Meta:
+        db_table = 'system_stats'
+        verbose_name = 'Estadísticas del Sistema'
+        verbose_name_plural = 'Estadísticas del Sistema'
+
+    def __str__(self):
+        return f"SystemStats(users={self.regular_users}, completed={self.regular_completed})"
+
+
+class SystemStatsSnapshot(StatsCounters):
+    """Copia diaria de los contadores, para calcular el crecimiento respecto a días anteriores."""
+    date = models.DateField(unique=True, verbose_name="Fecha")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'system_stats_snapshot'
+        ordering = ['-date']
+        verbose_name = 'Snapshot de Estadísticas'
+        verbose_name_plural = 'Snapshots de Estadísticas'
+
+    def __str__(self):
+        return f"SystemStatsSnapshot({self.date})"
+
+
+class MetricName(models.TextChoices):
+    REGISTRATIONS = "REGISTRATIONS", "Registros"
+    UPLOADS = "UPLOADS", "Archivos genéticos cargados"
+    COMPLETED_ANALYSES = "COMPLETED_ANALYSES", "Análisis completados"
+    SAMPLES_ARRIVED = "SAMPLES_ARRIVED", "Llegadas confirmadas en recepción"
+    SAMPLES_TAKEN = "SAMPLES_TAKEN", "Muestras tomadas"
+    SAMPLES_SENT = "SAMPLES_SENT", "Muestras enviadas al laboratorio"
+    REPORT_DOWNLOADS = "REPORT_DOWNLOADS", "Descargas del informe PDF"
+
+
+class DailyMetric(models.Model):
+    """
+    Valor diario de una métrica del dashboard. rollup_metrics las calcula desde las tablas
+    de forma incremental; las descargas del informe se suman al momento (ver metrics.py).
+    """
+    date = models.DateField(verbose_name="Fecha")
+    metric = models.CharField(max_length=40, choices=MetricName.choices, verbose_name="Métrica")
+    value = models.PositiveIntegerField(default=0, verbose_name="Valor")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'daily_metric'
+        verbose_name = 'Métrica Diaria'
+        verbose_name_plural = 'Métricas Diarias'
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'date'], name='daily_metric_unique'),
+        ]
+
+    def __str__(self):
+        return f"DailyMetric({self.metric} {self.date}={self.value})"
+
+
+class EmailOutbox(models.Model):
+    """
+    Correo pendiente de envío por la API de Gmail (ver email_outbox.py). send_email deja el
+    mensaje MIME ya armado en esta tabla y el worker lo envía; si falla se reintenta con
+    espera creciente hasta EMAIL_OUTBOX_MAX_ATTEMPTS.
+    """
+    to_email = models.CharField(max_length=254, verbose_name="Destinatario")
+    subject = models.CharField(max_length=255, blank=True, default='', verbose_name="Asunto")
+    # Mensaje MIME completo en base64url, tal como lo recibe messages.send
+    raw_message = models.TextField(verbose_name="Mensaje")
+    # Mismos estados que las importaciones (COMPLETED = enviado)
+    status = models.CharField(
+        max_length=20,
+        choices=ImportJobStatus.choices,
+        default=ImportJobStatus.PENDING,
+        verbose_name="Estado"
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Intentos")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Próximo intento")
+    error_message = models.TextField(blank=True, default='', verbose_name="Error")
+    gmail_message_id = models.CharField(max_length=64, blank=True, default='', verbose_name="Id en Gmail")
+
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'email_outbox'
+        verbose_name = 'Correo en Cola'
+        verbose_name_plural = 'Correos en Cola'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"EmailOutbox(id={self.pk}, to={self.to_email}, status={self.status})"
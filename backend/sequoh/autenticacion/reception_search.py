@@ -0,0 +1,179 @@
+"""
+Búsquedas de recepción.
+
+- Exacta (reception_search_queryset): compara UPPER(columna) = UPPER(valor), resuelta
+  por los índices funcionales de Profile y auth_user.
+- Aproximada (fuzzy_search): prefijos y errores de tipeo en RUT, nombre, correo y código
+  de muestra. En PostgreSQL usa pg_trgm (operador % y LIKE 'X%' sobre índices GIN de
+  UPPER(columna)); en otras bases, un índice de trigramas en memoria por proceso que se
+  reconstruye al cambiar usuarios o perfiles, o a más tardar tras
+  RECEPTION_NGRAM_TTL_SECONDS. Ambos puntúan igual: primero los prefijos, luego la
+  similitud de trigramas (como similarity() de pg_trgm).
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+from .models import Profile
+
+MAX_RESULTS = 25
+MIN_FUZZY_LENGTH = 2
+DEFAULT_NGRAM_TTL_SECONDS = 60
+# Umbral de similitud de trigramas; el mismo valor por defecto que pg_trgm
+SIMILARITY_THRESHOLD = 0.3
+
+# Campos de la búsqueda aproximada: alias -> columna
+FUZZY_FIELDS = {
+    'rut_upper': 'rut',
+    'sample_code_upper': 'sample_code',
+    'email_upper': 'user__email',
+    'first_name_upper': 'user__first_name',
+    'last_name_upper': 'user__last_name',
+}
+
+
+def visible_profiles():
+    """Perfiles que recepción puede ver: usuarios activos que no son staff del sistema."""
+    staff_membership = User.groups.through.objects.filter(
+        user_id=OuterRef("user_id"), group__name__in=["ADMIN", "ANALISTA"]
+    )
+    return (
+        Profile.objects.select_related("user")
+        .filter(user__is_active=True, user__is_superuser=False)
+        .exclude(Exists(staff_membership))
+    )
+
+
+def _upper_equals(field, value):
+    """Comparación sin mayúsculas con la misma expresión de los índices UPPER(columna)."""
+    return Q(**{f"{field}_upper": Upper(Value(value))})
+
+
+def reception_search_queryset(rut="", email="", sample_code=""):
+    """
+    Perfiles que coinciden exactamente (sin distinguir mayúsculas) con los criterios.
+    Cada criterio usa un índice funcional de Profile (rut, sample_code) o de auth_user
+    (email, username).
+    """
+    qs = visible_profiles()
+    if rut:
+        qs = qs.alias(rut_upper=Upper("rut")).filter(_upper_equals("rut", rut))
+    if email:
+        qs = qs.alias(email_upper=Upper("user__email"), username_upper=Upper("user__username")).filter(
+            _upper_equals("email", email) | _upper_equals("username", email)
+        )
+    if sample_code:
+        qs = qs.alias(sample_code_upper=Upper("sample_code")).filter(_upper_equals("sample_code", sample_code))
+    return qs
+
+
+def fuzzy_search(query, limit=MAX_RESULTS):
+    """Perfiles ordenados por relevancia para un texto parcial o mal escrito."""
+    needle = " ".join(query.split()).upper()
+    if len(needle) < MIN_FUZZY_LENGTH:
+        return []
+    if connection.vendor == 'postgresql':
+        return _trigram_search(needle, limit)
+    return _ngram_index.search(needle, limit)
+
+
+def _trigram_search(needle, limit):
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    qs = visible_profiles().alias(**{alias: Upper(column) for alias, column in FUZZY_FIELDS.items()})
+    prefix = Q()
+    similar = Q()
+    for alias in FUZZY_FIELDS:
+        prefix |= Q(**{f"{alias}__startswith": needle})
+        # Operador % de pg_trgm: usa los índices GIN (similarity >= pg_trgm.similarity_threshold)
+        similar |= Q(**{f"{alias}__trigram_similar": needle})
+    return list(
+        qs.filter(prefix | similar)
+        .annotate(
+            prefix_match=Case(When(prefix, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            similarity=Greatest(*(TrigramSimilarity(alias, needle) for alias in FUZZY_FIELDS)),
+        )
+        .order_by("-prefix_match", "-similarity", "user_id")[:limit]
+    )
+
+
+def trigrams(text):
+    """Trigramas de cada palabra al estilo de pg_trgm (dos espacios antes, uno después)."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NgramIndex:
+    """Índice invertido trigrama -> perfiles, para bases sin pg_trgm."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._entries = {}
+        self._postings = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_built(self):
+        ttl = getattr(settings, 'RECEPTION_NGRAM_TTL_SECONDS', DEFAULT_NGRAM_TTL_SECONDS)
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < ttl:
+                return self._entries, self._postings
+
+        entries = {}
+        postings = {}
+        rows = visible_profiles().values_list(*(column for column in FUZZY_FIELDS.values()), "pk")
+        for *values, profile_id in rows:
+            texts = [value.upper() for value in values if value]
+            grams = [trigrams(text) for text in texts]
+            entries[profile_id] = (texts, grams)
+            for gram in set().union(*grams):
+                postings.setdefault(gram, set()).add(profile_id)
+
+        with self._lock:
+            self._entries, self._postings = entries, postings
+            self._built_at = time.monotonic()
+        return entries, postings
+
+    def search(self, needle, limit):
+        entries, postings = self._ensure_built()
+        needle_grams = trigrams(needle)
+        candidates = set()
+        for gram in needle_grams:
+            candidates |= postings.get(gram, set())
+
+        scored = []
+        for profile_id in candidates:
+            texts, grams = entries[profile_id]
+            prefix_match = int(any(text.startswith(needle) for text in texts))
+            similarity = max(_similarity(needle_grams, field_grams) for field_grams in grams)
+            if prefix_match or similarity >= SIMILARITY_THRESHOLD:
+                scored.append((-prefix_match, -similarity, profile_id))
+        top_ids = [profile_id for _, _, profile_id in sorted(scored)[:limit]]
+
+        profiles = visible_profiles().in_bulk(top_ids)
+        return [profiles[profile_id] for profile_id in top_ids if profile_id in profiles]
+
+
+_ngram_index = NgramIndex()
+
+
+def invalidate_ngram_index():
+    _ngram_index.invalidate()
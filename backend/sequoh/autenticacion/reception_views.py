@@ -1,6 +1,5 @@
 import json
 import uuid
-from django.db.models import Q
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -8,6 +7,7 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from .authentication import JWTAuthentication
 from .models import Profile, SampleStatus, ServiceStatus
+from .reception_search import MAX_RESULTS, MIN_FUZZY_LENGTH, fuzzy_search, reception_search_queryset
 from .roles import is_admin, is_reception
 from .utils import ensure_sample_code
 from .email_utils import send_email, build_branded_html
@@ -42,7 +42,11 @@ def serialize_reception_profile(profile: Profile) -> dict:
 
 
 class ReceptionSearchAPIView(APIView):
-    """Busca usuarios por RUT, correo o SampleCode. Solo recepción/admin."""
+    """
+    Busca usuarios por RUT, correo o SampleCode. Solo recepción/admin.
+    Con mode=fuzzy acepta un texto parcial o mal escrito (q, o cualquiera de los campos)
+    y busca también por nombre, ordenando por relevancia.
+    """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -53,21 +57,26 @@ class ReceptionSearchAPIView(APIView):
         rut = (request.query_params.get("rut") or "").strip()
         email = (request.query_params.get("email") or "").strip()
         sample_code = (request.query_params.get("sample_code") or "").strip()
+        mode = (request.query_params.get("mode") or "exact").strip().lower()
+        if mode not in ("exact", "fuzzy"):
+            return Response({"error": "mode debe ser exact o fuzzy"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if mode == "fuzzy":
+            query = (request.query_params.get("q") or "").strip() or rut or email or sample_code
+            if len(query) < MIN_FUZZY_LENGTH:
+                return Response(
+                    {"error": f"La búsqueda debe tener al menos {MIN_FUZZY_LENGTH} caracteres"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            results = [serialize_reception_profile(p) for p in fuzzy_search(query)]
+            return Response({"results": results})
+
         query = rut or email or sample_code
         if not query:
             return Response({"error": "Debes enviar rut, email o sample_code"}, status=status.HTTP_400_BAD_REQUEST)
 
-        qs = Profile.objects.select_related("user").filter(user__is_active=True, user__is_superuser=False)
-        qs = qs.exclude(user__groups__name__in=["ADMIN", "ANALISTA"])
-
-        if rut:
-            qs = qs.filter(rut__iexact=rut)
-        if email:
-            qs = qs.filter(Q(user__email__iexact=email) | Q(user__username__iexact=email))
-        if sample_code:
-            qs = qs.filter(sample_code__iexact=sample_code)
-
-        results = [serialize_reception_profile(p) for p in qs[:25]]
+        qs = reception_search_queryset(rut=rut, email=email, sample_code=sample_code)
+        results = [serialize_reception_profile(p) for p in qs[:MAX_RESULTS]]
         return Response({"results": results})
 
 
@@ -0,0 +1,167 @@
+"""
+Caché en disco de informes PDF, direccionada por contenido.
+
+La clave es el sha256 del JSON canónico que produce build_report_payload (sin la fecha
+de emisión): si cambian los SNPs del usuario, su información extra o sus datos, cambia
+el payload y con él la clave, así que no hace falta invalidar nada a mano. Cada archivo
+lleva además el id del usuario (<user_id>_<sha256>.pdf): al guardar una versión nueva se
+borra la anterior, y al eliminar los resultados de un usuario se borran sus informes.
+El resto se elimina por tamaño total (LRU según la fecha de modificación, que se
+actualiza en cada acierto).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+# Campos del payload que no afectan al contenido cacheable
+VOLATILE_PERSON_FIELDS = ('date',)
+# Un render en curso nunca tarda tanto (REPORT_RENDER_TIMEOUT es 600 s por defecto)
+STALE_TMP_SECONDS = 60 * 60
+
+_evict_lock = threading.Lock()
+
+
+def report_cache_dir() -> Path:
+    path = Path(getattr(settings, 'REPORT_CACHE_DIR', settings.BASE_DIR / 'media' / 'report_cache'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def payload_digest(payload):
+    """sha256 del payload en JSON canónico, excluyendo la fecha de emisión."""
+    people = [
+        {key: value for key, value in person.items() if key not in VOLATILE_PERSON_FIELDS}
+        for person in payload.get('people', [])
+    ]
+    canonical = json.dumps(
+        {**payload, 'people': people},
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def etag_for(digest):
+    return f'"{digest}"'
+
+
+def etag_matches(request, digest):
+    header = request.headers.get('If-None-Match', '')
+    if not header:
+        return False
+    etag = etag_for(digest)
+    # Se aceptan también las variantes débiles (W/"...") que agregan algunos proxies
+    return any(candidate.strip().removeprefix('W/') == etag for candidate in header.split(','))
+
+
+def _entry_path(user_id, digest):
+    return report_cache_dir() / f'{user_id}_{digest}.pdf'
+
+
+def _user_entries(user_id):
+    return report_cache_dir().glob(f'{user_id}_*.pdf')
+
+
+def get_cached_report(user_id, digest):
+    """Ruta del PDF cacheado o None. Un acierto lo marca como usado recientemente."""
+    path = _entry_path(user_id, digest)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def new_report_tmp_path(user_id, digest):
+    """
+    Ruta temporal dentro del directorio de la caché donde el renderizador escribe el
+    PDF; commit_report_file la mueve a su lugar sin copiarla.
+    """
+    return report_cache_dir() / f'.{user_id}_{digest}.{uuid.uuid4().hex}.tmp'
+
+
+def commit_report_file(user_id, digest, tmp_path):
+    """
+    Publica el PDF de forma atómica, descarta las versiones anteriores del mismo usuario
+    y aplica el límite de tamaño de la caché.
+    """
+    path = _entry_path(user_id, digest)
+    os.replace(tmp_path, path)
+
+    for old_path in _user_entries(user_id):
+        if old_path != path:
+            _remove(old_path)
+    evict_reports()
+    return path
+
+
+def discard_report_tmp(tmp_path):
+    """Elimina un temporal que no llegó a publicarse (no falla si ya no existe)."""
+    _remove(tmp_path)
+
+
+def invalidate_user_reports(user_id):
+    """Elimina los informes cacheados de un usuario (p.ej. al borrar su archivo genético)."""
+    removed = 0
+    for path in _user_entries(user_id):
+        _remove(path)
+        removed += 1
+    return removed
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def evict_reports(max_bytes=None):
+    """Elimina los PDFs usados hace más tiempo hasta quedar bajo REPORT_CACHE_MAX_BYTES."""
+    max_bytes = max_bytes if max_bytes is not None else getattr(
+        settings, 'REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES
+    )
+    with _evict_lock:
+        entries = []
+        total = 0
+        stale_tmp_cutoff = time.time() - STALE_TMP_SECONDS
+        for entry in os.scandir(report_cache_dir()):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith('.tmp'):
+                # Temporales de renders interrumpidos
+                if stat.st_mtime < stale_tmp_cutoff:
+                    _remove(entry.path)
+                continue
+            if not entry.name.endswith('.pdf'):
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        if total <= max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            _remove(path)
+            total -= size
+            removed += 1
+        logger.info(f"Caché de informes: {removed} PDFs eliminados por tamaño")
+        return removed
@@ -0,0 +1,159 @@
+"""
+Cola de generación de informes PDF.
+
+Al terminar una importación de archivo genético se encola un ReportJob que deja el
+informe en la caché de informes (report_cache.py), de modo que la primera descarga ya
+no espera al navegador. UserReportPDFView sirve el PDF si ya está en caché y, si no,
+encola un trabajo y responde 202 con su id para consultar el estado.
+
+REPORT_JOB_MAX_CONCURRENT limita cuántos renders corren a la vez entre todos los
+procesos (web con worker en proceso y run_worker), para que Chromium no le quite CPU
+ni memoria a los workers web.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .background import kick_worker, register_queue
+from .models import ImportJobStatus, ReportJob
+from .report_cache import (
+    commit_report_file,
+    discard_report_tmp,
+    get_cached_report,
+    new_report_tmp_path,
+    payload_digest,
+)
+from .report_payload import build_report_payload
+from .report_renderer import render_report
+
+logger = logging.getLogger(__name__)
+
+QUEUE_NAME = 'report_render'
+DEFAULT_MAX_CONCURRENT = 1
+DEFAULT_STALE_SECONDS = 15 * 60
+
+ACTIVE_STATUSES = (ImportJobStatus.PENDING, ImportJobStatus.RUNNING)
+
+
+def enqueue_report_job(user, digest=''):
+    """
+    Encola el render del informe del usuario. Si ya tiene uno pendiente o en curso se
+    devuelve ese mismo: el trabajo calcula el payload al ejecutarse.
+    """
+    active_job = (
+        ReportJob.objects.filter(user=user, status__in=ACTIVE_STATUSES)
+        .order_by('-created_at')
+        .first()
+    )
+    if active_job is not None:
+        return active_job
+
+    job = ReportJob.objects.create(user=user, payload_digest=digest)
+    logger.info(f"Informe encolado: job={job.pk}, usuario={user.email}")
+    kick_worker()
+    return job
+
+
+def _requeue_stale_jobs():
+    """Devuelve a la cola los renders RUNNING que no terminaron (p.ej. el proceso murió)."""
+    stale_seconds = getattr(settings, 'REPORT_JOB_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+    requeued = ReportJob.objects.filter(
+        status=ImportJobStatus.RUNNING,
+        updated_at__lt=cutoff,
+    ).update(status=ImportJobStatus.PENDING, updated_at=timezone.now())
+    if requeued:
+        logger.warning(f"{requeued} informes sin terminar devueltos a la cola")
+
+
+def claim_next_job():
+    """
+    Toma el informe pendiente más antiguo si hay cupo bajo REPORT_JOB_MAX_CONCURRENT.
+    Si dos workers reclaman a la vez y se pasa del límite, cede el trabajo más nuevo.
+    """
+    _requeue_stale_jobs()
+    max_concurrent = getattr(settings, 'REPORT_JOB_MAX_CONCURRENT', DEFAULT_MAX_CONCURRENT)
+    running = ReportJob.objects.filter(status=ImportJobStatus.RUNNING)
+
+    while True:
+        if running.count() >= max_concurrent:
+            return None
+
+        job_id = (
+            ReportJob.objects.filter(status=ImportJobStatus.PENDING)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        now = timezone.now()
+        claimed = ReportJob.objects.filter(pk=job_id, status=ImportJobStatus.PENDING).update(
+            status=ImportJobStatus.RUNNING,
+            started_at=now,
+            updated_at=now,
+        )
+        if not claimed:
+            continue
+
+        if running.filter(pk__lt=job_id).count() >= max_concurrent:
+            ReportJob.objects.filter(pk=job_id, status=ImportJobStatus.RUNNING).update(
+                status=ImportJobStatus.PENDING,
+                started_at=None,
+                updated_at=now,
+            )
+            return None
+        return ReportJob.objects.select_related('user').get(pk=job_id)
+
+
+def process_report_job(job):
+    """Construye el payload actual del usuario y lo deja renderizado en la caché."""
+    try:
+        payload = build_report_payload(job.user)
+        digest = payload_digest(payload)
+        if get_cached_report(job.user_id, digest) is None:
+            tmp_path = new_report_tmp_path(job.user_id, digest)
+            try:
+                render_report(payload, tmp_path)
+                commit_report_file(job.user_id, digest, tmp_path)
+            finally:
+                discard_report_tmp(tmp_path)
+            logger.info(f"Informe {job.pk} renderizado para usuario {job.user.email}")
+        job.payload_digest = digest
+        job.status = ImportJobStatus.COMPLETED
+    except Exception as e:
+        logger.error(f"Error generando informe {job.pk}: {str(e)}", exc_info=True)
+        job.status = ImportJobStatus.FAILED
+        job.error_message = str(e)
+
+    job.finished_at = timezone.now()
+    job.updated_at = job.finished_at
+    job.save(update_fields=['status', 'payload_digest', 'error_message', 'finished_at', 'updated_at'])
+    return job
+
+
+def process_next_report_job():
+    """Handler de la cola: procesa un informe si hay alguno pendiente y cupo libre."""
+    job = claim_next_job()
+    if job is None:
+        return False
+    process_report_job(job)
+    return True
+
+
+def serialize_report_job(job):
+    return {
+        "job_id": job.pk,
+        "status": job.status,
+        "error": job.error_message or None,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+register_queue(QUEUE_NAME, process_next_report_job)
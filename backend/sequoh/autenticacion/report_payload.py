@@ -0,0 +1,224 @@
+"""
+Payload del informe PDF: lo que se envía al report-generator para un usuario.
+"""
+
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Profile, UserSNP
+from .utils import ensure_sample_code, build_rsid_extra_info_map
+
+CATEGORY_ORDER = [
+    "enfermedades",
+    "farmacogenetica",
+    "biometricas",
+    "biomarcadores",
+    "rasgos",
+]
+
+CATEGORY_LABELS = {
+    "enfermedades": "Enfermedades",
+    "farmacogenetica": "Farmacogenetica",
+    "biometricas": "Biometricas",
+    "biomarcadores": "Biomarcadores",
+    "rasgos": "Rasgos",
+}
+
+RISK_LABELS = {
+    "high": "Alto",
+    "mid": "Medio",
+    "low": "Bajo",
+}
+
+
+def _normalize_text(value):
+    if not value:
+        return ""
+    text = str(value).strip()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.lower()
+
+
+def _normalize_category(value):
+    norm = _normalize_text(value)
+    if not norm:
+        return None
+    if "enfermedad" in norm:
+        return "enfermedades"
+    if "farmaco" in norm:
+        return "farmacogenetica"
+    if "biomarc" in norm:
+        return "biomarcadores"
+    if "biometr" in norm:
+        return "biometricas"
+    if "rasgo" in norm:
+        return "rasgos"
+    return None
+
+
+def _normalize_risk(value):
+    norm = _normalize_text(value)
+    if not norm:
+        return "low"
+    if "alto" in norm or norm == "high":
+        return "high"
+    if "inter" in norm or "medio" in norm or norm in {"medium", "mid"}:
+        return "mid"
+    if "bajo" in norm or norm == "low":
+        return "low"
+    return "low"
+
+
+def _normalize_indigenous_name(raw_name):
+    if not raw_name:
+        return "Desconocido"
+    name = str(raw_name).replace("_", " ").strip()
+    fixes = {
+        "Aimara": "Aymara",
+        "Chileno_general": "Chileno general",
+        "Chileno general": "Chileno general",
+    }
+    return fixes.get(name, name)
+
+
+def build_report_payload(user):
+    profile = Profile.objects.filter(user=user).first()
+    user_snps = list(UserSNP.objects.filter(user=user).select_related("snp").order_by("id"))
+    extra_info_map = build_rsid_extra_info_map([us.snp for us in user_snps if us.snp])
+    return {"people": [_build_person(user, profile, user_snps, extra_info_map)]}
+
+
+def build_report_payloads(users):
+    """
+    Payloads de varios usuarios con consultas por lote (perfiles, SNPs e información
+    extra). Devuelve {user_id: payload}, cada uno igual al de build_report_payload.
+    """
+    user_ids = [user.pk for user in users]
+    profiles = {profile.user_id: profile for profile in Profile.objects.filter(user_id__in=user_ids)}
+    snps_by_user = defaultdict(list)
+    for user_snp in (
+        UserSNP.objects.filter(user_id__in=user_ids).select_related("snp").order_by("user_id", "id")
+    ):
+        snps_by_user[user_snp.user_id].append(user_snp)
+    extra_info_map = build_rsid_extra_info_map(
+        [us.snp for user_snps in snps_by_user.values() for us in user_snps if us.snp]
+    )
+    return {
+        user.pk: {"people": [_build_person(user, profiles.get(user.pk), snps_by_user[user.pk], extra_info_map)]}
+        for user in users
+    }
+
+
+def _build_person(user, profile, user_snps, extra_info_map):
+    report_id = ensure_sample_code(profile) if profile else f"USR-{user.id:06d}"
+    display_name = f"{user.first_name} {user.last_name}".strip() or user.username
+    snps_analyzed = len(user_snps)
+
+    areas = {
+        key: {"total": 0, "counts": {"high": 0, "mid": 0, "low": 0}}
+        for key in CATEGORY_ORDER
+    }
+    risk_counts = {"high": 0, "mid": 0, "low": 0, "neutral": 0}
+    rsids = []
+
+    country_counts = defaultdict(int)
+    indigenous_counts = defaultdict(int)
+
+    for user_snp in user_snps:
+        snp = user_snp.snp
+        if not snp:
+            continue
+
+        phenotype_name = (snp.fenotipo or "N/D").strip() or "N/D"
+        extra_info = extra_info_map.get((snp.rsid, snp.genotipo, phenotype_name))
+        freq_chile = None
+        if extra_info and extra_info.freq_chile_percent is not None:
+            try:
+                freq_chile = float(extra_info.freq_chile_percent)
+            except (TypeError, ValueError):
+                freq_chile = None
+
+        if snp.pais:
+            country_counts[str(snp.pais).strip()] += 1
+        if snp.pais and str(snp.pais).strip().lower() == "chile" and snp.poblacion_pais:
+            indigenous_counts[str(snp.poblacion_pais).strip()] += 1
+
+        category_key = _normalize_category(snp.categoria or snp.grupo)
+        if not category_key:
+            continue
+
+        risk_key = _normalize_risk(snp.nivel_riesgo)
+        areas[category_key]["total"] += 1
+        areas[category_key]["counts"][risk_key] += 1
+        risk_counts[risk_key] += 1
+
+        rsids.append(
+            {
+                "rsid": snp.rsid,
+                "fenotipo": snp.fenotipo,
+                "categoria": category_key,
+                "grupo": snp.grupo,
+                "genotipo": snp.genotipo,
+                "riesgo": RISK_LABELS.get(risk_key, "Bajo"),
+                "magnitudEfecto": float(snp.magnitud_efecto)
+                if snp.magnitud_efecto is not None
+                else None,
+                "aleloReferencia": snp.alelo_referencia,
+                "aleloAlternativo": snp.alelo_alternativo,
+                "cromosoma": snp.cromosoma,
+                "posicion": str(snp.posicion) if snp.posicion is not None else None,
+                "fuente": snp.fuente_base_datos,
+                "porcentajeChilenos": freq_chile,
+                "phenotypeDescription": extra_info.phenotype_description if extra_info else None,
+                "pais": snp.pais,
+            }
+        )
+
+    ancestry_items = []
+    total_country = sum(country_counts.values())
+    for country, count in sorted(country_counts.items(), key=lambda x: x[1], reverse=True):
+        pct = round((count / total_country) * 100, 2) if total_country else 0
+        ancestry_items.append({"country": country, "pct": pct})
+
+    if ancestry_items:
+        total_pct = sum(item["pct"] for item in ancestry_items)
+        if total_pct and abs(total_pct - 100.0) > 0.01:
+            ancestry_items[0]["pct"] = round(ancestry_items[0]["pct"] + (100.0 - total_pct), 2)
+
+    ancestry_top5 = ancestry_items[:5]
+    ancestry_map = {item["country"]: item["pct"] for item in ancestry_items}
+
+    indigenous_items = []
+    total_indigenous = sum(indigenous_counts.values())
+    for name, count in sorted(indigenous_counts.items(), key=lambda x: x[1], reverse=True):
+        pct = round((count / total_indigenous) * 100, 2) if total_indigenous else 0
+        indigenous_items.append(
+            {
+                "name": _normalize_indigenous_name(name),
+                "percentage": pct,
+                "variantCount": count,
+            }
+        )
+
+    frontend_domain = getattr(settings, "FRONTEND_DOMAIN", "https://pds-kappa.vercel.app")
+
+    return {
+        "name": display_name,
+        "displayName": display_name,
+        "reportId": report_id,
+        "date": timezone.now().strftime("%d/%m/%Y"),
+        "link": frontend_domain,
+        "summary": {
+            "snpsAnalyzed": snps_analyzed,
+            "riskCounts": risk_counts,
+        },
+        "areas": areas,
+        "ancestryTop5": ancestry_top5,
+        "ancestryMap": ancestry_map,
+        "indigenousData": indigenous_items,
+        "rsids": rsids,
+    }
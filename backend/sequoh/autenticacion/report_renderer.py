@@ -0,0 +1,237 @@
+"""
+Render del informe PDF.
+
+El camino normal es el servicio persistente del report-generator (render-server.js),
+que mantiene un Chromium abierto con un pool de pestañas: se le envía el payload de
+build_report_payload y devuelve el PDF ya combinado. Si el servicio no está disponible
+se ejecuta generate.js como subproceso, igual que antes (un Node y un navegador por
+descarga).
+
+El report-generator entrega un único PDF ya combinado y con los enlaces del índice
+(report-core.js), así que aquí no se lee ni se reescribe ningún PDF: la respuesta del
+servicio se copia por bloques a output_path (normalmente un temporal de la caché de
+informes) y el archivo del subproceso simplemente se mueve allí.
+"""
+
+import base64
+import http.client
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE_URL = 'http://127.0.0.1:3917'
+DEFAULT_TIMEOUT = 600
+DEFAULT_CONNECT_TIMEOUT = 2
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ReportRenderError(Exception):
+    """El generador respondió pero no pudo producir el PDF."""
+
+
+class RenderServiceUnavailable(Exception):
+    """El servicio de render no está escuchando (o no respondió a tiempo al conectar)."""
+
+
+class RenderedReport(NamedTuple):
+    path: Path
+    toc_entries: list
+    pages: int
+
+
+class BatchRenderResult(NamedTuple):
+    report: Optional[RenderedReport]
+    error: Optional[str]
+
+
+def find_report_generator_dir():
+    """Directorio del report-generator (el que contiene generate.js) o None."""
+    candidate_dirs = []
+    env_dir = os.environ.get("REPORT_GENERATOR_DIR")
+    if env_dir:
+        candidate_dirs.append(Path(env_dir))
+    candidate_dirs.extend([
+        settings.BASE_DIR / "report-generator",
+        settings.BASE_DIR.parent / "report-generator",
+        settings.BASE_DIR.parent.parent / "report-generator",
+    ])
+
+    for candidate in candidate_dirs:
+        if (candidate / "generate.js").exists():
+            return candidate
+    return None
+
+
+# =========================
+#   Servicio persistente
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def _service_connection(timeout):
+    socket_path = getattr(settings, 'REPORT_RENDER_SOCKET', '')
+    if socket_path:
+        return _UnixHTTPConnection(socket_path, timeout)
+    url = urlsplit(getattr(settings, 'REPORT_RENDER_SERVICE_URL', DEFAULT_SERVICE_URL))
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+
+
+def render_with_service(payload, output_path):
+    if not getattr(settings, 'REPORT_RENDER_SERVICE_ENABLED', True):
+        raise RenderServiceUnavailable("Servicio de render deshabilitado")
+
+    timeout = getattr(settings, 'REPORT_RENDER_TIMEOUT', DEFAULT_TIMEOUT)
+    connect_timeout = getattr(settings, 'REPORT_RENDER_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    conn = _service_connection(connect_timeout)
+    try:
+        try:
+            conn.connect()
+        except (ConnectionRefusedError, FileNotFoundError, socket.timeout) as e:
+            raise RenderServiceUnavailable(str(e))
+        # Conexión rápida, pero el render de un informe grande puede tardar minutos
+        conn.sock.settimeout(timeout)
+
+        conn.request('POST', '/render', body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        if response.status != 200:
+            data = response.read()
+            try:
+                error_msg = json.loads(data.decode('utf-8')).get('error')
+            except ValueError:
+                error_msg = None
+            raise ReportRenderError(error_msg or f"El servicio de render respondió {response.status}")
+
+        # El PDF se copia por bloques: nunca está completo en memoria
+        with open(output_path, 'wb') as fh:
+            while chunk := response.read(STREAM_CHUNK_SIZE):
+                fh.write(chunk)
+
+        toc_header = response.getheader('X-Report-Toc')
+        toc_entries = json.loads(base64.b64decode(toc_header)) if toc_header else []
+        pages = int(response.getheader('X-Report-Pages') or 0)
+        return RenderedReport(Path(output_path), toc_entries, pages)
+    except (ConnectionResetError, http.client.RemoteDisconnected) as e:
+        # El servicio se cayó a mitad del render (p.ej. reinicio)
+        raise RenderServiceUnavailable(str(e))
+    finally:
+        conn.close()
+
+
+# =========================
+#   Subproceso (respaldo)
+
+def _move_report_file(report, output_path):
+    """Mueve el PDF combinado por generate.js a output_path (sin leerlo)."""
+    files = report.get("files", [])
+    if not files:
+        raise ReportRenderError("No se generó el PDF del reporte")
+    shutil.move(files[0], output_path)
+    return RenderedReport(Path(output_path), report.get("tocEntries", []), report.get("pages", 0))
+
+
+def _run_generate(payload, output_dir):
+    """Ejecuta generate.js sobre el payload y devuelve las entradas del manifiesto."""
+    report_generator_dir = find_report_generator_dir()
+    if not report_generator_dir:
+        raise ReportRenderError("Report generator no encontrado")
+    script_path = report_generator_dir / "generate.js"
+
+    input_path = output_dir / "report-data.json"
+    manifest_path = output_dir / "manifest.json"
+    input_path.write_text(
+        json.dumps(payload, ensure_ascii=False),
+        encoding="utf-8",
+    )
+
+    cmd = [
+        "node",
+        str(script_path),
+        "--input",
+        str(input_path),
+        "--out-dir",
+        str(output_dir / "out"),
+        "--manifest",
+        str(manifest_path),
+    ]
+
+    result = subprocess.run(
+        cmd,
+        cwd=str(report_generator_dir),
+        capture_output=True,
+        text=True,
+    )
+
+    if result.returncode != 0:
+        error_msg = result.stderr.strip() or result.stdout.strip() or "Error al generar PDF"
+        raise ReportRenderError(f"Error al generar PDF: {error_msg}")
+
+    if not manifest_path.exists():
+        raise ReportRenderError("No se genero el manifiesto del reporte")
+
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    reports = manifest.get("reports", [])
+    if not reports:
+        raise ReportRenderError("Manifiesto de reporte vacio")
+    return reports
+
+
+def render_with_subprocess(payload, output_path):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report = _run_generate(payload, Path(tmp_dir))[0]
+        if report.get("error"):
+            raise ReportRenderError(f"Error al generar PDF: {report['error']}")
+        return _move_report_file(report, output_path)
+
+
+def render_batch_with_subprocess(people, output_paths):
+    """
+    Renderiza varias personas en una sola ejecución de generate.js (un Node y un
+    navegador para todo el lote) y mueve cada PDF a su output_path. Devuelve, en el
+    mismo orden, un BatchRenderResult por persona; un error en una persona no detiene
+    al resto.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reports = _run_generate({"people": people}, Path(tmp_dir))
+        if len(reports) != len(people):
+            raise ReportRenderError("El manifiesto no corresponde al lote enviado")
+
+        results = []
+        for report, output_path in zip(reports, output_paths):
+            if report.get("error") or not report.get("files"):
+                results.append(BatchRenderResult(None, report.get("error") or "Sin PDF generado"))
+                continue
+            results.append(BatchRenderResult(_move_report_file(report, output_path), None))
+        return results
+
+
+def render_report(payload, output_path):
+    """
+    Renderiza el informe en output_path con el servicio persistente o, si no responde,
+    con el subproceso.
+    """
+    try:
+        return render_with_service(payload, output_path)
+    except RenderServiceUnavailable as e:
+        logger.warning(f"Servicio de render no disponible ({str(e)}); usando generate.js")
+    return render_with_subprocess(payload, output_path)
@@ -0,0 +1,619 @@
+"""
+Construcción de las secciones de resultados de un usuario (enfermedades, rasgos,
+biometrías, biomarcadores, farmacogenética, ancestría y pueblos indígenas).
+
+Todas las secciones se calculan en Python sobre una única carga de los SNPs del
+usuario y un único mapa de rsid_extra_info, para poder materializarlas juntas en
+UserResultSnapshot. Cada builder devuelve el mismo cuerpo de respuesta que entregaba
+la vista correspondiente (sin los datos personales del usuario, que se agregan al
+servir la respuesta).
+"""
+
+import random
+import re
+import unicodedata
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.db.models import Q
+
+from .models import PharmacogeneticSystem, SNP, UserSNP
+from .utils import build_rsid_extra_info_map, rsid_extra_info_key
+
+
+def load_user_snps(user):
+    """SNPs del usuario en el orden de asociación (una sola consulta)."""
+    user_snps = (
+        UserSNP.objects.filter(user=user)
+        .select_related('snp', 'snp__pharmacogenetic_system')
+        .order_by('id')
+    )
+    return [us.snp for us in user_snps if us.snp]
+
+
+def _icontains(value, needle):
+    return needle in (value or '').lower()
+
+
+def _extra_info_fields(extra_info_map, snp):
+    """Devuelve (freq_chile_percent, phenotype_description) para un SNP."""
+    extra_info = extra_info_map.get(rsid_extra_info_key(snp))
+    freq_chile = None
+    if extra_info and extra_info.freq_chile_percent is not None:
+        try:
+            freq_chile = float(extra_info.freq_chile_percent)
+        except (TypeError, ValueError):
+            freq_chile = None
+    return freq_chile, (extra_info.phenotype_description if extra_info else None)
+
+
+# =========================
+#   Enfermedades
+# =========================
+def _extract_gene_name(fenotipo):
+    """
+    Extrae el nombre del gen del campo fenotipo.
+    Busca patrones como 'GENE_NAME increased' o 'GENE_NAME decreased'
+    """
+    if not fenotipo:
+        return 'Unknown'
+
+    # Buscar palabras en mayúsculas al principio (típico nombre de gen)
+    match = re.match(r'^([A-Z][A-Z0-9\-]*)', fenotipo.strip())
+    if match:
+        return match.group(1)
+
+    return 'Unknown'
+
+
+def build_diseases_section(user, snps, extra_info_map):
+    # La categoría en BD es "enfermedades" en minúsculas
+    disease_snps = [snp for snp in snps if snp.categoria == 'enfermedades']
+
+    # Clasificación simple: Alto, Intermedio, Bajo
+    snps_by_priority = {
+        'alta': [],
+        'media': [],
+        'baja': []
+    }
+
+    for snp in disease_snps:
+        freq_chile, description = _extra_info_fields(extra_info_map, snp)
+        nivel_riesgo = snp.nivel_riesgo or 'Bajo'
+        magnitud_efecto = float(snp.magnitud_efecto) if snp.magnitud_efecto else 0.0
+
+        snp_obj = {
+            'rsid': snp.rsid,
+            'genotipo': snp.genotipo,
+            'fenotipo': snp.fenotipo,
+            'cromosoma': snp.cromosoma,
+            'posicion': snp.posicion,
+            'gen': _extract_gene_name(snp.fenotipo),
+            'nivel_riesgo': nivel_riesgo,
+            'magnitud_efecto': magnitud_efecto,
+            'fuente': snp.fuente_base_datos,
+            'tipo_evidencia': snp.tipo_evidencia,
+            'freq_chile_percent': freq_chile,
+            'phenotype_description': description,
+        }
+
+        nivel_lower = nivel_riesgo.lower()
+        if 'alto' in nivel_lower:
+            snps_by_priority['alta'].append(snp_obj)
+        elif 'intermedi' in nivel_lower:
+            snps_by_priority['media'].append(snp_obj)
+        else:
+            # Bajo y cualquier otro
+            snps_by_priority['baja'].append(snp_obj)
+
+    # Ordenar cada categoría por magnitud de efecto descendente
+    for priority in snps_by_priority:
+        snps_by_priority[priority].sort(key=lambda x: x['magnitud_efecto'], reverse=True)
+
+    return {
+        'success': True,
+        'data': snps_by_priority,
+        'total_snps': len(disease_snps)
+    }
+
+
+# =========================
+#   Rasgos
+# =========================
+def build_traits_section(user, snps, extra_info_map):
+    traits_list = []
+    for snp in snps:
+        if snp.categoria != 'rasgos':
+            continue
+        freq_chile, description = _extra_info_fields(extra_info_map, snp)
+        magnitud_efecto = float(snp.magnitud_efecto) if snp.magnitud_efecto else 0.0
+        percentage = int(min(100, (magnitud_efecto / 5.0) * 100))
+
+        traits_list.append({
+            'id': snp.id,
+            'rsid': snp.rsid,
+            'genotipo': snp.genotipo,
+            'fenotipo': snp.fenotipo,
+            'cromosoma': snp.cromosoma,
+            'posicion': snp.posicion,
+            'magnitud_efecto': magnitud_efecto,
+            'group': snp.grupo or 'Rasgos',
+            'percentage': percentage,
+            'freq_chile_percent': freq_chile,
+            'phenotype_description': description,
+        })
+
+    return {
+        'success': True,
+        'data': {
+            'traits': traits_list
+        },
+        'total_traits': len(traits_list)
+    }
+
+
+# =========================
+#   Biometrías
+# =========================
+def _compute_impact(snp):
+    """Devuelve (nivel_impacto, magnitud_float) de forma segura."""
+    try:
+        magnitude = float(snp.magnitud_efecto) if snp.magnitud_efecto is not None else 0.0
+    except (ValueError, TypeError):
+        magnitude = 0.0
+
+    if magnitude >= 3.5:
+        return 'high', magnitude
+    if magnitude >= 2.0:
+        return 'medium', magnitude
+    return 'low', magnitude
+
+
+def build_biometrics_section(user, snps, extra_info_map):
+    snp_pool = [
+        snp for snp in snps
+        if _icontains(snp.categoria, "biometr") or _icontains(snp.grupo, "biometr")
+    ]
+
+    rows = ["Metabolismo", "Cardiovascular", "Nutricion", "Deporte"]
+    columns = ["Riesgo", "Eficiencia", "Sensibilidad"]
+    matrix = []
+    variants = []
+
+    # Orden pseudoaleatorio estable por usuario
+    rng = random.Random(user.id)
+    if snp_pool:
+        rng.shuffle(snp_pool)
+
+        for snp in snp_pool:
+            impact_level, magnitude = _compute_impact(snp)
+            freq_chile, description = _extra_info_fields(extra_info_map, snp)
+            variants.append({
+                "rsid": snp.rsid,
+                "genotipo": snp.genotipo,
+                "fenotipo": snp.fenotipo,
+                "categoria": snp.categoria,
+                "grupo": snp.grupo,
+                "cromosoma": snp.cromosoma,
+                "posicion": snp.posicion,
+                "magnitud_efecto": magnitude,
+                "nivel_riesgo": snp.nivel_riesgo,
+                "impact": impact_level,
+                "explanation": snp.fenotipo or f"Variante {snp.rsid}",
+                "freq_chile_percent": freq_chile,
+                "phenotype_description": description,
+            })
+
+        pool_index = 0
+        for row in rows:
+            row_data = {"name": row, "cells": []}
+            for col in columns:
+                snp = snp_pool[pool_index % len(snp_pool)]
+                pool_index += 1
+
+                impact_level, _ = _compute_impact(snp)
+                if col == "Riesgo":
+                    context = "Predisposicion genetica base"
+                elif col == "Eficiencia":
+                    context = "Velocidad de procesamiento"
+                else:
+                    context = "Respuesta a estimulos"
+
+                row_data["cells"].append({
+                    "column": col,
+                    "impact": impact_level,
+                    "explanation": f"{context}: {snp.rsid}",
+                })
+            matrix.append(row_data)
+
+    return {
+        "success": True,
+        "data": {
+            "rows": rows,
+            "columns": columns,
+            "matrix": matrix,
+            "variants": variants,
+        }
+    }
+
+
+# =========================
+#   Biomarcadores
+# =========================
+def build_biomarkers_section(user, snps, extra_info_map):
+    # Total global de biomarcadores disponibles en el catálogo
+    global_total = SNP.objects.filter(
+        Q(categoria__icontains="biomarc") | Q(grupo__icontains="biomarc")
+    ).count()
+
+    biomarkers = []
+    risk_counts = {"bajo": 0, "medio": 0, "alto": 0}
+
+    for snp in snps:
+        if not (_icontains(snp.categoria, "biomarc") or _icontains(snp.grupo, "biomarc")):
+            continue
+
+        try:
+            magnitude = float(snp.magnitud_efecto) if snp.magnitud_efecto is not None else None
+        except (ValueError, TypeError):
+            magnitude = None
+
+        risk = (snp.nivel_riesgo or "").strip().lower()
+        if risk in risk_counts:
+            risk_counts[risk] += 1
+
+        frequency_val, description = _extra_info_fields(extra_info_map, snp)
+
+        biomarkers.append({
+            "id": snp.rsid,
+            "rsid": snp.rsid,
+            "gene": snp.grupo or snp.categoria or "NA",
+            "name": snp.fenotipo or "Biomarcador",
+            "chromosome": snp.cromosoma or "",
+            "position": snp.posicion,
+            "userGenotype": snp.genotipo,
+            "alleles": {
+                "ref": snp.alelo_referencia,
+                "alt": snp.alelo_alternativo,
+            },
+            "userResult": {
+                "genotype": snp.genotipo,
+                "phenotype": snp.fenotipo,
+                "risk": risk or "medio",
+                "magnitude": magnitude,
+                "frequency": frequency_val,
+                "phenotype_description": description,
+                "continent": snp.continente,
+                "country": snp.pais,
+            },
+            "freq_chile_percent": frequency_val,
+            "phenotype_description": description,
+            "allGenotypes": [
+                {
+                    "genotype": snp.genotipo,
+                    "phenotype": snp.fenotipo,
+                    "risk": (risk or "medio"),
+                    "frequency": frequency_val,
+                }
+            ],
+        })
+
+    return {
+        "success": True,
+        "total": len(biomarkers),
+        "global_total": global_total,
+        "risk_distribution": risk_counts,
+        "biomarkers": biomarkers,
+    }
+
+
+# =========================
+#   Farmacogenética
+# =========================
+def _normalize(text: str) -> str:
+    """Lowercase, remove diacritics and collapse spaces."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return " ".join(text.lower().split())
+
+
+def _hash_color_index(text: str, modulo: int) -> int:
+    h = 0
+    for ch in text:
+        h = ((h << 5) - h) + ord(ch)
+        h &= 0xFFFFFFFF
+    return abs(h) % max(1, modulo)
+
+
+PHARMA_HEURISTICS = [
+    ('Cardiologia', ['cardio', 'warfar', 'clopidogrel', 'estat', 'asa', 'aspirina', 'anticoag', 'antiagreg']),
+    ('Salud Mental y Neurologia', ['psiq', 'depres', 'ansied', 'neurol', 'ssri', 'snri', 'parox', 'sertral', 'fluox', 'antipsi']),
+    ('Gastroenterologia', ['gastro', 'prazol', 'omepraz', 'pantopraz', 'reflujo', 'ulcera']),
+    ('Salud Osea y Reumatologia', ['osea', 'hueso', 'reuma', 'osteop', 'vit d', 'calcio']),
+    ('Oncologia', ['onco', 'tumor', 'cancer', 'leucem', 'quimio', 'chemo']),
+]
+
+
+def build_pharmacogenetics_section(user, snps, extra_info_map):
+    systems = list(PharmacogeneticSystem.objects.all().order_by("id"))
+    systems_by_id = {s.id: s for s in systems}
+    base_palette = ['#F48FB1', '#00BCD4', '#9C27B0', '#3F51B5', '#FF5722', '#4CAF50', '#FFC107']
+    fallback_palette = ['#0ea5e9', '#f97316', '#22c55e', '#a855f7', '#6366f1', '#14b8a6', '#f43f5e', '#f59e0b']
+
+    # Colores indexados por nombre normalizado
+    system_color_by_name = {}
+    system_color_by_id = {}
+    for idx, system in enumerate(systems):
+        color = base_palette[idx % len(base_palette)]
+        system_color_by_name[_normalize(system.name)] = color
+        system_color_by_id[system.id] = color
+    system_color_by_name['otros'] = '#607D8B'
+
+    heuristics_norm = [(_normalize(name), [k.lower() for k in keys]) for name, keys in PHARMA_HEURISTICS]
+    # Asegurar color para heurísticas aunque no existan sistemas en DB
+    for name_norm, _ in heuristics_norm:
+        if name_norm not in system_color_by_name:
+            idx = len(system_color_by_name)
+            system_color_by_name[name_norm] = base_palette[idx % len(base_palette)]
+
+    def resolve_system(snp):
+        # 1) FK explícita
+        if snp.pharmacogenetic_system_id:
+            s = systems_by_id.get(snp.pharmacogenetic_system_id)
+            if s:
+                name = s.name
+                norm = _normalize(name)
+                color = system_color_by_id.get(s.id) or system_color_by_name.get(norm, '#607D8B')
+                return norm, name, s.description or f"Analisis de farmacos para {name}", color
+
+        # 2) Heurística
+        text_norm = _normalize(" ".join([
+            str(snp.grupo or ''),
+            str(snp.categoria or ''),
+            str(snp.fenotipo or '')
+        ]))
+        for name_norm, keys in heuristics_norm:
+            if any(k in text_norm for k in keys):
+                color = system_color_by_name.get(name_norm) or fallback_palette[_hash_color_index(name_norm, len(fallback_palette))]
+                pretty = name_norm.title()
+                return name_norm, pretty, f"Analisis de farmacos para {pretty}", color
+
+        # 3) Usar categoria/grupo como sistema dinámico para evitar colapsar en "Otros"
+        cat = (snp.categoria or snp.grupo or "Otros").strip() or "Otros"
+        name_norm = _normalize(cat)
+        color = system_color_by_name.get(name_norm) or fallback_palette[_hash_color_index(name_norm, len(fallback_palette))]
+        return name_norm or 'otros', cat or 'Otros', cat or 'Farmacos sin sistema asignado', color
+
+    best_by_key = {}
+    for snp in snps:
+        if not (_icontains(snp.categoria, 'farmaco') or _icontains(snp.grupo, 'farmaco')):
+            continue
+
+        freq_chile, description = _extra_info_fields(extra_info_map, snp)
+        raw = (snp.fenotipo or "").strip()
+        name = raw.split("(")[0].strip() or snp.rsid or "Farmaco"
+        sys_key, sys_name, sys_desc, sys_color = resolve_system(snp)
+
+        try:
+            magn = float(snp.magnitud_efecto) if snp.magnitud_efecto is not None else 1.5
+        except Exception:
+            magn = 1.5
+        percentage = max(1, min(100, int((magn / 3.0) * 100)))
+
+        dedup_key = (sys_key, snp.rsid or "", snp.genotipo or "")
+        current = best_by_key.get(dedup_key)
+        if current is None or magn > current["magnitud"]:
+            best_by_key[dedup_key] = {
+                "name": name,
+                "percentage": percentage,
+                "rsid": snp.rsid,
+                "cromosoma": snp.cromosoma,
+                "posicion": str(snp.posicion or ""),
+                "genotipo": snp.genotipo,
+                "magnitud": magn,
+                "fenotipo": raw or name,
+                "freq_chile_percent": freq_chile,
+                "phenotype_description": description,
+                "system_key": sys_key,
+                "system_name": sys_name,
+                "system_desc": sys_desc,
+                "system_color": sys_color,
+            }
+
+    buckets = {}
+    for data in best_by_key.values():
+        buckets.setdefault(data["system_key"], []).append(data)
+
+    result = []
+    for sys_key, drugs in buckets.items():
+        if not drugs:
+            continue
+        meta = drugs[0]
+        result.append({
+            "name": meta.get("system_name", "Otros"),
+            "role": meta.get("system_desc", "Farmacos sin sistema asignado"),
+            "color": meta.get("system_color", system_color_by_name.get(sys_key, '#607D8B')),
+            "drugs": drugs,
+        })
+
+    return {"success": True, "data": result}
+
+
+# =========================
+#   Ancestría
+# =========================
+def _aggregate(snps, key_func, freq_attr):
+    """
+    Agrupa SNPs por key_func: cantidad y frecuencia promedio calculada como
+    Sum(frecuencia) / Count (los nulos no suman pero sí cuentan), igual que en SQL.
+    Devuelve [(key, count, avg)] ordenado por cantidad descendente.
+    """
+    groups = OrderedDict()
+    for snp in snps:
+        key = key_func(snp)
+        count, total = groups.get(key, (0, None))
+        value = getattr(snp, freq_attr)
+        if value is not None:
+            total = value if total is None else total + value
+        groups[key] = (count + 1, total)
+
+    aggregates = [
+        (key, count, (total / count) if total is not None else None)
+        for key, (count, total) in groups.items()
+    ]
+    aggregates.sort(key=lambda item: item[1], reverse=True)
+    return aggregates
+
+
+def build_ancestry_section(user, snps, extra_info_map):
+    if not snps:
+        return {
+            'success': True,
+            'data': {
+                'continents': [],
+                'countries': [],
+                'total_variants': 0,
+                'message': 'No hay datos de ancestría disponibles aún.'
+            }
+        }
+
+    continental_data = _aggregate(
+        [snp for snp in snps if snp.continente],
+        lambda snp: snp.continente,
+        'af_continente',
+    )
+    # El agrupamiento por país incluye el continente (como el GROUP BY original)
+    country_data = _aggregate(
+        [snp for snp in snps if snp.pais],
+        lambda snp: (snp.pais, snp.continente),
+        'af_pais',
+    )
+
+    continents = []
+    total_continental_sum = sum(count for _, count, _ in continental_data)
+    for continent_name, count, avg_freq in continental_data:
+        percentage = round(float((count / total_continental_sum * 100) if total_continental_sum > 0 else 0), 2)
+        continents.append({
+            'name': continent_name or 'Unknown',
+            'percentage': percentage,
+            'variant_count': count,
+            'avg_allele_frequency': float(avg_freq or Decimal('0'))
+        })
+    continents.sort(key=lambda x: x['percentage'], reverse=True)
+
+    countries = []
+    total_country_sum = sum(count for _, count, _ in country_data)
+    for (country_name, continent), count, avg_freq in country_data:
+        # Porcentaje según la proporción de variantes para que el total sea 100%
+        percentage = round(float((count / total_country_sum * 100) if total_country_sum > 0 else 0), 2)
+        countries.append({
+            'name': country_name or 'Unknown',
+            'continent': continent or 'Unknown',
+            'percentage': percentage,
+            'variant_count': count,
+            'avg_allele_frequency': float(avg_freq or Decimal('0'))
+        })
+    countries.sort(key=lambda x: x['percentage'], reverse=True)
+
+    # Normalizar a exactamente 100% si es necesario
+    if countries:
+        current_total = sum(c['percentage'] for c in countries)
+        if current_total > 0 and abs(current_total - 100.0) > 0.01:
+            adjustment = 100.0 - current_total
+            if countries[0]['percentage'] + adjustment > 0:
+                countries[0]['percentage'] = round(countries[0]['percentage'] + adjustment, 2)
+
+    return {
+        'success': True,
+        'data': {
+            'continents': continents,
+            'countries': countries,
+            'total_variants': len(snps),
+        }
+    }
+
+
+# =========================
+#   Pueblos indígenas
+# =========================
+INDIGENOUS_NAME_FIXES = {
+    'Aimara': 'Aymara',
+    'Aymara': 'Aymara',
+    'Atacameño': 'Atacameño',
+    'Diaguita': 'Diaguita',
+    'Mapuche': 'Mapuche',
+    'Rapa Nui': 'Rapa Nui',
+    'Chileno_general': 'Chileno general',
+}
+
+
+def _normalize_population_name(raw_name):
+    """Fix encoding/underscore issues and standardize names for display."""
+    if not raw_name:
+        return 'Desconocido'
+    name = raw_name.replace('_', ' ').strip()
+    return INDIGENOUS_NAME_FIXES.get(name, name)
+
+
+def build_indigenous_section(user, snps, extra_info_map):
+    chile_snps = [snp for snp in snps if (snp.pais or '').lower() == 'chile']
+    if not chile_snps:
+        return {
+            'success': True,
+            'data': {
+                'indigenous_peoples': [],
+                'total_variants': 0,
+                'message': 'No hay datos de pueblos indígenas disponibles.'
+            }
+        }
+
+    aggregates = _aggregate(chile_snps, lambda snp: snp.poblacion_pais, 'af_pais')
+    total_count = sum(count for _, count, _ in aggregates)
+    results = []
+    for population, count, avg_freq in aggregates:
+        percentage = round(float((count / total_count * 100) if total_count > 0 else 0), 2)
+        results.append({
+            'name': _normalize_population_name(population),
+            'percentage': percentage,
+            'variant_count': count,
+            'avg_allele_frequency': float(avg_freq or Decimal('0'))
+        })
+
+    return {
+        'success': True,
+        'data': {
+            'indigenous_peoples': results,
+            'total_variants': len(chile_snps),
+            'country': 'Chile',
+        }
+    }
+
+
+SECTION_BUILDERS = OrderedDict([
+    ('diseases', build_diseases_section),
+    ('traits', build_traits_section),
+    ('biometrics', build_biometrics_section),
+    ('biomarkers', build_biomarkers_section),
+    ('pharmacogenetics', build_pharmacogenetics_section),
+    ('ancestry', build_ancestry_section),
+    ('indigenous', build_indigenous_section),
+])
+
+
+def build_result_sections(user, sections=None):
+    """Construye las secciones pedidas (todas por defecto) con una sola carga de datos."""
+    names = list(sections or SECTION_BUILDERS.keys())
+    snps = load_user_snps(user)
+    extra_info_map = build_rsid_extra_info_map(snps)
+    return {name: SECTION_BUILDERS[name](user, snps, extra_info_map) for name in names}
+
+
+def user_summary(user):
+    """Bloque 'user' que agregan las secciones de ancestría e indígenas."""
+    return {
+        'id': user.id,
+        'email': user.email,
+        'name': f"{user.first_name} {user.last_name}".strip() or user.username
+    }
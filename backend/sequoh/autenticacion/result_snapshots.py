@@ -0,0 +1,87 @@
+"""
+Snapshots de resultados por usuario.
+
+Los resultados de un usuario solo cambian cuando un analista sube o elimina su archivo
+genético (o cuando cambia el catálogo). Las siete vistas de resultados sirven la sección
+desde UserResultSnapshot con una lectura por clave primaria; si no existe o quedó
+desactualizado respecto de las revisiones del catálogo, se reconstruye completo.
+"""
+
+import logging
+
+from .catalog_index import (
+    EXTRA_INFO_CATALOG,
+    SNP_CATALOG,
+    cached_catalog_revision,
+    get_catalog_revision,
+)
+from .models import UserResultSnapshot
+from .result_sections import build_result_sections, user_summary
+
+logger = logging.getLogger(__name__)
+
+# Secciones cuya respuesta incluye el bloque 'user' dentro de 'data'
+USER_SCOPED_SECTIONS = ('ancestry', 'indigenous')
+
+
+def rebuild_user_snapshot(user):
+    """Calcula todas las secciones del usuario y las guarda. Devuelve el payload."""
+    # Las revisiones se leen antes de construir: si el catálogo cambia mientras tanto,
+    # el snapshot queda marcado con la revisión anterior y se reconstruirá
+    catalog_revision = get_catalog_revision(SNP_CATALOG)
+    extra_info_revision = get_catalog_revision(EXTRA_INFO_CATALOG)
+    payload = build_result_sections(user)
+    UserResultSnapshot.objects.update_or_create(
+        user=user,
+        defaults={
+            'payload': payload,
+            'catalog_revision': catalog_revision,
+            'extra_info_revision': extra_info_revision,
+        }
+    )
+    logger.info(f"Snapshot de resultados reconstruido para usuario {user.pk}")
+    return payload
+
+
+def invalidate_user_snapshot(user):
+    UserResultSnapshot.objects.filter(pk=user.pk).delete()
+
+
+def get_user_results(user):
+    """Payload completo de secciones del usuario, desde el snapshot si está vigente."""
+    row = (
+        UserResultSnapshot.objects.filter(pk=user.pk)
+        .values_list('payload', 'catalog_revision', 'extra_info_revision')
+        .first()
+    )
+    if row is not None:
+        payload, catalog_revision, extra_info_revision = row
+        if (
+            catalog_revision == cached_catalog_revision(SNP_CATALOG)
+            and extra_info_revision == cached_catalog_revision(EXTRA_INFO_CATALOG)
+        ):
+            return payload
+    return rebuild_user_snapshot(user)
+
+
+def section_response(user, payload, name):
+    """Cuerpo de respuesta de una sección, agregando los datos del usuario si corresponde."""
+    body = payload[name]
+    if name in USER_SCOPED_SECTIONS and 'message' not in body['data']:
+        body = {**body, 'data': {**body['data'], 'user': user_summary(user)}}
+    return body
+
+
+def get_result_section(user, name):
+    payload = get_user_results(user)
+    if name not in payload:
+        payload = rebuild_user_snapshot(user)
+    return section_response(user, payload, name)
+
+
+def get_result_sections(user, names):
+    """Varias secciones desde una sola lectura (o reconstrucción) del snapshot."""
+    payload = get_user_results(user)
+    if any(name not in payload for name in names):
+        payload = rebuild_user_snapshot(user)
+    return {name: section_response(user, payload, name) for name in names}
@@ -0,0 +1,43 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
+from .authentication import JWTAuthentication
+from .result_sections import SECTION_BUILDERS
+from .result_snapshots import get_result_sections
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ResultsAPIView(APIView):
+    """
+    Retorna varias secciones de resultados del usuario autenticado en una sola respuesta.
+    ?sections=diseases,traits limita las secciones; sin el parámetro se devuelven todas.
+    Cada sección tiene el mismo cuerpo que su endpoint individual (/diseases/, /traits/, ...).
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        raw_sections = request.query_params.get('sections', '')
+        names = [name.strip().lower() for name in raw_sections.split(',') if name.strip()]
+        if not names:
+            names = list(SECTION_BUILDERS.keys())
+
+        unknown = [name for name in names if name not in SECTION_BUILDERS]
+        if unknown:
+            return Response(
+                {
+                    "error": f"Secciones no válidas: {', '.join(unknown)}",
+                    "available_sections": list(SECTION_BUILDERS.keys())
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Sin duplicados, respetando el orden pedido
+        names = list(dict.fromkeys(names))
+        return Response({
+            "success": True,
+            "sections": get_result_sections(request.user, names)
+        })
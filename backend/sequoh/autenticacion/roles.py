@@ -5,6 +5,10 @@ ADMIN_GROUP = "ADMIN"
 ANALYST_GROUP = "ANALISTA"
 RECEPTION_GROUP = "RECEPCION"
 
+# Atributo donde queda el conjunto de grupos del usuario (vive lo que vive el objeto,
+# es decir, la petición)
+_GROUP_NAMES_ATTR = "_group_names"
+
 
 def ensure_default_groups():
     """
@@ -15,6 +19,24 @@ def ensure_default_groups():
         Group.objects.get_or_create(name=name)
 
 
+def set_group_names(user, names):
+    setattr(user, _GROUP_NAMES_ATTR, frozenset(names))
+
+
+def forget_group_names(user):
+    """Descarta los grupos cacheados (tras agregar o quitar grupos al usuario)."""
+    user.__dict__.pop(_GROUP_NAMES_ATTR, None)
+
+
+def group_names(user):
+    """Nombres de los grupos del usuario; se consultan una vez por objeto."""
+    names = getattr(user, _GROUP_NAMES_ATTR, None)
+    if names is None:
+        set_group_names(user, user.groups.values_list("name", flat=True))
+        names = getattr(user, _GROUP_NAMES_ATTR)
+    return names
+
+
 def is_admin(user):
     """
     Considera admin si es staff/superuser o pertenece al grupo ADMIN.
@@ -24,7 +46,7 @@ def is_admin(user):
     return (
         user.is_staff
         or user.is_superuser
-        or user.groups.filter(name=ADMIN_GROUP).exists()
+        or ADMIN_GROUP in group_names(user)
     )
 
 
@@ -34,7 +56,7 @@ def is_analyst(user):
     """
     if not user or not getattr(user, "is_authenticated", False):
         return False
-    return user.groups.filter(name=ANALYST_GROUP).exists()
+    return ANALYST_GROUP in group_names(user)
 
 
 def is_reception(user):
@@ -43,7 +65,7 @@ def is_reception(user):
     """
     if not user or not getattr(user, "is_authenticated", False):
         return False
-    return user.groups.filter(name=RECEPTION_GROUP).exists()
+    return RECEPTION_GROUP in group_names(user)
 
 
 def is_admin_or_analyst(user):
@@ -58,12 +80,14 @@ def grant_analyst_role(user):
     ensure_default_groups()
     group = Group.objects.get(name=ANALYST_GROUP)
     user.groups.add(group)
+    forget_group_names(user)
 
 
 def revoke_analyst_role(user):
     ensure_default_groups()
     group = Group.objects.get(name=ANALYST_GROUP)
     user.groups.remove(group)
+    forget_group_names(user)
 
 
 def grant_reception_role(user):
@@ -71,6 +95,7 @@ def grant_reception_role(user):
     ensure_default_groups()
     group = Group.objects.get(name=RECEPTION_GROUP)
     user.groups.add(group)
+    forget_group_names(user)
 
 
 def revoke_reception_role(user):
@@ -78,6 +103,7 @@ def revoke_reception_role(user):
     ensure_default_groups()
     group = Group.objects.get(name=RECEPTION_GROUP)
     user.groups.remove(group)
+    forget_group_names(user)
 
 
 def grant_admin_role(user):
@@ -87,6 +113,7 @@ def grant_admin_role(user):
     ensure_default_groups()
     group = Group.objects.get(name=ADMIN_GROUP)
     user.groups.add(group)
+    forget_group_names(user)
     if not user.is_staff:
         user.is_staff = True
         user.save(update_fields=["is_staff"])
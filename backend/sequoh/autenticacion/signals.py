@@ -1,10 +1,16 @@
 from django.dispatch import receiver
 from django.utils import timezone
+from django.contrib.auth.models import User
 from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from allauth.account.signals import email_confirmed
 from allauth.account.models import EmailAddress
-from .models import WelcomeStatus
+from .models import Profile, WelcomeStatus
 from .email_utils import send_welcome_email
+from .auth_cache import bump_auth_version, forget_user
+from .utils import new_sample_code
+from .system_stats import settle_user_stats, track_user_stats
+from .reception_search import invalidate_ngram_index
 
 @receiver(email_confirmed)
 def send_welcome_on_confirmation(request, email_address, **kwargs):
@@ -27,3 +33,131 @@ def send_welcome_on_login(sender, request, user, **kwargs):
         ws.welcome_sent = True
         ws.sent_at = timezone.now()
         ws.save()
+
+
+# Campos de User que invalidan los tokens emitidos (ver auth_cache.py)
+AUTH_FIELDS = ('password', 'is_active', 'is_staff', 'is_superuser')
+
+
+@receiver(pre_save, sender=User)
+def detect_auth_change(sender, instance, update_fields=None, **kwargs):
+    instance._auth_changed = False
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(AUTH_FIELDS):
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*AUTH_FIELDS).first()
+    if previous is not None:
+        instance._auth_changed = any(previous[field] != getattr(instance, field) for field in AUTH_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def refresh_auth_on_save(sender, instance, created, **kwargs):
+    if getattr(instance, '_auth_changed', False):
+        bump_auth_version(instance.pk)
+    else:
+        # Nombre, email, etc.: basta con recargarlo en la próxima petición
+        forget_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def refresh_auth_on_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # group.user_set.clear(): después ya no se sabe qué usuarios tenía el grupo
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_auth_version(instance.pk)
+        return
+    # group.user_set.add(...): instance es el grupo
+    user_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_user_ids', ())
+    for user_id in user_ids or ():
+        bump_auth_version(user_id)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(pre_save, sender=Profile)
+def assign_sample_code(sender, instance, **kwargs):
+    # Código asignado al crear el perfil: los listados no necesitan escribir
+    if instance._state.adding and not instance.sample_code and instance.user_id:
+        instance.sample_code = new_sample_code(instance.user_id)
+        instance.sample_code_created_at = timezone.now()
+
+
+# Contadores de estadísticas (ver system_stats.py). Campos de User que cambian su aporte
+STATS_USER_FIELDS = {'is_active', 'is_staff', 'is_superuser'}
+
+
+@receiver(pre_save, sender=User)
+def track_user_stats_on_save(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & STATS_USER_FIELDS:
+        return
+    track_user_stats(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def settle_user_stats_on_save(sender, instance, created, **kwargs):
+    if created:
+        track_user_stats(instance.pk, created=True)
+    settle_user_stats(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def track_user_stats_on_delete(sender, instance, **kwargs):
+    track_user_stats(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def settle_user_stats_on_delete(sender, instance, **kwargs):
+    settle_user_stats(instance.pk)
+
+
+@receiver(pre_save, sender=Profile)
+def track_profile_stats(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'service_status' not in update_fields:
+        return
+    if instance.user_id:
+        track_user_stats(instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def settle_profile_stats(sender, instance, **kwargs):
+    settle_user_stats(instance.user_id)
+
+
+@receiver(pre_delete, sender=Profile)
+def track_profile_stats_on_delete(sender, instance, **kwargs):
+    track_user_stats(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_stats_on_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action in ('pre_clear', 'post_clear'):
+        user_ids = getattr(instance, '_cleared_user_ids', None) or list(instance.user_set.values_list('pk', flat=True))
+    else:
+        user_ids = pk_set or ()
+    for user_id in user_ids:
+        if action.startswith('pre_'):
+            track_user_stats(user_id)
+        else:
+            settle_user_stats(user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def refresh_reception_search_index(sender, **kwargs):
+    # Índice de trigramas en memoria de la búsqueda aproximada (solo sin PostgreSQL)
+    invalidate_ngram_index()
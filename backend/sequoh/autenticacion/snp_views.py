@@ -3,7 +3,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.status import HTTP_200_OK, HTTP_403_FORBIDDEN
 from .models import SNP
-from django.db.models import Case, When, IntegerField
+from .catalog_index import refresh_preferred_snps
 
 
 class VariantesAPIView(APIView):
@@ -18,20 +18,8 @@ class VariantesAPIView(APIView):
         Retorna todas las variantes SNP de la base de datos.
         """
         try:
-            # Priorizar registros de Chile y luego de América
-            priority_order = Case(
-                When(pais__iexact='Chile', then=0),
-                When(continente__icontains='america', then=1),
-                When(poblacion_pais__isnull=False, then=2),
-                When(pais__isnull=False, then=3),
-                default=4,
-                output_field=IntegerField()
-            )
-
-            # Anotar con la prioridad y ordenar
-            snps = SNP.objects.annotate(
-                priority=priority_order
-            ).order_by('rsid', 'priority').values(
+            # Priorizar registros de Chile y luego de América (prioridad precalculada)
+            snps = SNP.objects.order_by('rsid', 'prioridad').values(
                 'id',
                 'rsid',
                 'cromosoma',
@@ -121,6 +109,7 @@ class VariantesAPIView(APIView):
                 poblacion_pais=data.get('poblacion_pais', ''),
             )
             
+            refresh_preferred_snps([snp.rsid])
             print(f"[SUCCESS] New SNP created with ID: {snp.id}")
             
             return Response({
@@ -0,0 +1,285 @@
+"""
+Contadores de las estadísticas de administración.
+
+AdminStatsAPIView y DashboardAPIView leen una sola fila (SystemStats) en vez de contar
+usuarios, perfiles y vínculos usuario-SNP en cada carga. La fila se mantiene así:
+
+- Cada usuario aporta 0 o 1 a cada contador según su estado (activo, staff, grupos,
+  service_status, si tiene variantes). Antes de un cambio se guarda su aporte
+  (track_user_stats) y, al confirmarse la transacción, se aplica la diferencia con su
+  aporte nuevo como incremento F() (settle_user_stats). Las señales de User, Profile y
+  grupos lo hacen solas; la ingesta y la eliminación de variantes (que usan bulk_create
+  y borrados masivos sin señales) usan tracking_user_stats.
+- Dentro de una transacción los aportes guardados viven en un lote que solo retiene su
+  callback on_commit: si la transacción se revierte, Django descarta el callback y el
+  lote con él, así que la siguiente transacción vuelve a tomar el aporte desde la BD.
+- reconcile_stats recalcula todo desde cero y guarda el snapshot diario que se usa para
+  el crecimiento; conviene programarlo (p.ej. una vez al día) para corregir cualquier
+  desajuste, como los borrados masivos del catálogo.
+"""
+
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import (
+    SNP,
+    Profile,
+    ServiceStatus,
+    SystemStats,
+    SystemStatsSnapshot,
+    UserSNP,
+)
+
+logger = logging.getLogger(__name__)
+
+STATS_PK = 1
+DEFAULT_GROWTH_DAYS = 30
+# Grupos que no cuentan como pacientes en las estadísticas de administración
+STAFF_GROUPS = ["ADMIN", "ANALISTA"]
+
+USER_COUNTERS = (
+    'active_users',
+    'regular_users',
+    'regular_completed',
+    'pending_reports',
+    'completed_analyses',
+    'users_with_snps',
+)
+COUNTER_FIELDS = USER_COUNTERS + ('variants_count',)
+_NO_CONTRIBUTION = dict.fromkeys(USER_COUNTERS, 0)
+
+# Por hilo: aportes guardados fuera de transacciones (user_id -> aporte), usuarios dentro
+# de un tracking_user_stats y referencia débil al lote de la transacción en curso
+_local = threading.local()
+# Fecha del último snapshot asegurado y snapshot base del crecimiento, por proceso
+_snapshot_date = None
+_baseline_cache = {}
+
+
+class _TransactionStats(dict):
+    """Aportes previos (user_id -> aporte) de los usuarios modificados en una transacción."""
+
+    def settle(self):
+        for user_id in list(self):
+            _settle_now(self, user_id)
+
+
+def _autocommit_pending():
+    if not hasattr(_local, 'pending'):
+        _local.pending = {}
+    return _local.pending
+
+
+def _scoped_users():
+    if not hasattr(_local, 'scoped'):
+        _local.scoped = set()
+    return _local.scoped
+
+
+def _transaction_pending():
+    """Lote de la transacción en curso; al crearlo se registra su liquidación on_commit."""
+    ref = getattr(_local, 'transaction_pending', None)
+    batch = ref() if ref is not None else None
+    if batch is None:
+        batch = _TransactionStats()
+        transaction.on_commit(batch.settle)
+        # Referencia débil: el lote de una transacción revertida se libera con su callback
+        _local.transaction_pending = weakref.ref(batch)
+    return batch
+
+
+def _user_contribution(user_id):
+    """Aporte actual del usuario a cada contador (todo 0 si ya no existe)."""
+    row = (
+        User.objects.filter(pk=user_id)
+        .annotate(
+            service_status=F('profile__service_status'),
+            in_staff_group=Exists(
+                User.groups.through.objects.filter(user_id=OuterRef('pk'), group__name__in=STAFF_GROUPS)
+            ),
+            has_snps=Exists(UserSNP.objects.filter(user_id=OuterRef('pk'))),
+        )
+        .values('is_active', 'is_staff', 'is_superuser', 'service_status', 'in_staff_group', 'has_snps')
+        .first()
+    )
+    if row is None:
+        return _NO_CONTRIBUTION
+    regular = row['is_active'] and not (row['is_staff'] or row['is_superuser'] or row['in_staff_group'])
+    completed = row['service_status'] == ServiceStatus.COMPLETED
+    return {
+        'active_users': int(row['is_active']),
+        'regular_users': int(regular),
+        'regular_completed': int(regular and completed),
+        'pending_reports': int(row['service_status'] == ServiceStatus.PENDING and not row['in_staff_group']),
+        'completed_analyses': int(completed),
+        'users_with_snps': int(row['has_snps']),
+    }
+
+
+def track_user_stats(user_id, created=False):
+    """Guarda el aporte del usuario antes de modificarlo (una vez por transacción)."""
+    autocommit = _autocommit_pending()
+    if user_id in _scoped_users() and user_id in autocommit:
+        # tracking_user_stats ya guardó el aporte anterior a todo el bloque
+        return
+    if connection.in_atomic_block:
+        pending = _transaction_pending()
+        if user_id not in pending:
+            pending[user_id] = _NO_CONTRIBUTION if created else _user_contribution(user_id)
+        return
+    # Sin transacción el cambio se confirma enseguida: una entrada previa es de un
+    # guardado que falló y ya no sirve
+    autocommit[user_id] = _NO_CONTRIBUTION if created else _user_contribution(user_id)
+
+
+def settle_user_stats(user_id):
+    """
+    Aplica la diferencia entre el aporte guardado y el actual. Dentro de una transacción
+    la aplica el lote al confirmarse, para contar una sola vez los cambios encadenados
+    (p.ej. el borrado en cascada de usuario y perfil); dentro de tracking_user_stats, el
+    bloque al terminar.
+    """
+    if connection.in_atomic_block or user_id in _scoped_users():
+        return
+    _settle_now(_autocommit_pending(), user_id)
+
+
+def _settle_now(pending, user_id):
+    before = pending.pop(user_id, None)
+    if before is None:
+        return
+    try:
+        after = _user_contribution(user_id)
+        deltas = {field: after[field] - before[field] for field in USER_COUNTERS if after[field] != before[field]}
+        if deltas:
+            _apply(deltas)
+    except Exception as e:
+        # Las estadísticas nunca deben romper la operación del usuario; reconcile_stats corrige
+        logger.error(f"Error actualizando estadísticas del usuario {user_id}: {str(e)}")
+
+
+@contextmanager
+def tracking_user_stats(user_id):
+    """Para cambios que no emiten señales (bulk_create o borrados masivos de UserSNP)."""
+    scoped = _scoped_users()
+    if user_id in scoped:
+        yield
+        return
+    track_user_stats(user_id)
+    scoped.add(user_id)
+    try:
+        yield
+    finally:
+        scoped.discard(user_id)
+        settle_user_stats(user_id)
+
+
+def _apply(deltas):
+    updated = SystemStats.objects.filter(pk=STATS_PK).update(
+        **{field: F(field) + delta for field, delta in deltas.items()},
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # Sin fila todavía: se crea con los valores reales en vez de aplicar el incremento
+        reconcile_stats()
+
+
+def refresh_variants_count():
+    """Recuenta el catálogo de SNPs; se llama cuando los cargadores lo modifican."""
+    count = SNP.objects.count()
+    if not SystemStats.objects.filter(pk=STATS_PK).update(variants_count=count, updated_at=timezone.now()):
+        reconcile_stats()
+
+
+def compute_stats():
+    """Valores de todos los contadores calculados desde las tablas."""
+    active = User.objects.filter(is_active=True)
+    regular = active.filter(is_staff=False, is_superuser=False).exclude(groups__name__in=STAFF_GROUPS)
+    return {
+        'active_users': active.count(),
+        'regular_users': regular.count(),
+        'regular_completed': regular.filter(profile__service_status=ServiceStatus.COMPLETED).count(),
+        'pending_reports': Profile.objects.filter(service_status=ServiceStatus.PENDING)
+        .exclude(user__groups__name__in=STAFF_GROUPS).count(),
+        'completed_analyses': Profile.objects.filter(service_status=ServiceStatus.COMPLETED).count(),
+        'users_with_snps': UserSNP.objects.values('user').distinct().count(),
+        'variants_count': SNP.objects.count(),
+    }
+
+
+def reconcile_stats():
+    """Recalcula los contadores, corrige la fila y guarda el snapshot del día."""
+    values = compute_stats()
+    now = timezone.now()
+    stats, _ = SystemStats.objects.update_or_create(
+        pk=STATS_PK,
+        defaults={**values, 'reconciled_at': now},
+    )
+    take_daily_snapshot(stats)
+    return stats
+
+
+def get_stats():
+    """Fila de contadores; la primera vez se calcula desde cero."""
+    stats = SystemStats.objects.filter(pk=STATS_PK).first()
+    if stats is None:
+        return reconcile_stats()
+    take_daily_snapshot(stats, only_if_missing=True)
+    return stats
+
+
+def take_daily_snapshot(stats, only_if_missing=False):
+    """Guarda los contadores del día (una fila por fecha)."""
+    global _snapshot_date
+    values = {field: getattr(stats, field) for field in COUNTER_FIELDS}
+    today = timezone.localdate()
+    if only_if_missing:
+        # Una consulta al día como máximo por proceso
+        if _snapshot_date == today:
+            return
+        SystemStatsSnapshot.objects.get_or_create(date=today, defaults=values)
+    else:
+        SystemStatsSnapshot.objects.update_or_create(date=today, defaults=values)
+    _snapshot_date = today
+
+
+def _growth(current, previous):
+    if not previous:
+        return "+0%"
+    change = round((current - previous) * 100 / previous)
+    return f"{change:+d}%"
+
+
+def growth_stats(stats):
+    """
+    Crecimiento de usuarios, informes y análisis respecto al snapshot de hace
+    STATS_GROWTH_DAYS días (o el más antiguo disponible).
+    """
+    days = getattr(settings, 'STATS_GROWTH_DAYS', DEFAULT_GROWTH_DAYS)
+    today = timezone.localdate()
+    baseline = _baseline_cache.get(today)
+    if baseline is None:
+        since = today - timedelta(days=days)
+        baseline = (
+            SystemStatsSnapshot.objects.filter(date__lte=since).order_by('-date').first()
+            or SystemStatsSnapshot.objects.order_by('date').first()
+        )
+        if baseline is None:
+            return {"user_growth": "+0%", "report_growth": "+0%", "analysis_growth": "+0%"}
+        # El snapshot base no cambia durante el día
+        _baseline_cache.clear()
+        _baseline_cache[today] = baseline
+    return {
+        "user_growth": _growth(stats.regular_users, baseline.regular_users),
+        "report_growth": _growth(stats.users_with_snps, baseline.users_with_snps),
+        "analysis_growth": _growth(stats.regular_completed, baseline.regular_completed),
+    }
@@ -0,0 +1,329 @@
+"""
+Cola de importación de archivos genéticos.
+
+UploadGeneticFileAPIView solo guarda el archivo y encola un GenotypeImportJob; el
+worker en segundo plano (ver background.py) ejecuta la ingesta, actualiza el
+service_status del paciente, encola el render del informe PDF (report_jobs.py) y envía
+el email de resultados listos.
+"""
+
+import gzip
+import itertools
+import logging
+import os
+import uuid
+import zlib
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .background import kick_worker, register_queue
+from .email_utils import send_results_ready_email
+from .genotype_ingest import ingest_genotype_lines
+from .models import GenotypeImportJob, ImportJobStatus, Profile, ServiceStatus
+from .report_jobs import enqueue_report_job
+from .result_snapshots import rebuild_user_snapshot
+from .system_stats import tracking_user_stats
+
+logger = logging.getLogger(__name__)
+
+QUEUE_NAME = 'genotype_import'
+GZIP_MAGIC = b'\x1f\x8b'
+DEFAULT_MAX_ERRORS = 500
+DEFAULT_STALE_SECONDS = 15 * 60
+
+
+def genotype_upload_dir() -> Path:
+    """Directorio donde esperan los archivos encolados (se borran al terminar el trabajo)."""
+    path = Path(getattr(settings, 'GENOTYPE_UPLOAD_DIR', settings.BASE_DIR / 'media' / 'genotype_uploads'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _create_job(target_user, filename, source_path, total_lines, requested_by):
+    job = GenotypeImportJob.objects.create(
+        user=target_user,
+        requested_by=requested_by,
+        filename=filename,
+        source_path=str(source_path),
+        total_lines=total_lines,
+    )
+    logger.info(f"Importación encolada: job={job.pk}, usuario={target_user.email}, archivo={filename}")
+    kick_worker()
+    return job
+
+
+def enqueue_genotype_import(target_user, filename, file_content, requested_by=None):
+    """Guarda el contenido del archivo (modo JSON) en disco y crea el trabajo PENDING."""
+    source_path = genotype_upload_dir() / f"{uuid.uuid4().hex}.txt"
+    content = file_content.strip()
+    with open(source_path, 'w', encoding='utf-8') as fh:
+        fh.write(content)
+
+    total_lines = content.count('\n') + 1 if content else 0
+    return _create_job(target_user, filename, source_path, total_lines, requested_by)
+
+
+class _NewlineCounter:
+    """Cuenta saltos de línea de un flujo de bytes, descomprimiendo gzip de forma incremental."""
+
+    def __init__(self, compressed):
+        self.compressed = compressed
+        self.decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16) if compressed else None
+        self.newlines = 0
+        self.last_byte = b''
+
+    def feed(self, data):
+        if not self.compressed:
+            self._count(data)
+            return
+        while data:
+            out = self.decompressor.decompress(data, 1024 * 1024)
+            self._count(out)
+            data = self.decompressor.unconsumed_tail
+            if self.decompressor.eof:
+                # Archivo gzip con varios miembros concatenados
+                data = self.decompressor.unused_data + data
+                self.decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+    def _count(self, data):
+        if data:
+            self.newlines += data.count(b'\n')
+            self.last_byte = data[-1:]
+
+    @property
+    def total_lines(self):
+        if not self.last_byte:
+            return 0
+        return self.newlines + (0 if self.last_byte == b'\n' else 1)
+
+
+def enqueue_genotype_upload(target_user, filename, uploaded_file, requested_by=None):
+    """
+    Copia por bloques un archivo subido (multipart, texto plano o gzip) al directorio de
+    la cola y crea el trabajo PENDING. El archivo nunca se carga completo en memoria:
+    el comprimido se guarda tal cual y se descomprime línea a línea en el worker.
+    """
+    chunks = uploaded_file.chunks()
+    first_chunk = next(chunks, b'')
+    compressed = first_chunk[:2] == GZIP_MAGIC
+    source_path = genotype_upload_dir() / f"{uuid.uuid4().hex}{'.txt.gz' if compressed else '.txt'}"
+
+    counter = _NewlineCounter(compressed)
+    try:
+        with open(source_path, 'wb') as fh:
+            for chunk in itertools.chain([first_chunk], chunks):
+                fh.write(chunk)
+                counter.feed(chunk)
+    except zlib.error:
+        os.remove(source_path)
+        raise ValueError("El archivo comprimido no es un gzip válido")
+    except OSError:
+        if os.path.exists(source_path):
+            os.remove(source_path)
+        raise
+
+    if not counter.total_lines:
+        os.remove(source_path)
+        raise ValueError("El archivo está vacío")
+
+    return _create_job(target_user, filename, source_path, counter.total_lines, requested_by)
+
+
+def _requeue_stale_jobs():
+    """Devuelve a la cola los trabajos RUNNING sin avance (p.ej. el proceso murió a mitad)."""
+    stale_seconds = getattr(settings, 'GENOTYPE_IMPORT_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+    requeued = GenotypeImportJob.objects.filter(
+        status=ImportJobStatus.RUNNING,
+        updated_at__lt=cutoff,
+    ).update(status=ImportJobStatus.PENDING, updated_at=timezone.now())
+    if requeued:
+        logger.warning(f"{requeued} importaciones sin avance devueltas a la cola")
+
+
+def claim_next_job():
+    """
+    Toma el trabajo pendiente más antiguo. El cambio PENDING -> RUNNING es condicional,
+    así que si dos workers compiten por el mismo trabajo solo uno lo obtiene.
+    """
+    _requeue_stale_jobs()
+    while True:
+        job_id = (
+            GenotypeImportJob.objects.filter(status=ImportJobStatus.PENDING)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        now = timezone.now()
+        claimed = GenotypeImportJob.objects.filter(pk=job_id, status=ImportJobStatus.PENDING).update(
+            status=ImportJobStatus.RUNNING,
+            started_at=now,
+            updated_at=now,
+            lines_processed=0,
+        )
+        if claimed:
+            return GenotypeImportJob.objects.select_related('user').get(pk=job_id)
+
+
+def _iter_source_lines(job):
+    """Genera las líneas del archivo en cola (sin el salto de línea), sea texto o gzip."""
+    if job.source_path.endswith('.gz'):
+        fh = gzip.open(job.source_path, 'rt', encoding='utf-8', errors='replace')
+    else:
+        fh = open(job.source_path, 'r', encoding='utf-8', errors='replace')
+    with fh:
+        for line in fh:
+            yield line.rstrip('\n')
+
+
+def _remove_source(job):
+    try:
+        os.remove(job.source_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"No se pudo eliminar {job.source_path}: {str(e)}")
+
+
+def _mark_profile_completed(job):
+    try:
+        profile, created = Profile.objects.get_or_create(user=job.user)
+        profile.service_status = ServiceStatus.COMPLETED
+        profile.report_filename = job.filename
+        profile.report_uploaded_at = timezone.now()
+        profile.save()
+        logger.info(
+            f"Service status actualizado a COMPLETED para usuario {job.user.email}. "
+            f"Archivo: {job.filename}"
+        )
+    except Exception as e:
+        logger.error(f"Error actualizando service_status: {str(e)}")
+
+
+def _rebuild_results_snapshot(job):
+    """Materializa las secciones de resultados para que las vistas no las recalculen."""
+    try:
+        rebuild_user_snapshot(job.user)
+    except Exception as e:
+        # Las vistas reconstruyen el snapshot bajo demanda si no existe
+        logger.error(f"Error construyendo snapshot de resultados: {str(e)}", exc_info=True)
+
+
+def _prewarm_report(job):
+    """Encola el render del informe para que la primera descarga no espere al navegador."""
+    try:
+        enqueue_report_job(job.user)
+    except Exception as e:
+        logger.error(f"Error encolando el informe PDF: {str(e)}", exc_info=True)
+
+
+def _notify_results_ready(job):
+    target_user = job.user
+    user_name = (
+        target_user.first_name
+        or target_user.username
+        or target_user.email.split('@')[0]
+    )
+    try:
+        email_sent = send_results_ready_email(target_user.email, user_name)
+        if email_sent:
+            logger.info(f"Email de resultados listos enviado a {target_user.email}")
+        else:
+            logger.warning(f"No se pudo enviar email de notificación a {target_user.email}")
+        return email_sent
+    except Exception as e:
+        logger.error(f"Error enviando email de notificación: {str(e)}")
+        return False
+
+
+def process_genotype_job(job):
+    """Ejecuta la ingesta de un trabajo ya reclamado y deja el resultado en la fila."""
+    max_errors = getattr(settings, 'GENOTYPE_IMPORT_MAX_ERRORS', DEFAULT_MAX_ERRORS)
+
+    def on_progress(result, lines_processed):
+        GenotypeImportJob.objects.filter(pk=job.pk).update(
+            lines_processed=lines_processed,
+            snps_matched=result['snps_matched'],
+            snps_added=result['snps_added'],
+            snps_skipped=result['snps_skipped'],
+            updated_at=timezone.now(),
+        )
+
+    try:
+        # bulk_create no emite señales: el aporte del usuario a las estadísticas se ajusta aquí
+        with tracking_user_stats(job.user_id):
+            result = ingest_genotype_lines(
+                job.user, _iter_source_lines(job), on_progress=on_progress, max_errors=max_errors
+            )
+            logger.info(
+                f"Importación {job.pk} completada: {result['snps_added']} agregados, "
+                f"{result['snps_skipped']} omitidos de {result['total_lines']} líneas"
+            )
+
+            _mark_profile_completed(job)
+        _rebuild_results_snapshot(job)
+        _prewarm_report(job)
+        email_sent = _notify_results_ready(job)
+
+        job.status = ImportJobStatus.COMPLETED
+        job.total_lines = result['total_lines']
+        job.lines_processed = result['total_lines']
+        job.snps_matched = result['snps_matched']
+        job.snps_added = result['snps_added']
+        job.snps_skipped = result['snps_skipped']
+        job.errors = result['unprocessed_lines']
+        job.email_sent = email_sent
+    except Exception as e:
+        logger.error(f"Error procesando importación {job.pk}: {str(e)}", exc_info=True)
+        job.status = ImportJobStatus.FAILED
+        job.error_message = str(e)
+    finally:
+        _remove_source(job)
+
+    job.finished_at = timezone.now()
+    job.updated_at = job.finished_at
+    job.save(update_fields=[
+        'status', 'total_lines', 'lines_processed', 'snps_matched', 'snps_added',
+        'snps_skipped', 'errors', 'error_message', 'email_sent', 'finished_at', 'updated_at',
+    ])
+    return job
+
+
+def process_next_genotype_job():
+    """Handler de la cola: procesa un trabajo si hay alguno pendiente."""
+    job = claim_next_job()
+    if job is None:
+        return False
+    process_genotype_job(job)
+    return True
+
+
+def serialize_job(job):
+    return {
+        "job_id": job.pk,
+        "user_id": job.user_id,
+        "filename": job.filename,
+        "status": job.status,
+        "total_lines": job.total_lines,
+        "lines_processed": job.lines_processed,
+        "snps_matched": job.snps_matched,
+        "snps_added": job.snps_added,
+        "skipped_lines": job.snps_skipped,
+        "progress_percent": job.progress_percent,
+        "eta_seconds": job.eta_seconds,
+        "email_sent": job.email_sent,
+        "error": job.error_message or None,
+        "unprocessed_lines": job.errors if job.is_finished else [],
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+register_queue(QUEUE_NAME, process_next_genotype_job)
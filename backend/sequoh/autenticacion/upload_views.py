@@ -5,11 +5,14 @@ from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.db.models import Case, When, IntegerField
+from django.urls import reverse
 from .authentication import JWTAuthentication
-from .models import Profile, ServiceStatus, SNP, UserSNP
-from .email_utils import send_results_ready_email
+from .models import Profile, ServiceStatus, UserSNP, GenotypeImportJob
+from .upload_jobs import enqueue_genotype_import, enqueue_genotype_upload, serialize_job
+from .result_snapshots import invalidate_user_snapshot
+from .report_cache import invalidate_user_reports
 from .roles import is_admin_or_analyst
+from .system_stats import tracking_user_stats
 import logging
 import json
 
@@ -31,33 +34,47 @@ class UploadGeneticFileAPIView(APIView):
             )
 
         try:
-            # Obtener datos del body (JSON)
-            try:
-                data = json.loads(request.body or '{}')
-            except json.JSONDecodeError:
-                data = {}
+            # Dos modos de carga:
+            # - multipart/form-data: campo "file" (texto plano o gzip), se copia por bloques
+            # - JSON: contenido completo en "fileContent" (modo original)
+            uploaded_file = None
+            file_content = ''
+            if request.content_type.startswith('multipart/form-data'):
+                data = request.data
+                uploaded_file = request.FILES.get('file')
+                default_filename = uploaded_file.name if uploaded_file else 'report.txt'
+            else:
+                try:
+                    data = json.loads(request.body or '{}')
+                except json.JSONDecodeError:
+                    data = {}
+                file_content = (data.get('fileContent') or '').strip()
+                default_filename = 'report.txt'
 
             user_id = data.get('userId')
-            file_content = data.get('fileContent', '').strip()
-            filename = data.get('filename', 'report.txt').strip()
+            user_email = (data.get('userEmail') or '').strip()
+            filename = (data.get('filename') or default_filename).strip()
 
             # Validaciones
-            if not user_id:
+            if not user_id and not user_email:
                 return Response(
-                    {"error": "userId es obligatorio"},
+                    {"error": "userId o userEmail es obligatorio"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if not file_content:
+            if not file_content and uploaded_file is None:
                 return Response(
-                    {"error": "fileContent es obligatorio"},
+                    {"error": "fileContent o file es obligatorio"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
             # Verificar que el usuario exista
             try:
-                target_user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
+                if user_id:
+                    target_user = User.objects.get(id=user_id)
+                else:
+                    target_user = User.objects.get(email__iexact=user_email)
+            except (User.DoesNotExist, User.MultipleObjectsReturned, ValueError):
                 return Response(
                     {"error": "Usuario no encontrado"},
                     status=status.HTTP_404_NOT_FOUND
@@ -83,65 +100,32 @@ class UploadGeneticFileAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Procesar archivo genético
-            processing_result = self._process_genetic_file(target_user, file_content)
-
-            if not isinstance(processing_result, dict):
-                return Response(
-                    {"error": "Error al procesar el archivo genético"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-
-            # Actualizar el service_status del usuario a COMPLETED y guardar nombre del archivo
-            try:
-                from django.utils import timezone
-                profile, created = Profile.objects.get_or_create(user=target_user)
-                profile.service_status = ServiceStatus.COMPLETED
-                profile.report_filename = filename
-                profile.report_uploaded_at = timezone.now()
-                profile.save()
-                logger.info(
-                    f"Service status actualizado a COMPLETED para usuario {target_user.email}. "
-                    f"Archivo: {filename}"
-                )
-            except Exception as e:
-                logger.error(f"Error actualizando service_status: {str(e)}")
-
-            # Enviar email de notificación al usuario
-            user_name = (
-                target_user.first_name
-                or target_user.username
-                or target_user.email.split('@')[0]
-            )
-            email_sent = False
+            # Encolar el procesamiento: la ingesta, el cambio de estado y el email
+            # de resultados listos se ejecutan en el worker en segundo plano
             try:
-                email_sent = send_results_ready_email(target_user.email, user_name)
-                if email_sent:
-                    logger.info(f"Email de resultados listos enviado a {target_user.email}")
+                if uploaded_file is not None:
+                    job = enqueue_genotype_upload(
+                        target_user, filename, uploaded_file, requested_by=request.user
+                    )
                 else:
-                    logger.warning(
-                        f"No se pudo enviar email de notificación a {target_user.email}"
+                    job = enqueue_genotype_import(
+                        target_user, filename, file_content, requested_by=request.user
                     )
-            except Exception as e:
-                logger.error(f"Error enviando email de notificación: {str(e)}")
+            except ValueError as e:
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
             return Response({
                 "success": True,
-                "message": (
-                    f"Archivo procesado. {processing_result['snps_added']} nuevas variantes "
-                    f"genéticas agregadas."
-                ),
-                "user_id": user_id,
-                "snps_count": processing_result['snps_added'],
-                "status_updated": True,
-                "email_sent": email_sent,
-                "details": {
-                    "total_lines": processing_result['total_lines'],
-                    "processed_rsids": processing_result['processed_rsids'],
-                    "unprocessed_lines": processing_result['unprocessed_lines'],
-                    "skipped_lines": processing_result['snps_skipped'],
-                }
-            }, status=status.HTTP_201_CREATED)
+                "message": "Archivo recibido. El procesamiento continúa en segundo plano.",
+                "user_id": target_user.id,
+                "job_id": job.pk,
+                "status": job.status,
+                "status_url": reverse('api_upload_job_status', args=[job.pk]),
+                "total_lines": job.total_lines,
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"Error en UploadGeneticFileAPIView: {str(e)}", exc_info=True)
@@ -150,160 +134,29 @@ class UploadGeneticFileAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def _process_genetic_file(self, user, file_content):
-        """
-        Procesa el contenido del archivo genético y crea asociaciones user-snp.
-        - Normaliza genotipos (p.ej. T/C -> C/T).
-        - Maneja SNPs duplicados usando filter().first() en vez de get().
-        """
-        try:
-            lines = file_content.strip().split('\n')
-            logger.info(f"Total de líneas en archivo: {len(lines)}")
-
-            if not lines:
-                logger.warning("Archivo vacío")
-                return {
-                    'snps_added': 0,
-                    'snps_skipped': 0,
-                    'total_lines': 0,
-                    'processed_rsids': [],
-                    'unprocessed_lines': []
-                }
-
-            snps_added = 0
-            snps_skipped = 0
-            processed_rsids = []
-            unprocessed_lines = []
-
-            for idx, line in enumerate(lines):
-                if not line.strip():
-                    continue
-
-                parts = line.strip().split(',')
-
-                if len(parts) < 3:
-                    logger.warning(
-                        f"Línea {idx+1}: formato incompleto. Contenido: {line}"
-                    )
-                    unprocessed_lines.append({
-                        "line": idx + 1,
-                        "content": line,
-                        "reason": "Formato incompleto"
-                    })
-                    snps_skipped += 1
-                    continue
-
-                cromosoma = parts[0].strip()
-                rsid = parts[1].strip()
-                genotipo = parts[2].strip()
-
-                if not cromosoma or not rsid or not genotipo:
-                    logger.warning(
-                        f"Línea {idx+1}: campos vacíos. Contenido: {line}"
-                    )
-                    unprocessed_lines.append({
-                        "line": idx + 1,
-                        "content": line,
-                        "reason": "Campos vacíos"
-                    })
-                    snps_skipped += 1
-                    continue
-
-                # Normalizar genotipo (ordenar alelos, p.ej. T/C -> C/T)
-                genotipo_normalizado = genotipo
-                if '/' in genotipo:
-                    alelos = [a.strip() for a in genotipo.split('/') if a.strip()]
-                    alelos.sort()
-                    genotipo_normalizado = "/".join(alelos)
 
-                try:
-                    # Buscar SNPs que coincidan con el rsid y el genotipo normalizado
-                    snp_qs = SNP.objects.filter(rsid=rsid, genotipo=genotipo_normalizado)
-
-                    # Priorizar registros con informaciИn de Chile (evita que se asigne Finlandia u otro paЦs
-                    # cuando el SNP tiene varias filas con el mismo rsid/genotipo).
-                    priority_order = Case(
-                        When(pais__iexact='Chile', then=0),
-                        When(continente__icontains='america', then=1),
-                        When(poblacion_pais__isnull=False, then=2),
-                        When(pais__isnull=False, then=3),
-                        default=4,
-                        output_field=IntegerField()
-                    )
-                    snp_qs = snp_qs.annotate(priority=priority_order).order_by('priority', '-af_pais', 'id')
-
-                    if not snp_qs.exists():
-                        logger.warning(
-                            f"Línea {idx+1}: SNP no encontrado en BD (rsid={rsid}, "
-                            f"genotipo={genotipo} -> normalizado={genotipo_normalizado})."
-                        )
-                        unprocessed_lines.append({
-                            "line": idx + 1,
-                            "content": line,
-                            "reason": "SNP no encontrado en la base de datos"
-                        })
-                        snps_skipped += 1
-                        continue
-
-                    if snp_qs.count() > 1:
-                        logger.warning(
-                            f"Línea {idx+1}: SNP con rsid={rsid}, genotipo={genotipo_normalizado} "
-                            f"tiene {snp_qs.count()} registros. Usando el primero."
-                        )
-
-                    snp = snp_qs.first()
-                    processed_rsids.append(rsid)
-                    logger.debug(
-                        f"SNP encontrado en BD: rsid={rsid}, "
-                        f"genotipo_original={genotipo}, genotipo_normalizado={genotipo_normalizado}"
-                    )
+@method_decorator(csrf_exempt, name='dispatch')
+class UploadJobStatusAPIView(APIView):
+    """Vista para consultar el avance de una importación de archivo genético"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
 
-                    # Crear asociación usuario-SNP
-                    user_snp, created = UserSNP.objects.get_or_create(
-                        user=user,
-                        snp=snp
-                    )
-                    if created:
-                        snps_added += 1
-                        logger.debug(
-                            f"Asociación user-snp creada: user={user.id}, "
-                            f"rsid={rsid}, genotipo={genotipo_normalizado}"
-                        )
-                    else:
-                        logger.debug(
-                            f"Asociación user-snp ya existía: user={user.id}, "
-                            f"rsid={rsid}, genotipo={genotipo_normalizado}"
-                        )
-
-                except Exception as snp_error:
-                    logger.error(
-                        f"Error procesando SNP en línea {idx+1}: {str(snp_error)}",
-                        exc_info=True
-                    )
-                    unprocessed_lines.append({
-                        "line": idx + 1,
-                        "content": line,
-                        "reason": str(snp_error)
-                    })
-                    snps_skipped += 1
-
-            result = {
-                'snps_added': snps_added,
-                'snps_skipped': snps_skipped,
-                'total_lines': len(lines),
-                'processed_rsids': processed_rsids,
-                'unprocessed_lines': unprocessed_lines
-            }
-            logger.info(f"Procesamiento completado: {result}")
-            return result
+    def get(self, request, job_id):
+        if not is_admin_or_analyst(request.user):
+            return Response(
+                {"error": "No tienes permisos para realizar esta acción"},
+                status=status.HTTP_403_FORBIDDEN
+            )
 
-        except Exception as e:
-            logger.error(
-                f"Error procesando archivo genético: {str(e)}",
-                exc_info=True
+        try:
+            job = GenotypeImportJob.objects.get(pk=job_id)
+        except GenotypeImportJob.DoesNotExist:
+            return Response(
+                {"error": "Trabajo de importación no encontrado"},
+                status=status.HTTP_404_NOT_FOUND
             )
-            return -1
 
+        return Response(serialize_job(job), status=status.HTTP_200_OK)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -344,18 +197,21 @@ class DeleteGeneticFileAPIView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Eliminar todas las asociaciones user-snp del usuario
-            deleted_count, _ = UserSNP.objects.filter(user=target_user).delete()
-            logger.info(f"Eliminadas {deleted_count} variantes genéticas del usuario {target_user.email}")
+            with tracking_user_stats(target_user.pk):
+                # Eliminar todas las asociaciones user-snp del usuario
+                deleted_count, _ = UserSNP.objects.filter(user=target_user).delete()
+                invalidate_user_snapshot(target_user)
+                invalidate_user_reports(target_user.pk)
+                logger.info(f"Eliminadas {deleted_count} variantes genéticas del usuario {target_user.email}")
 
-            # Actualizar el service_status a NO_PURCHASED
-            try:
-                profile = target_user.profile
-                profile.service_status = ServiceStatus.NO_PURCHASED
-                profile.save()
-                logger.info(f"Service status actualizado a NO_PURCHASED para usuario {target_user.email}")
-            except Profile.DoesNotExist:
-                logger.warning(f"El usuario {target_user.email} no tiene perfil")
+                # Actualizar el service_status a NO_PURCHASED
+                try:
+                    profile = target_user.profile
+                    profile.service_status = ServiceStatus.NO_PURCHASED
+                    profile.save()
+                    logger.info(f"Service status actualizado a NO_PURCHASED para usuario {target_user.email}")
+                except Profile.DoesNotExist:
+                    logger.warning(f"El usuario {target_user.email} no tiene perfil")
 
             return Response({
                 "success": True,
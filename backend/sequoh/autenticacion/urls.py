@@ -13,10 +13,16 @@ from .views import (
     ContactAPIView,
     UserServiceStatusAPIView,
     AdminStatsAPIView,
+    AdminMetricsAPIView,
     GetUsersAPIView,
     ManageAnalystRoleAPIView,
 )
-from .upload_views import UploadGeneticFileAPIView, DeleteGeneticFileAPIView, GetUserReportStatusAPIView
+from .upload_views import (
+    UploadGeneticFileAPIView,
+    UploadJobStatusAPIView,
+    DeleteGeneticFileAPIView,
+    GetUserReportStatusAPIView,
+)
 from .diseases_views import DiseasesAPIView
 from .patient_variants_views import PatientVariantsAPIView
 from .snp_views import VariantesAPIView
@@ -26,13 +32,14 @@ from .traits_views import TraitsAPIView
 from .biometrics_views import BiometricsAPIView
 from .biomarkers_views import BiomarkersAPIView
 from .pharmacogenetics_views import PharmacogeneticsAPIView
+from .results_views import ResultsAPIView
 from .reception_views import (
     ReceptionSearchAPIView,
     ReceptionArrivalAPIView,
     ReceptionSampleCodeAPIView,
     ReceptionSampleStatusAPIView,
 )
-from .report_views import UserReportPDFView
+from .report_views import ReportJobStatusAPIView, UserReportPDFView
 
 urlpatterns = [
     path('login/', LoginAPIView.as_view(), name='api_login'),
@@ -56,9 +63,11 @@ urlpatterns = [
 
     # Endpoint para administradores
     path('admin/stats/', AdminStatsAPIView.as_view(), name='api_admin_stats'),
+    path('admin/metrics/', AdminMetricsAPIView.as_view(), name='api_admin_metrics'),
     path('admin/analysts/', ManageAnalystRoleAPIView.as_view(), name='api_admin_manage_analysts'),
     path('users/', GetUsersAPIView.as_view(), name='api_get_users'),
     path('upload-genetic-file/', UploadGeneticFileAPIView.as_view(), name='api_upload_genetic_file'),
+    path('upload-jobs/<int:job_id>/', UploadJobStatusAPIView.as_view(), name='api_upload_job_status'),
     path('delete-genetic-file/', DeleteGeneticFileAPIView.as_view(), name='api_delete_genetic_file'),
     path('user-report-status/<int:user_id>/', GetUserReportStatusAPIView.as_view(), name='api_user_report_status'),
     path('diseases/', DiseasesAPIView.as_view(), name='api_diseases'),
@@ -70,7 +79,9 @@ urlpatterns = [
     path('biometrics/', BiometricsAPIView.as_view(), name='api_biometrics'),
     path('biomarkers/', BiomarkersAPIView.as_view(), name='api_biomarkers'),
     path('pharmacogenetics/', PharmacogeneticsAPIView.as_view(), name='api_pharmacogenetics'),
+    path('results/', ResultsAPIView.as_view(), name='api_results'),
     path('report/pdf/', UserReportPDFView.as_view(), name='api_report_pdf'),
+    path('report/jobs/<int:job_id>/', ReportJobStatusAPIView.as_view(), name='api_report_job_status'),
     # Recepción (solo identidad, sin datos genéticos)
     path('reception/search/', ReceptionSearchAPIView.as_view(), name='api_reception_search'),
     path('reception/arrival/', ReceptionArrivalAPIView.as_view(), name='api_reception_arrival'),
@@ -1,22 +1,55 @@
 import os
 import uuid
+from decimal import Decimal
+from typing import NamedTuple, Optional
 from urllib.parse import unquote
 
 from django.conf import settings
 from django.contrib.staticfiles import finders
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
 from django.utils import timezone
+from .extra_info_cache import lookup_extra_info
 from .models import Profile, RsidExtraInfo
 
+def new_sample_code(user_id: int) -> str:
+    """SampleCode nuevo; incluye el id del usuario, así que no choca con el de otro perfil."""
+    return f"SC-{user_id:05d}-{uuid.uuid4().hex[:5].upper()}"
+
+
 def ensure_sample_code(profile: Profile) -> str:
     """Genera un SampleCode si no existe."""
     if profile.sample_code:
         return profile.sample_code
-    code = f"SC-{profile.user_id:05d}-{uuid.uuid4().hex[:5].upper()}"
+    code = new_sample_code(profile.user_id)
     profile.sample_code = code
     profile.sample_code_created_at = timezone.now()
     profile.save(update_fields=["sample_code", "sample_code_created_at"])
     return code
 
+
+def backfill_sample_codes(batch_size: int = 500) -> int:
+    """
+    Asigna SampleCode a los perfiles que no tienen, por lotes con un bulk_update por
+    lote. Los perfiles existentes se completan en la migración 0038 y los nuevos lo
+    reciben al crearse (ver signals.py); esto queda para volver a ejecutarlo a mano.
+    """
+    missing = Profile.objects.filter(Q(sample_code__isnull=True) | Q(sample_code="")).order_by("pk")
+    updated = 0
+    last_pk = 0
+    while True:
+        batch = list(missing.filter(pk__gt=last_pk).only("pk", "user_id")[:batch_size])
+        if not batch:
+            return updated
+        now = timezone.now()
+        for profile in batch:
+            profile.sample_code = new_sample_code(profile.user_id)
+            profile.sample_code_created_at = now
+        Profile.objects.bulk_update(batch, ["sample_code", "sample_code_created_at"])
+        updated += len(batch)
+        last_pk = batch[-1].pk
+
 from io import BytesIO
 from django.http import HttpResponse
 from django.template.loader import get_template
@@ -63,27 +96,72 @@ def render_to_pdf(template_src, context_dict={}):
     return None
 
 
-def build_rsid_extra_info_map(snps):
-    rs_ids = set()
-    genotypes = set()
-    phenotypes = set()
+class RsidExtra(NamedTuple):
+    """Campos de RsidExtraInfo que usan los resultados y el informe."""
+    freq_chile_percent: Optional[Decimal]
+    phenotype_description: str
 
+
+# Tripletas por consulta (3 parámetros cada una: 900 por consulta, bajo el límite de SQLite)
+EXTRA_INFO_LOOKUP_CHUNK = 300
+
+
+def rsid_extra_info_key(snp):
+    """Clave (rs_id, genotype, phenotype_name) de RsidExtraInfo para un SNP del catálogo."""
+    phenotype = (snp.fenotipo or "N/D").strip() or "N/D"
+    return (snp.rsid, snp.genotipo, phenotype)
+
+
+def rsid_extra_info_keys(snps):
+    keys = set()
     for snp in snps:
-        if not snp:
+        if not snp or not snp.rsid or not snp.genotipo:
             continue
-        if snp.rsid:
-            rs_ids.add(snp.rsid)
-        if snp.genotipo:
-            genotypes.add(snp.genotipo)
-        phenotype = (snp.fenotipo or "N/D").strip() or "N/D"
-        phenotypes.add(phenotype)
-
-    if not rs_ids or not genotypes or not phenotypes:
-        return {}
+        keys.add(rsid_extra_info_key(snp))
+    return keys
 
-    extras = RsidExtraInfo.objects.filter(
-        rs_id__in=rs_ids,
-        genotype__in=genotypes,
-        phenotype_name__in=phenotypes,
-    )
-    return {(row.rs_id, row.genotype, row.phenotype_name): row for row in extras}
+
+def _extra_info_ids_sql(count):
+    """
+    Subconsulta con los ids de RsidExtraInfo cuyas tripletas están en una lista VALUES:
+    (rs_id, genotype, phenotype_name) IN (VALUES (%s, %s, %s), ...). La comparación de
+    filas la resuelve el índice único de esas columnas en PostgreSQL y SQLite.
+    """
+    qn = connection.ops.quote_name
+    meta = RsidExtraInfo._meta
+    columns = ", ".join(qn(meta.get_field(name).column) for name in ("rs_id", "genotype", "phenotype_name"))
+    values = ", ".join(["(%s, %s, %s)"] * count)
+    return f"SELECT {qn(meta.pk.column)} FROM {qn(meta.db_table)} WHERE ({columns}) IN (VALUES {values})"
+
+
+def fetch_rsid_extra_info(keys):
+    """
+    Consulta las tripletas (rs_id, genotype, phenotype_name) exactas por bloques, con
+    una comparación de tuplas contra una lista VALUES (ver _extra_info_ids_sql). No trae
+    las combinaciones cruzadas que producían tres filtros __in independientes y, a
+    diferencia de un OR de condiciones por tripleta, no arma una expresión del ORM por
+    cada tripleta. Devuelve {tripleta: RsidExtra}.
+    """
+    keys = sorted(keys)
+    extra_info_map = {}
+    for start in range(0, len(keys), EXTRA_INFO_LOOKUP_CHUNK):
+        chunk = keys[start:start + EXTRA_INFO_LOOKUP_CHUNK]
+        params = [value for key in chunk for value in key]
+        ids = RawSQL(_extra_info_ids_sql(len(chunk)), params)
+        rows = RsidExtraInfo.objects.filter(pk__in=ids).values_list(
+            'rs_id', 'genotype', 'phenotype_name', 'freq_chile_percent', 'phenotype_description'
+        )
+        for rs_id, genotype, phenotype_name, freq_chile_percent, description in rows:
+            extra_info_map[(rs_id, genotype, phenotype_name)] = RsidExtra(freq_chile_percent, description)
+    return extra_info_map
+
+
+def build_rsid_extra_info_map(snps):
+    """
+    Devuelve {(rs_id, genotype, phenotype_name): RsidExtra} solo para las tripletas de
+    los SNPs recibidos, pasando por la caché LRU del proceso (ver extra_info_cache.py).
+    """
+    keys = rsid_extra_info_keys(snps)
+    if not keys:
+        return {}
+    return lookup_extra_info(keys, fetch_rsid_extra_info)
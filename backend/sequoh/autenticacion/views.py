@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Q
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth.tokens import default_token_generator
@@ -15,14 +16,19 @@ from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.utils import timezone
 from urllib.parse import urlencode, quote
-from datetime import timedelta
+from datetime import date, timedelta
 from allauth.account.models import EmailAddress
 from .email_utils import send_welcome_email, send_password_reset_email, send_email, build_branded_html
 from .jwt_utils import encode_jwt
+from .auth_cache import token_claims
 from .authentication import JWTAuthentication
-from .models import ServiceStatus, Profile, SNP
+from .models import MetricName, ServiceStatus, Profile
+from .metrics import last_rollup_date, metric_series
+from .report_cache import invalidate_user_reports
+from .system_stats import get_stats, growth_stats
 from .roles import (
     ensure_default_groups,
+    group_names,
     is_admin,
     is_analyst,
     is_reception,
@@ -136,10 +142,7 @@ class LoginAPIView(APIView):
                         }, status=400)
 
                 # Generar JWT (stateless) para Vercel/Render
-                token = encode_jwt({
-                    "sub": str(user.id),
-                    "email": user.email,
-                })
+                token = encode_jwt(token_claims(user))
                 return Response({"mensaje": "Inicio de sesión exitoso", "success": True, "token": token})
             else:
                 # Detectar caso de usuario pendiente de verificación (is_active=False)
@@ -210,7 +213,7 @@ class MeAPIView(APIView):
         except Profile.DoesNotExist:
             service_status = ServiceStatus.NO_PURCHASED
 
-        roles = list(u.groups.values_list("name", flat=True))
+        roles = list(group_names(u))
         admin_flag = is_admin(u)
         analyst_flag = is_analyst(u)
         reception_flag = is_reception(u)
@@ -298,12 +301,18 @@ class ChangePasswordAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Cambiar la contraseña
+            # Cambiar la contraseña. request.user puede venir de la caché de autenticación:
+            # guardar solo la contraseña para no pisar cambios hechos desde otro proceso
             user.set_password(new_password)
-            user.save()
+            user.save(update_fields=['password'])
 
+            # El cambio invalida los tokens anteriores: se entrega uno nuevo para esta sesión
             return Response(
-                {"success": True, "message": "Contraseña actualizada exitosamente"},
+                {
+                    "success": True,
+                    "message": "Contraseña actualizada exitosamente",
+                    "token": encode_jwt(token_claims(user)),
+                },
                 status=status.HTTP_200_OK
             )
 
@@ -357,7 +366,9 @@ class DeleteAccountAPIView(APIView):
             )
 
         try:
+            user_id = user.pk
             user.delete()
+            invalidate_user_reports(user_id)
         except Exception:
             return Response(
                 {"error": "No se pudo eliminar la cuenta"},
@@ -392,6 +403,7 @@ class DashboardAPIView(APIView):
         u = request.user
         profile = getattr(u, 'profile', None)
         service_status = getattr(profile, 'service_status', ServiceStatus.NO_PURCHASED)
+        stats = get_stats()
         payload = {
             "user": {
                 "id": u.id,
@@ -404,14 +416,12 @@ class DashboardAPIView(APIView):
                 "service_status": service_status,
                 "can_view_results": service_status == ServiceStatus.COMPLETED,
             },
-            # Estadísticas para el dashboard de admin
-            "total_users": User.objects.filter(is_active=True).count(),
-            "processed_reports": UserSNP.objects.values('user').distinct().count() if UserSNP.objects.exists() else 0,
-            "variants_count": SNP.objects.count() if SNP.objects.exists() else 0,
-            "analysis_count": User.objects.filter(profile__service_status=ServiceStatus.COMPLETED).count(),
-            "user_growth": "+12%",
-            "report_growth": "+8%",
-            "analysis_growth": "+18%",
+            # Estadísticas para el dashboard de admin (contadores mantenidos, ver system_stats.py)
+            "total_users": stats.active_users,
+            "processed_reports": stats.users_with_snps,
+            "variants_count": stats.variants_count,
+            "analysis_count": stats.completed_analyses,
+            **growth_stats(stats),
             "last_update": timezone.now().strftime("%d/%m/%Y")  # Formato más legible
         }
         resp = Response(payload)
@@ -711,7 +721,7 @@ class PasswordResetConfirmAPIView(APIView):
 
             user = prt.user
             user.set_password(password)
-            user.save()
+            user.save(update_fields=['password'])
             prt.used = True
             prt.save(update_fields=['used'])
 
@@ -768,7 +778,7 @@ class VerifyEmailView(APIView):
             user = verification.user
             if not user.is_active and getattr(settings, 'REQUIRE_EMAIL_VERIFICATION', False):
                 user.is_active = True
-                user.save()
+                user.save(update_fields=['is_active'])
                 try:
                     send_welcome_email(user)
                 except Exception as e:
@@ -857,12 +867,32 @@ class ManageAnalystRoleAPIView(APIView):
             "is_analyst": is_analyst(target),
             "is_reception": is_reception(target),
             "role": target_role,
-            "roles": list(target.groups.values_list("name", flat=True)),
+            "roles": list(group_names(target)),
         })
 
 
+USERS_PAGE_DEFAULT = 50
+USERS_PAGE_MAX = 200
+PRIVILEGED_GROUPS = ["ADMIN", "ANALISTA", "RECEPCION"]
+USER_LIST_FIELDS = (
+    "id", "username", "email", "first_name", "last_name", "is_staff", "is_superuser",
+    "profile__rut", "profile__sample_code", "profile__service_status",
+)
+
+
+def _in_group(name):
+    return Exists(User.groups.through.objects.filter(user_id=OuterRef("pk"), group__name=name))
+
+
 class GetUsersAPIView(APIView):
-    """Endpoint para obtener lista de usuarios (solo staff)."""
+    """
+    Endpoint para obtener lista de usuarios (solo staff).
+
+    Filtros opcionales: status (estado del servicio), role (admin, analyst, reception,
+    none) y search (nombre, email, RUT o código de muestra). Con limit o cursor la
+    respuesta se pagina por id: {"results": [...], "next_cursor": <id o null>}; sin ellos
+    se devuelve la lista completa como antes.
+    """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -870,61 +900,125 @@ class GetUsersAPIView(APIView):
         if not is_admin_or_analyst(request.user):
             return Response({"error": "No tienes permisos"}, status=status.HTTP_403_FORBIDDEN)
 
-        user_is_analyst = is_analyst(request.user)
-
-        if user_is_analyst:
+        params = request.query_params
+        paginate = "limit" in params or "cursor" in params
+        try:
+            limit = int(params.get("limit") or USERS_PAGE_DEFAULT)
+            cursor = int(params.get("cursor") or 0)
+        except ValueError:
+            return Response({"error": "limit y cursor deben ser números enteros"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), USERS_PAGE_MAX)
+
+        service_status = params.get("status")
+        if service_status and service_status not in ServiceStatus.values:
+            return Response({"error": "Estado de servicio inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        role = params.get("role")
+        if role and role not in ("admin", "analyst", "reception", "none"):
+            return Response({"error": "Rol inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        search = (params.get("search") or "").strip()
+
+        if is_analyst(request.user):
             # Analistas: ver muestras de usuarios finales (sin admin/analista/recepción)
-            profiles = (
-                Profile.objects.select_related("user")
-                .filter(user__is_active=True, user__is_superuser=False, user__is_staff=False)
-                .exclude(user__groups__name__in=["ADMIN", "ANALISTA", "RECEPCION"])
+            profiles = Profile.objects.filter(
+                user__is_active=True, user__is_superuser=False, user__is_staff=False
+            ).exclude(user__groups__name__in=PRIVILEGED_GROUPS)
+            if service_status:
+                profiles = profiles.filter(service_status=service_status)
+            if search:
+                profiles = profiles.filter(sample_code__icontains=search)
+            # Solo lectura: los perfiles sin código se completan con backfill_sample_codes
+            profiles = profiles.filter(sample_code__isnull=False).exclude(sample_code="")
+            rows, next_cursor = self._split_page(
+                profiles.filter(user_id__gt=cursor).order_by("user_id").values(
+                    "user_id", "sample_code", "service_status"
+                ),
+                limit, paginate, "user_id"
             )
-            from .utils import ensure_sample_code
-            users_list = []
-            for profile in profiles:
-                if not profile.sample_code:
-                    ensure_sample_code(profile)
-                if not profile.sample_code:
-                    continue
-                users_list.append({
-                    "id": profile.user.id,
-                    "sample_code": profile.sample_code,
-                    "service_status": profile.service_status,
-                })
-            return Response(users_list)
-
-        # Admin: información completa
-        users = User.objects.filter(is_active=True).values(
-            "id", "username", "email", "first_name", "last_name", "is_staff", "is_superuser"
+            users_list = [
+                {
+                    "id": row["user_id"],
+                    "sample_code": row["sample_code"],
+                    "service_status": row["service_status"],
+                }
+                for row in rows
+            ]
+            return self._response(users_list, next_cursor, paginate)
+
+        # Admin: información completa. Usuarios con su perfil (LEFT JOIN) en una consulta
+        users = User.objects.filter(is_active=True, id__gt=cursor)
+        if service_status:
+            users = users.filter(profile__service_status=service_status)
+        if role == "admin":
+            users = users.filter(Q(is_staff=True) | Q(is_superuser=True) | _in_group("ADMIN"))
+        elif role == "analyst":
+            users = users.filter(_in_group("ANALISTA"))
+        elif role == "reception":
+            users = users.filter(_in_group("RECEPCION"))
+        elif role == "none":
+            users = users.filter(is_staff=False, is_superuser=False).exclude(
+                Exists(User.groups.through.objects.filter(
+                    user_id=OuterRef("pk"), group__name__in=PRIVILEGED_GROUPS
+                ))
+            )
+        if search:
+            users = users.filter(
+                Q(first_name__icontains=search)
+                | Q(last_name__icontains=search)
+                | Q(email__icontains=search)
+                | Q(username__icontains=search)
+                | Q(profile__rut__icontains=search)
+                | Q(profile__sample_code__icontains=search)
+            )
+        rows, next_cursor = self._split_page(
+            users.order_by("id").values(*USER_LIST_FIELDS), limit, paginate, "id"
         )
-        users_list = []
-        for user in users:
-            user_dict = dict(user)
-            try:
-                profile = Profile.objects.get(user_id=user["id"])
-                user_dict["rut"] = getattr(profile, "rut", None)
-                user_dict["sample_code"] = getattr(profile, "sample_code", None)
-                user_dict["service_status"] = getattr(profile, "service_status", None)
-            except Profile.DoesNotExist:
-                user_dict["rut"] = None
-                user_dict["sample_code"] = None
-                user_dict["service_status"] = None
-
-            try:
-                target = User.objects.get(id=user["id"])
-                user_dict["roles"] = list(target.groups.values_list("name", flat=True))
-                user_dict["is_admin"] = is_admin(target)
-                user_dict["is_analyst"] = is_analyst(target)
-                user_dict["is_reception"] = is_reception(target)
-            except User.DoesNotExist:
-                user_dict["roles"] = []
-                user_dict["is_admin"] = False
-                user_dict["is_analyst"] = False
-                user_dict["is_reception"] = False
 
-            users_list.append(user_dict)
+        # Grupos de todos los usuarios listados en una segunda consulta
+        roles_by_user = {}
+        memberships = User.groups.through.objects.filter(
+            user_id__in=[row["id"] for row in rows] if paginate else users.values("id")
+        ).values_list("user_id", "group__name")
+        for user_id, name in memberships:
+            roles_by_user.setdefault(user_id, []).append(name)
 
-        return Response(users_list)
+        users_list = []
+        for row in rows:
+            roles = roles_by_user.get(row["id"], [])
+            users_list.append({
+                "id": row["id"],
+                "username": row["username"],
+                "email": row["email"],
+                "first_name": row["first_name"],
+                "last_name": row["last_name"],
+                "is_staff": row["is_staff"],
+                "is_superuser": row["is_superuser"],
+                "rut": row["profile__rut"],
+                "sample_code": row["profile__sample_code"],
+                "service_status": row["profile__service_status"],
+                "roles": roles,
+                "is_admin": row["is_staff"] or row["is_superuser"] or "ADMIN" in roles,
+                "is_analyst": "ANALISTA" in roles,
+                "is_reception": "RECEPCION" in roles,
+            })
+        return self._response(users_list, next_cursor, paginate)
+
+    @staticmethod
+    def _split_page(queryset, limit, paginate, id_field):
+        """Filas de la página y cursor siguiente (se pide una fila de más para saberlo)."""
+        if not paginate:
+            return list(queryset), None
+        rows = list(queryset[:limit + 1])
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, last[id_field] if isinstance(last, dict) else getattr(last, id_field)
+
+    @staticmethod
+    def _response(users_list, next_cursor, paginate):
+        if not paginate:
+            return Response(users_list)
+        return Response({"results": users_list, "next_cursor": next_cursor})
 
 class AdminStatsAPIView(APIView):
     """Endpoint para obtener estadísticas del sistema (solo staff)."""
@@ -936,56 +1030,67 @@ class AdminStatsAPIView(APIView):
         if not is_admin_or_analyst(request.user):
             return Response({"error": "No tienes permisos"}, status=status.HTTP_403_FORBIDDEN)
         
-        from django.db import connection
-        from .models import Profile, ServiceStatus
-        
+        # Una fila de contadores en vez de contar usuarios y perfiles (ver system_stats.py)
+        stats = get_stats()
+        payload = {
+            "total_users": stats.regular_users,
+            "pending_reports": stats.pending_reports,
+            "variants_count": stats.variants_count,
+            "analysis_count": stats.regular_completed,
+            **growth_stats(stats),
+            "last_update": timezone.now().strftime("%d/%m/%Y"),
+        }
+        resp = Response(payload)
+        resp["Cache-Control"] = "no-store"
+        return resp
+
+
+METRICS_MAX_DAYS = 366
+
+
+class AdminMetricsAPIView(APIView):
+    """
+    Métricas diarias para el dashboard (solo staff), leídas de DailyMetric.
+    Parámetros: from y to (AAAA-MM-DD, por defecto los últimos 30 días) y metrics
+    (lista separada por comas, por defecto todas).
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not is_admin_or_analyst(request.user):
+            return Response({"error": "No tienes permisos"}, status=status.HTTP_403_FORBIDDEN)
+
+        today = timezone.localdate()
         try:
-            # Contar usuarios activos (excluyendo staff y superusers)
-            total_users = User.objects.filter(
-                is_active=True,
-                is_superuser=False,
-            ).exclude(groups__name__in=["ADMIN", "ANALISTA"]).filter(is_staff=False).count()
-            
-            # Análisis completados (solo usuarios regulares)
-            analysis_count = User.objects.filter(
-                is_active=True,
-                is_staff=False,
-                is_superuser=False,
-                profile__service_status=ServiceStatus.COMPLETED
-            ).exclude(groups__name__in=["ADMIN", "ANALISTA"]).count()
-            
-            # Contar reportes pendientes
-            pending_reports = Profile.objects.filter(service_status=ServiceStatus.PENDING).exclude(user__groups__name__in=["ADMIN", "ANALISTA"]).count()
-            
-            # Contar variantes en la BD
-            variants_count = SNP.objects.count()
-            
-            payload = {
-                "total_users": total_users,
-                "pending_reports": pending_reports,
-                "variants_count": variants_count,
-                "analysis_count": analysis_count,
-                "user_growth": "+12%",
-                "report_growth": "+8%",
-                "analysis_growth": "+18%",
-                "last_update": timezone.now().strftime("%d/%m/%Y"),
-            }
-            resp = Response(payload)
-            resp["Cache-Control"] = "no-store"
-            return resp
-        except Exception as e:
-            print(f"Error en AdminStatsAPIView: {e}")
-            # Devolver al menos los usuarios que podemos contar
-            return Response({
-                "total_users": User.objects.filter(is_active=True, is_superuser=False).exclude(groups__name__in=["ADMIN", "ANALISTA"]).filter(is_staff=False).count(),
-                "processed_reports": 0,
-                "variants_count": 0,
-                "analysis_count": 0,
-                "user_growth": "+0%",
-                "report_growth": "+0%",
-                "analysis_growth": "+0%",
-                "last_update": timezone.now().strftime("%d/%m/%Y"),
-            })
+            until = date.fromisoformat(request.query_params.get("to") or today.isoformat())
+            since = date.fromisoformat(request.query_params.get("from") or (until - timedelta(days=29)).isoformat())
+        except ValueError:
+            return Response({"error": "Fecha inválida (formato AAAA-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+        if since > until:
+            return Response({"error": "from debe ser anterior a to"}, status=status.HTTP_400_BAD_REQUEST)
+        if (until - since).days >= METRICS_MAX_DAYS:
+            return Response(
+                {"error": f"El rango no puede superar {METRICS_MAX_DAYS} días"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        raw_metrics = request.query_params.get("metrics")
+        metrics = [name.strip().upper() for name in raw_metrics.split(",") if name.strip()] if raw_metrics else list(MetricName.values)
+        unknown = [name for name in metrics if name not in MetricName.values]
+        if unknown:
+            return Response({"error": f"Métricas desconocidas: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        days, totals = metric_series(since, until, metrics)
+        last_rollup = last_rollup_date()
+        return Response({
+            "from": since.isoformat(),
+            "to": until.isoformat(),
+            "metrics": metrics,
+            "days": days,
+            "totals": totals,
+            "last_rollup": last_rollup.isoformat() if last_rollup else None,
+        })
 
 
 @method_decorator(csrf_exempt, name='dispatch')
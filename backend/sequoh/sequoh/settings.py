@@ -89,6 +89,8 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    # Búsqueda aproximada de recepción con pg_trgm (lookups trigram_similar)
+    'django.contrib.postgres',
     'allauth',
     'allauth.account',
 ]
@@ -308,3 +310,45 @@ CSRF_COOKIE_SAMESITE = 'Lax'
 LOGIN_URL = '/login'
 LOGIN_REDIRECT_URL = '/dashboard'
 LOGOUT_REDIRECT_URL = '/login'
+
+# Procesamiento en segundo plano (importación de archivos genéticos).
+# Con BACKGROUND_INLINE_WORKER=False los trabajos los procesa `python manage.py run_worker`.
+BACKGROUND_INLINE_WORKER = os.environ.get('BACKGROUND_INLINE_WORKER', 'true').lower() in ('1', 'true', 'yes')
+GENOTYPE_UPLOAD_DIR = os.environ.get('GENOTYPE_UPLOAD_DIR', str(BASE_DIR / 'media' / 'genotype_uploads'))
+
+# Informe PDF: servicio persistente del report-generator (node render-server.js).
+# Si no responde, se ejecuta generate.js como subproceso en cada descarga.
+REPORT_RENDER_SERVICE_ENABLED = os.environ.get('REPORT_RENDER_SERVICE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+REPORT_RENDER_SERVICE_URL = os.environ.get('REPORT_RENDER_SERVICE_URL', 'http://127.0.0.1:3917')
+REPORT_RENDER_SOCKET = os.environ.get('REPORT_RENDER_SOCKET', '')
+REPORT_RENDER_TIMEOUT = int(os.environ.get('REPORT_RENDER_TIMEOUT', '600'))
+
+# Caché en disco de informes PDF (clave: sha256 del payload del informe)
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', str(BASE_DIR / 'media' / 'report_cache'))
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))
+
+# Generación de informes en segundo plano (ver autenticacion/report_jobs.py).
+# Renders simultáneos entre todos los procesos, para no saturar a los workers web.
+REPORT_JOB_MAX_CONCURRENT = int(os.environ.get('REPORT_JOB_MAX_CONCURRENT', '1'))
+
+# Caché de usuarios autenticados por JWT (ver autenticacion/auth_cache.py). Un cambio de
+# roles o contraseña se aplica en los demás procesos a más tardar tras este tiempo.
+AUTH_CACHE_TTL_SECONDS = int(os.environ.get('AUTH_CACHE_TTL_SECONDS', '10'))
+
+# Crecimiento de las estadísticas de administración: comparación contra el snapshot de
+# hace este número de días (ver autenticacion/system_stats.py)
+STATS_GROWTH_DAYS = int(os.environ.get('STATS_GROWTH_DAYS', '30'))
+
+# Búsqueda aproximada de recepción sin PostgreSQL: vigencia del índice de trigramas en
+# memoria de cada proceso (ver autenticacion/reception_search.py)
+RECEPTION_NGRAM_TTL_SECONDS = int(os.environ.get('RECEPTION_NGRAM_TTL_SECONDS', '60'))
+
+# Cola de correos salientes (ver autenticacion/email_outbox.py). send_email encola y el
+# worker en segundo plano envía por lotes con un único cliente de Gmail por proceso.
+# Con EMAIL_OUTBOX_ENABLED=False cada correo se envía dentro de la petición.
+EMAIL_OUTBOX_ENABLED = os.environ.get('EMAIL_OUTBOX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', '20'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '5'))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('EMAIL_OUTBOX_RETRY_BASE_SECONDS', '60'))
+# Timeout de cada llamada a Gmail; debe ser bastante menor que EMAIL_OUTBOX_STALE_SECONDS (600)
+EMAIL_GMAIL_TIMEOUT_SECONDS = int(os.environ.get('EMAIL_GMAIL_TIMEOUT_SECONDS', '30'))
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import styled from 'styled-components';
-import { API_ENDPOINTS, getToken } from '../config/api';
+import { fetchReportPdf } from '../config/api';
 
 const Buttondownload = ({ userName = 'Usuario', isDownloading: externalIsDownloading, setIsDownloading: externalSetIsDownloading }) => {
   const [internalIsDownloading, setInternalIsDownloading] = useState(false);
@@ -32,23 +32,7 @@ const Buttondownload = ({ userName = 'Usuario', isDownloading: externalIsDownloa
     abortControllerRef.current = new AbortController();
 
     try {
-      const token = getToken();
-      const baseUrl = API_ENDPOINTS.BASE_URL.endsWith('/') 
-          ? API_ENDPOINTS.BASE_URL.slice(0, -1) 
-          : API_ENDPOINTS.BASE_URL;
-      
-      const response = await fetch(`${baseUrl}/api/auth/report/pdf/`, {
-          headers: {
-              'Authorization': `Bearer ${token}`,
-          },
-          signal: abortControllerRef.current.signal
-      });
-
-      if (!response.ok) {
-          throw new Error('Error al generar el reporte');
-      }
-
-      const blob = await response.blob();
+      const blob = await fetchReportPdf({ signal: abortControllerRef.current.signal });
       const url = window.URL.createObjectURL(blob);
       setPdfUrl(url);
       setDownloadReady(true);
@@ -1,5 +1,5 @@
 import React, { useState, useMemo } from 'react';
-import { API_ENDPOINTS, apiRequest } from '../../config/api.js';
+import { API_ENDPOINTS, apiRequest, setToken } from '../../config/api.js';
 
 const ChangePasswordModal = ({ isOpen, onClose }) => {
   const [formData, setFormData] = useState({
@@ -64,6 +64,8 @@ const ChangePasswordModal = ({ isOpen, onClose }) => {
       });
 
       if (result.ok) {
+        // Los tokens anteriores quedan revocados; el backend entrega uno nuevo
+        if (result.data.token) setToken(result.data.token);
         setSuccess(true);
         // Cerrar modal después de 2 segundos
         setTimeout(() => {
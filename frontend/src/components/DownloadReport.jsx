@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { API_ENDPOINTS, getToken } from '../config/api';
+import { fetchReportPdf } from '../config/api';
 
 const DownloadReport = () => {
     const [loading, setLoading] = useState(false);
@@ -9,23 +9,7 @@ const DownloadReport = () => {
         setLoading(true);
         setError(null);
         try {
-            const token = getToken();
-            // Aseguramos que la URL base termine sin barra y agregamos el path
-            const baseUrl = API_ENDPOINTS.BASE_URL.endsWith('/') 
-                ? API_ENDPOINTS.BASE_URL.slice(0, -1) 
-                : API_ENDPOINTS.BASE_URL;
-            
-            const response = await fetch(`${baseUrl}/api/auth/report/pdf/`, {
-                headers: {
-                    'Authorization': `Bearer ${token}`,
-                },
-            });
-
-            if (!response.ok) {
-                throw new Error('Error al generar el reporte');
-            }
-
-            const blob = await response.blob();
+            const blob = await fetchReportPdf();
             const url = window.URL.createObjectURL(blob);
             const link = document.createElement('a');
             link.href = url;
@@ -15,6 +15,7 @@ export const API_ENDPOINTS = {
   GET_USERS: `${API_BASE_URL}/users/`,
   ADMIN_ANALYSTS: `${API_BASE_URL}/admin/analysts/`,
   UPLOAD_GENETIC_FILE: `${API_BASE_URL}/upload-genetic-file/`,
+  UPLOAD_JOB_STATUS: (jobId) => `${API_BASE_URL}/upload-jobs/${jobId}/`,
   DELETE_GENETIC_FILE: `${API_BASE_URL}/delete-genetic-file/`,
   UPDATE_SERVICE_STATUS: `${API_BASE_URL}/service/status/`,
   DISEASES: `${API_BASE_URL}/diseases/`,
@@ -26,6 +27,9 @@ export const API_ENDPOINTS = {
   BIOMETRICS: `${API_BASE_URL}/biometrics/`,
   BIOMARKERS: `${API_BASE_URL}/biomarkers/`,
   PHARMACOGENETICS: `${API_BASE_URL}/pharmacogenetics/`,
+  REPORT_PDF: `${API_BASE_URL}/report/pdf/`,
+  REPORT_JOB_STATUS: (jobId) => `${API_BASE_URL}/report/jobs/${jobId}/`,
+  RESULTS: (sections = []) => `${API_BASE_URL}/results/${sections.length ? `?sections=${sections.join(',')}` : ''}`,
   RECEPTION_SEARCH: `${API_BASE_URL}/reception/search/`,
   RECEPTION_MARK_ARRIVAL: `${API_BASE_URL}/reception/arrival/`,
   RECEPTION_SAMPLE_CODE: `${API_BASE_URL}/reception/sample-code/`,
@@ -39,8 +43,10 @@ export const clearToken = () => localStorage.removeItem('token');
 // Función helper para hacer peticiones a la API
 export const apiRequest = async (endpoint, options = {}) => {
   const token = getToken();
+  // Con FormData el navegador define el Content-Type (multipart con boundary)
+  const isFormData = typeof FormData !== 'undefined' && options.body instanceof FormData;
   const defaultHeaders = {
-    'Content-Type': 'application/json',
+    ...(isFormData ? {} : { 'Content-Type': 'application/json' }),
     ...(token ? { 'Authorization': `Bearer ${token}` } : {}),
   };
 
@@ -75,3 +81,33 @@ export const apiRequest = async (endpoint, options = {}) => {
     };
   }
 };
+
+const REPORT_JOB_POLL_MS = 2000;
+
+// El informe PDF se genera en segundo plano: si no está listo el backend responde 202
+// con el id del trabajo, se consulta su estado y luego se vuelve a pedir el PDF.
+export const fetchReportPdf = async ({ signal } = {}) => {
+  const headers = { 'Authorization': `Bearer ${getToken()}` };
+  for (;;) {
+    const response = await fetch(API_ENDPOINTS.REPORT_PDF, { headers, signal });
+    if (response.status !== 202) {
+      if (!response.ok) {
+        throw new Error('Error al generar el reporte');
+      }
+      return response.blob();
+    }
+
+    const { job_id: jobId } = await response.json();
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, REPORT_JOB_POLL_MS));
+      const job = await apiRequest(API_ENDPOINTS.REPORT_JOB_STATUS(jobId), { method: 'GET', signal });
+      if (signal?.aborted) {
+        throw new DOMException('Descarga cancelada', 'AbortError');
+      }
+      if (!job.ok || job.data.status === 'FAILED') {
+        throw new Error(job.data?.error || 'Error al generar el reporte');
+      }
+      if (job.data.status === 'COMPLETED') break;
+    }
+  }
+};
@@ -7,6 +7,21 @@ import { useNavigate } from 'react-router-dom';
 import './AdminReports.css';
 
 const initialPatients = [];
+const UPLOAD_JOB_POLL_MS = 2000;
+
+// El backend procesa los archivos en segundo plano: consulta el trabajo hasta que termine
+const waitForUploadJob = async (jobId) => {
+  for (;;) {
+    const response = await apiRequest(API_ENDPOINTS.UPLOAD_JOB_STATUS(jobId), { method: 'GET' });
+    if (!response.ok) {
+      return { status: 'FAILED', error: response.data?.error || 'Error consultando el estado' };
+    }
+    if (['COMPLETED', 'FAILED'].includes(response.data.status)) {
+      return response.data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, UPLOAD_JOB_POLL_MS));
+  }
+};
 
 export default function AdminReports({ user }) {
   const navigate = useNavigate();
@@ -158,44 +173,51 @@ export default function AdminReports({ user }) {
     if (selectedPatient && selectedFile) {
       try {
         const sampleCode = selectedPatient.sampleCode;
-        if (selectedFile.name !== `${sampleCode}.txt`) {
-          alert(`El nombre del archivo debe ser exactamente ${sampleCode}.txt`);
+        if (![`${sampleCode}.txt`, `${sampleCode}.txt.gz`].includes(selectedFile.name)) {
+          alert(`El nombre del archivo debe ser exactamente ${sampleCode}.txt (o ${sampleCode}.txt.gz)`);
           return;
         }
 
-        const fileContent = await selectedFile.text();
-        
+        // Se envía el archivo como multipart: el backend lo procesa por bloques
+        const formData = new FormData();
+        formData.append('userId', parseInt(selectedPatient.id.replace('P', '')));
+        formData.append('filename', selectedFile.name);
+        formData.append('file', selectedFile);
+
         const response = await apiRequest(
           API_ENDPOINTS.UPLOAD_GENETIC_FILE,
           {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              userId: parseInt(selectedPatient.id.replace('P', '')),
-              fileContent: fileContent,
-              filename: selectedFile.name
-            })
+            body: formData
           }
         );
         
         if (response.ok) {
-          setPatients(
-            patients.map((p) =>
-              p.id === selectedPatient.id
+          const patientId = selectedPatient.id;
+          const fileName = selectedFile.name;
+          setUploadDialogOpen(false);
+          setSelectedFile(null);
+          setSelectedPatient(null);
+
+          const job = await waitForUploadJob(response.data.job_id);
+          if (job.status !== 'COMPLETED') {
+            alert('Error al procesar el archivo: ' + (job.error || 'Error desconocido'));
+            return;
+          }
+          setPatients((prevPatients) =>
+            prevPatients.map((p) =>
+              p.id === patientId
                 ? {
                     ...p,
                     hasReport: true,
                     reportDate: new Date().toISOString().split("T")[0],
-                    reportName: selectedFile.name,
+                    reportName: fileName,
                     serviceStatus: 'COMPLETED',
                   }
                 : p
             )
           );
-          setUploadDialogOpen(false);
-          setSelectedFile(null);
-          setSelectedPatient(null);
-          alert(`Archivo procesado correctamente. ${response.data.snps_count} variantes genéticas agregadas.`);
+          alert(`Archivo procesado correctamente. ${job.snps_added} variantes genéticas agregadas.`);
         } else {
           alert('Error al procesar el archivo: ' + (response.data?.error || 'Error desconocido'));
         }
@@ -210,43 +232,50 @@ export default function AdminReports({ user }) {
     if (selectedPatient && selectedFile) {
       try {
         const sampleCode = selectedPatient.sampleCode;
-        if (selectedFile.name !== `${sampleCode}.txt`) {
-          alert(`El nombre del archivo debe ser exactamente ${sampleCode}.txt`);
+        if (![`${sampleCode}.txt`, `${sampleCode}.txt.gz`].includes(selectedFile.name)) {
+          alert(`El nombre del archivo debe ser exactamente ${sampleCode}.txt (o ${sampleCode}.txt.gz)`);
           return;
         }
 
-        const fileContent = await selectedFile.text();
-        
+        // Se envía el archivo como multipart: el backend lo procesa por bloques
+        const formData = new FormData();
+        formData.append('userId', parseInt(selectedPatient.id.replace('P', '')));
+        formData.append('filename', selectedFile.name);
+        formData.append('file', selectedFile);
+
         const response = await apiRequest(
           API_ENDPOINTS.UPLOAD_GENETIC_FILE,
           {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              userId: parseInt(selectedPatient.id.replace('P', '')),
-              fileContent: fileContent,
-              filename: selectedFile.name
-            })
+            body: formData
           }
         );
         
         if (response.ok) {
-          setPatients(
-            patients.map((p) =>
-              p.id === selectedPatient.id
+          const patientId = selectedPatient.id;
+          const fileName = selectedFile.name;
+          setEditDialogOpen(false);
+          setSelectedFile(null);
+          setSelectedPatient(null);
+
+          const job = await waitForUploadJob(response.data.job_id);
+          if (job.status !== 'COMPLETED') {
+            alert('Error al procesar el archivo: ' + (job.error || 'Error desconocido'));
+            return;
+          }
+          setPatients((prevPatients) =>
+            prevPatients.map((p) =>
+              p.id === patientId
                 ? {
                     ...p,
                     reportDate: new Date().toISOString().split("T")[0],
-                    reportName: selectedFile.name,
+                    reportName: fileName,
                     serviceStatus: 'COMPLETED',
                   }
                 : p
             )
           );
-          setEditDialogOpen(false);
-          setSelectedFile(null);
-          setSelectedPatient(null);
-          alert(`Archivo procesado correctamente. ${response.data.snps_count} variantes genéticas agregadas.`);
+          alert(`Archivo procesado correctamente. ${job.snps_added} variantes genéticas agregadas.`);
         } else {
           alert('Error al procesar el archivo: ' + (response.data?.error || 'Error desconocido'));
         }
@@ -605,7 +634,7 @@ export default function AdminReports({ user }) {
                   <label className="admin-reports__label">Archivo (.txt)</label>
                   <input
                     type="file"
-                    accept=".txt"
+                    accept=".txt,.gz"
                     onChange={(e) => setSelectedFile(e.target.files?.[0] || null)}
                     className="admin-reports__file-input"
                   />
@@ -649,7 +678,7 @@ export default function AdminReports({ user }) {
                   <label className="admin-reports__label">Nuevo archivo (.txt)</label>
                   <input
                     type="file"
-                    accept=".txt"
+                    accept=".txt,.gz"
                     onChange={(e) => setSelectedFile(e.target.files?.[0] || null)}
                     className="admin-reports__file-input"
                   />
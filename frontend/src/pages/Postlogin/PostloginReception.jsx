@@ -26,6 +26,7 @@ const PostloginReception = ({ user }) => {
   const [loadingSearch, setLoadingSearch] = useState(false);
   const [error, setError] = useState('');
   const [info, setInfo] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
 
   const handleLogout = async () => {
     try {
@@ -40,6 +41,7 @@ const PostloginReception = ({ user }) => {
   const resetMessages = () => {
     setError('');
     setInfo('');
+    setSuggestions([]);
     setChecklist({
       rut: false,
       nombre: false,
@@ -69,8 +71,18 @@ const PostloginReception = ({ user }) => {
     const found = response.data?.results || [];
     if (found.length === 1) {
       setSelectedUser(found[0]);
+      return;
+    }
+    setSelectedUser(null);
+
+    // Sin coincidencia exacta: búsqueda aproximada (prefijos, RUT, nombre o correo)
+    const fuzzyParams = new URLSearchParams({ mode: 'fuzzy', q: sampleId.trim() });
+    const fuzzyResponse = await apiRequest(`${API_ENDPOINTS.RECEPTION_SEARCH}?${fuzzyParams.toString()}`, { method: 'GET' });
+    const similar = fuzzyResponse.ok ? fuzzyResponse.data?.results || [] : [];
+    if (similar.length) {
+      setSuggestions(similar);
+      setInfo('No hubo coincidencia exacta. Resultados similares:');
     } else {
-      setSelectedUser(null);
       setInfo('No se encontraron usuarios con ese SampleID.');
     }
   };
@@ -178,6 +190,24 @@ const PostloginReception = ({ user }) => {
                 </button>
               </div>
             )}
+            {suggestions.length > 0 && (
+              <div className="reception-suggestions">
+                {suggestions.map((candidate) => (
+                  <button
+                    key={candidate.user_id}
+                    className="reception-btn reception-btn--ghost"
+                    onClick={() => {
+                      setSuggestions([]);
+                      setInfo('');
+                      setSelectedUser(candidate);
+                    }}
+                  >
+                    {candidate.sample_code || '—'} · {`${candidate.first_name || ''} ${candidate.last_name || ''}`.trim() || candidate.email}
+                    {candidate.rut ? ` · ${candidate.rut}` : ''}
+                  </button>
+                ))}
+              </div>
+            )}
           </div>
 
           {loadingSearch ? (